@@ -1,8 +1,8 @@
 from rest_framework import serializers
 from django.utils import timezone
-from decimal import Decimal
 from venues.models import Venue, BlockedDate
 from booking.models import Booking
+from booking import pricing
 
 class BookingCreateSerializer(serializers.Serializer):
     """Complex serializer for creating bookings with validation."""
@@ -49,7 +49,7 @@ class BookingCreateSerializer(serializers.Serializer):
         # Check conflicting bookings
         conflicting = Booking.objects.filter(
             venue=venue,
-            status__in=['PENDING', 'CONFIRMED'],
+            status__active=True,
             start_date__lte=end_date,
             end_date__gte=start_date
         ).exists()
@@ -64,22 +64,11 @@ class BookingCreateSerializer(serializers.Serializer):
         start_date = validated_data['start_date']
         end_date = validated_data['end_date']
         
-        days = (end_date - start_date).days + 1
-        
-        # Calculate pricing
-        subtotal = Decimal(str(venue.price_per_day)) * days
-        commission = subtotal * (Decimal(str(venue.commission_percentage)) / Decimal('100'))
-        deposit = subtotal * (Decimal(str(venue.deposit_percentage)) / Decimal('100'))
-        total = subtotal + commission
-        
         # Create booking
         booking = Booking.objects.create(
             venue=venue,
             renter=self.context['request'].user,
-            subtotal=subtotal,
-            commission=commission,
-            deposit_amount=deposit,
-            total_amount=total,
+            **pricing.booking_amounts(venue, start_date, end_date),
             **validated_data
         )
         
@@ -0,0 +1,135 @@
+"""
+Batch booking creation.
+
+A batch is checked with a fixed number of queries whatever its size: one for
+the venues, one for blocked dates and one for the occupancy bitmap blocks
+covering every requested range. Items that pass are priced and inserted with
+a single bulk_create, together with their ledger rows, in one transaction.
+Items that fail are reported individually and do not stop the others.
+
+bulk_create sends no signals, so the occupancy bitmap and the response cache
+are refreshed here explicitly.
+"""
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Q
+from venues import availability, cache
+from venues.models import Venue, VenueOccupancy, BlockedDate
+from . import ledger, stats
+from .models import Booking
+from .references import next_reference
+from .pricing import booking_amounts
+from .serializers import BookingBatchItemSerializer
+
+MAX_BATCH_SIZE = 50
+
+
+def insert_bookings(bookings):
+    """bulk_create ``bookings`` with their ledger rows, vendor stats, occupancy and cache updates.
+
+    Raises ledger.DatesTaken, with nothing saved, if any of their days is taken.
+    """
+    if not bookings:
+        return
+    spans = {}
+    for booking in bookings:
+        first, last = spans.get(booking.venue_id, (booking.start_date, booking.end_date))
+        spans[booking.venue_id] = (min(first, booking.start_date), max(last, booking.end_date))
+
+    missing = {b.venue_id for b in bookings if b.vendor_id is None}
+    if missing:
+        owners = dict(Venue.objects.filter(pk__in=missing).values_list('pk', 'owner_id'))
+        for booking in bookings:
+            if booking.vendor_id is None:
+                booking.vendor_id = owners[booking.venue_id]
+
+    with transaction.atomic():
+        with ledger.overlaps_rejected():
+            Booking.objects.bulk_create(bookings)
+        ledger.reserve(bookings)
+        stats.record_created(bookings)
+        for venue_id, (first, last) in sorted(spans.items()):
+            availability.refresh(venue_id, first, last)
+        cache.bump(spans)
+
+
+def _error(index, message):
+    return {'index': index, 'status': 'error', 'errors': {'non_field_errors': [message]}}
+
+
+def create_batch(renter, items):
+    """Create the bookings described by ``items`` (raw request dicts) for ``renter``.
+
+    Returns one result per item, in order, plus the created bookings. Raises
+    ledger.DatesTaken, with nothing saved, if a concurrent request booked one
+    of the accepted ranges after it was checked.
+    """
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        serializer = BookingBatchItemSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = {'index': index, 'status': 'error', 'errors': serializer.errors}
+
+    venues = Venue.objects.filter(is_active=True).in_bulk({data['venue_id'] for _, data in valid})
+    candidates = []
+    for index, data in valid:
+        venue = venues.get(data['venue_id'])
+        if venue is None:
+            results[index] = _error(index, "Venue not found or not available")
+        elif data['guests_count'] > venue.capacity:
+            results[index] = _error(index, f"Guest count exceeds venue capacity ({venue.capacity})")
+        else:
+            candidates.append((index, venue, data, availability.range_masks(data['start_date'], data['end_date'])))
+
+    blocked = set()
+    occupied = {}
+    if candidates:
+        blocked_q = Q()
+        occupancy_q = Q()
+        for _, venue, data, masks in candidates:
+            blocked_q |= Q(venue_id=venue.id, date__gte=data['start_date'], date__lte=data['end_date'])
+            occupancy_q |= Q(venue_id=venue.id, block__in=list(masks))
+        blocked = set(BlockedDate.objects.filter(blocked_q).values_list('venue_id', 'date'))
+        occupied = {
+            (venue_id, block): mask
+            for venue_id, block, mask in VenueOccupancy.objects.filter(occupancy_q).values_list(
+                'venue_id', 'block', 'mask'
+            )
+        }
+
+    blocked_venues = {venue_id for venue_id, _ in blocked}
+    accepted_masks = defaultdict(int)
+    bookings = []
+    for index, venue, data, masks in candidates:
+        start_date, end_date = data['start_date'], data['end_date']
+        if venue.id in blocked_venues and any(
+            (venue.id, day) in blocked for day in ledger.days_of(start_date, end_date)
+        ):
+            results[index] = _error(index, "Venue is not available for selected dates (blocked)")
+        elif any(occupied.get((venue.id, block), 0) & mask for block, mask in masks.items()):
+            results[index] = _error(index, "Venue is not available for selected dates (already booked)")
+        elif any(accepted_masks[venue.id, block] & mask for block, mask in masks.items()):
+            results[index] = _error(index, "Overlaps another booking in this request")
+        else:
+            for block, mask in masks.items():
+                accepted_masks[venue.id, block] |= mask
+            fields = {key: value for key, value in data.items() if key != 'venue_id'}
+            booking = Booking(
+                venue=venue,
+                vendor_id=venue.owner_id,
+                renter=renter,
+                booking_reference=next_reference(),
+                **booking_amounts(venue, start_date, end_date),
+                **fields
+            )
+            bookings.append((index, booking))
+
+    created = [booking for _, booking in bookings]
+    insert_bookings(created)
+
+    for index, booking in bookings:
+        results[index] = {'index': index, 'status': 'created', 'booking': booking}
+    return results, created
@@ -0,0 +1,78 @@
+"""
+Reservation ledger writes.
+
+An active (PENDING/CONFIRMED) booking owns one BookingDay row per day of its
+stay. Rows are inserted in the same transaction as the booking, so two
+renters racing for the same dates cannot both commit: the second insert hits
+the unique (venue, day) constraint and its booking is rolled back. Different
+venues never contend, so no table or venue lock is needed.
+
+On PostgreSQL the bookings table also carries an exclusion constraint
+(bookings_no_active_overlap, migration 0010) that rejects the booking row
+itself; overlaps_rejected() reports it as DatesTaken too.
+"""
+from contextlib import contextmanager
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from venues.availability import ACTIVE_BOOKING_STATUSES
+from .models import BookingDay
+
+
+OVERLAP_CONSTRAINT = 'bookings_no_active_overlap'
+
+
+class DatesTaken(Exception):
+    """Another active booking already holds one of the requested days."""
+
+
+@contextmanager
+def overlaps_rejected():
+    """Raise DatesTaken for a booking write refused by the overlap constraint."""
+    try:
+        yield
+    except IntegrityError as exc:
+        if OVERLAP_CONSTRAINT in str(exc):
+            raise DatesTaken(str(exc)) from exc
+        raise
+
+
+def days_of(start_date, end_date):
+    return [start_date + timedelta(days=n) for n in range((end_date - start_date).days + 1)]
+
+
+def reserve(bookings):
+    """Insert ledger rows for already-saved bookings; raises DatesTaken on conflict."""
+    rows = [
+        BookingDay(venue_id=b.venue_id, day=day, booking_id=b.pk)
+        for b in bookings
+        for day in days_of(b.start_date, b.end_date)
+    ]
+    try:
+        with transaction.atomic():
+            BookingDay.objects.bulk_create(rows)
+    except IntegrityError as exc:
+        raise DatesTaken(str(exc)) from exc
+
+
+def release(booking_ids):
+    return BookingDay.objects.filter(booking_id__in=booking_ids).delete()[0]
+
+
+def sync(booking, previous=None):
+    """Make the ledger match a booking just saved.
+
+    ``previous`` is the (status, start_date, end_date, venue_id, vendor_id)
+    it was loaded with, or None for a new booking.
+    """
+    active = booking.status in ACTIVE_BOOKING_STATUSES
+    if previous is not None:
+        old_status, old_start, old_end, old_venue_id, _ = previous
+        was_active = old_status in ACTIVE_BOOKING_STATUSES
+        if was_active == active and (old_start, old_end, old_venue_id) == (
+            booking.start_date, booking.end_date, booking.venue_id
+        ):
+            return
+        if was_active:
+            release([booking.pk])
+    if active:
+        reserve([booking])
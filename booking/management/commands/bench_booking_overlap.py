@@ -0,0 +1,83 @@
+import random
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from venues.availability import ACTIVE_BOOKING_STATUSES
+from venues.management.bench import scratch_database, timed, make_owner, make_venues
+
+
+class Command(BaseCommand):
+    help = 'Time booking overlap checks on venues with long booking histories'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--venues', type=int, default=5)
+        parser.add_argument('--history', type=int, default=10000,
+                            help='Past (completed or cancelled) bookings per venue')
+        parser.add_argument('--checks', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.run(options['venues'], options['history'], options['checks'], options['repeat'])
+
+    def run(self, venue_count, history, check_count, repeat):
+        from booking.models import Booking
+
+        rng = random.Random(24)
+        owner = make_owner()
+        renter = make_owner('bench-renter@example.com', role='RENTER')
+        venue_ids = make_venues(owner, venue_count)
+        today = date(2030, 1, 1)
+
+        def booking(venue_id, number, start, days, status):
+            return Booking(
+                venue_id=venue_id, vendor=owner, renter=renter, booking_reference=f'H-{venue_id}-{number}',
+                start_date=start, end_date=start + timedelta(days=days), status=status,
+                guests_count=10, event_type='OTHER', contact_phone='600000000',
+                subtotal=0, commission=0, deposit_amount=0, total_amount=0,
+            )
+
+        rows = []
+        for venue_id in venue_ids:
+            for number in range(history):
+                start = today - timedelta(days=rng.randrange(1, 3650))
+                rows.append(booking(venue_id, number, start, rng.randrange(3), rng.choice(['COMPLETED', 'CANCELLED'])))
+            # A year of upcoming active bookings, one every week
+            for week in range(52):
+                rows.append(booking(venue_id, history + week, today + timedelta(days=7 * week), 1,
+                                    rng.choice(ACTIVE_BOOKING_STATUSES)))
+        Booking.objects.bulk_create(rows, batch_size=2000)
+
+        windows = []
+        for _ in range(check_count):
+            start = today + timedelta(days=rng.randrange(365))
+            windows.append((rng.choice(venue_ids), start, start + timedelta(days=rng.randrange(1, 4))))
+
+        def overlaps(**status):
+            def check():
+                for venue_id, start, end in windows:
+                    Booking.objects.filter(
+                        venue_id=venue_id, start_date__lte=end, end_date__gte=start, **status
+                    ).order_by().exists()
+            return check
+
+        by_parameters = overlaps(status__in=ACTIVE_BOOKING_STATUSES)
+        by_literals = overlaps(status__active=True)
+        assert [
+            Booking.objects.filter(venue_id=v, start_date__lte=e, end_date__gte=s,
+                                   status__in=ACTIVE_BOOKING_STATUSES).exists()
+            for v, s, e in windows
+        ] == [
+            Booking.objects.filter(venue_id=v, start_date__lte=e, end_date__gte=s, status__active=True).exists()
+            for v, s, e in windows
+        ]
+
+        venue_id, start, end = windows[0]
+        self.stdout.write(f'{venue_count} venues x {history} past bookings, {check_count} overlap checks, '
+                          f'median of {repeat} runs')
+        for label, status in [('status__in (bound)', {'status__in': ACTIVE_BOOKING_STATUSES}),
+                              ('status__active', {'status__active': True})]:
+            plan = Booking.objects.filter(
+                venue_id=venue_id, start_date__lte=end, end_date__gte=start, **status
+            ).order_by().explain().splitlines()[-1].strip()
+            check = by_parameters if 'status__in' in status else by_literals
+            self.stdout.write(f'{label:>20} {timed(check, repeat) / check_count * 1000:>9.1f} us/check   {plan}')
@@ -0,0 +1,79 @@
+import random
+import string
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from venues.management.bench import scratch_database, make_owner, make_venues
+
+
+def legacy_reference():
+    return 'BOOK-' + ''.join(random.choices(string.digits, k=8))
+
+
+class Command(BaseCommand):
+    help = 'Compare random-digit booking references with block-allocated sequence references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--draws', type=int, default=200000,
+                            help='References generated per scheme')
+        parser.add_argument('--bookings', type=int, default=2000,
+                            help='Bookings inserted per scheme')
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.run(options['draws'], options['bookings'])
+
+    def run(self, draws, booking_count):
+        from booking import references
+
+        self.stdout.write(f"Generating {draws} references")
+        self.stdout.write(f"{'scheme':>10} {'refs/s':>10} {'duplicates':>11} {'queries':>8}")
+        random.seed(7)
+        started = time.perf_counter()
+        legacy = [legacy_reference() for _ in range(draws)]
+        self.report('random', draws, started, draws - len(set(legacy)), 0)
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            sequence = [references.next_reference() for _ in range(draws)]
+        self.report('sequence', draws, started, draws - len(set(sequence)), len(queries))
+
+        owner = make_owner()
+        renter = make_owner('bench-renter@example.com', role='RENTER')
+        venue_ids = make_venues(owner, 2)
+        self.stdout.write(f"\nInserting {booking_count} bookings")
+        self.stdout.write(f"{'scheme':>10} {'bookings/s':>10} {'retries':>8}")
+        for label, venue_id, make_reference in [
+            ('random', venue_ids[0], legacy_reference),
+            ('sequence', venue_ids[1], references.next_reference),
+        ]:
+            started = time.perf_counter()
+            retries = self.insert(booking_count, venue_id, renter, make_reference)
+            rate = booking_count / (time.perf_counter() - started)
+            self.stdout.write(f"{label:>10} {rate:>10.0f} {retries:>8}")
+
+    def report(self, label, draws, started, duplicates, query_count):
+        rate = draws / (time.perf_counter() - started)
+        self.stdout.write(f"{label:>10} {rate:>10.0f} {duplicates:>11} {query_count:>8}")
+
+    def insert(self, count, venue_id, renter, make_reference):
+        from booking.models import Booking
+
+        first_day = date(2030, 1, 1)
+        retries = 0
+        for i in range(count):
+            while True:
+                booking = Booking(
+                    venue_id=venue_id, renter=renter, booking_reference=make_reference(),
+                    start_date=first_day + timedelta(days=i), end_date=first_day + timedelta(days=i),
+                    guests_count=10, event_type='OTHER', contact_phone='600000000',
+                    subtotal=0, commission=0, deposit_amount=0, total_amount=0,
+                )
+                try:
+                    booking.save()
+                    break
+                except IntegrityError:
+                    retries += 1
+        return retries
@@ -0,0 +1,113 @@
+import random
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from venues.management.bench import scratch_database, timed, make_owner, make_venues
+from venues.models import BlockedDate
+
+
+class Command(BaseCommand):
+    help = 'Compare per-occurrence checks and inserts with series conflict detection and bulk creation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--occurrences', type=int, default=52)
+        parser.add_argument('--bookings', type=int, default=300,
+                            help='Existing bookings on the venue')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.run(options['occurrences'], options['bookings'], options['repeat'])
+
+    def run(self, occurrence_count, booking_count, repeat):
+        from booking.batch import insert_bookings
+        from booking.models import Booking, BookingSeries
+        from booking.references import next_reference
+        from booking.pricing import booking_amounts
+        from booking.series import create_series, find_conflicts
+
+        rng = random.Random(11)
+        owner = make_owner()
+        renter = make_owner('bench-renter@example.com', role='RENTER')
+        venue_id = make_venues(owner, 1)[0]
+        first_day = date(2030, 1, 1)
+
+        # Existing single-day bookings and blocked dates scattered over ten years
+        existing = [
+            Booking(
+                venue_id=venue_id, renter=renter, booking_reference=next_reference(),
+                start_date=first_day + timedelta(days=d), end_date=first_day + timedelta(days=d),
+                guests_count=10, event_type='OTHER', contact_phone='600000000',
+                subtotal=0, commission=0, deposit_amount=0, total_amount=0,
+            )
+            for d in sorted(rng.sample(range(3650), booking_count))
+        ]
+        insert_bookings(existing)
+        booked = {b.start_date for b in existing}
+        BlockedDate.objects.bulk_create([
+            BlockedDate(venue_id=venue_id, date=first_day + timedelta(days=d))
+            for d in range(3, 3650, 29) if first_day + timedelta(days=d) not in booked
+        ])
+
+        series = BookingSeries(
+            venue_id=venue_id, renter=renter, frequency='WEEKLY', count=occurrence_count,
+            start_date=first_day + timedelta(days=1), end_date=first_day + timedelta(days=2),
+            guests_count=10, event_type='CONFERENCE', contact_phone='600000000',
+        )
+        ranges = series.occurrences()
+
+        def per_occurrence_checks():
+            # What one POST /api/bookings/ per occurrence used to run
+            return [
+                BlockedDate.objects.filter(venue_id=venue_id, date__gte=start, date__lte=end).exists()
+                or Booking.objects.filter(
+                    venue_id=venue_id, status__in=['PENDING', 'CONFIRMED'],
+                    start_date__lte=end, end_date__gte=start
+                ).exists()
+                for start, end in ranges
+            ]
+
+        def one_query():
+            return find_conflicts(venue_id, ranges)
+
+        conflicts = one_query()
+        assert [i in conflicts for i in range(len(ranges))] == per_occurrence_checks()
+
+        def count_queries(fn):
+            with CaptureQueriesContext(connection) as queries:
+                fn()
+            return len(queries)
+
+        self.stdout.write(f"{occurrence_count} weekly occurrences, {booking_count} existing bookings, "
+                          f"{len(conflicts)} conflicting occurrences; median of {repeat} runs")
+        self.stdout.write(f"{'':>24} {'ms':>8} {'queries':>8}")
+        self.stdout.write(f"{'conflicts, per occurrence':>24} {timed(per_occurrence_checks, repeat):>8.1f} "
+                          f"{count_queries(per_occurrence_checks):>8}")
+        self.stdout.write(f"{'conflicts, one query':>24} {timed(one_query, repeat):>8.1f} "
+                          f"{count_queries(one_query):>8}")
+
+        venue = series.venue
+        free = [r for i, r in enumerate(ranges) if i not in conflicts]
+
+        def create_one_by_one():
+            sid = transaction.savepoint()
+            for start, end in free:
+                Booking(
+                    venue=venue, renter=renter, start_date=start, end_date=end,
+                    guests_count=10, event_type='CONFERENCE', contact_phone='600000000',
+                    **booking_amounts(venue, start, end)
+                ).save()
+            transaction.savepoint_rollback(sid)
+
+        def create_in_bulk():
+            sid = transaction.savepoint()
+            series.pk = None
+            create_series(series)
+            transaction.savepoint_rollback(sid)
+
+        with transaction.atomic():
+            self.stdout.write(f"{'create, one by one':>24} {timed(create_one_by_one, repeat):>8.1f} "
+                              f"{count_queries(create_one_by_one):>8}")
+            self.stdout.write(f"{'create series, bulk':>24} {timed(create_in_bulk, repeat):>8.1f} "
+                              f"{count_queries(create_in_bulk):>8}")
@@ -0,0 +1,139 @@
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.db.models import Max
+from django.db.backends.signals import connection_created
+from config import sqlite
+from venues.management.bench import scratch_database, make_owner, make_venues
+
+
+class Command(BaseCommand):
+    help = 'Compare reader latency behind concurrent booking writes, rollback journal vs the WAL profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark needs the SQLite backend')
+        with tempfile.TemporaryDirectory() as directory:
+            # The workers need a shared on-disk database, not the in-memory test one
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'bench.sqlite3')
+            with scratch_database():
+                self.run(options['readers'], options['writers'], options['seconds'])
+
+    def run(self, reader_count, writer_count, seconds):
+        from booking.models import Booking
+
+        owner = make_owner()
+        renter = make_owner('bench-renter@example.com', role='RENTER')
+        venue_ids = make_venues(owner, writer_count)
+        # Something to read: a year of past bookings per venue
+        first_day = date(2020, 1, 1)
+        Booking.objects.bulk_create([
+            Booking(
+                venue_id=venue_id, vendor=owner, renter=renter, booking_reference=f'OLD-{venue_id}-{d}',
+                start_date=first_day + timedelta(days=d), end_date=first_day + timedelta(days=d),
+                guests_count=10, event_type='OTHER', contact_phone='600000000', status='COMPLETED',
+                subtotal=0, commission=0, deposit_amount=0, total_amount=0,
+            )
+            for venue_id in venue_ids for d in range(365)
+        ], batch_size=1000)
+
+        self.stdout.write(f'{reader_count} readers, {writer_count} writers, {seconds:g} s per mode')
+        self.stdout.write(f"{'mode':>17} {'reads/s':>9} {'read p50':>9} {'read p99':>9} {'read max':>9} "
+                          f"{'writes/s':>9} {'locked':>7}")
+        for label, tuned in [('rollback journal', False), ('WAL profile', True)]:
+            self.configure(tuned)
+            read_times, writes, errors = self.contend(venue_ids, renter, reader_count, seconds)
+            read_times.sort()
+            self.stdout.write(
+                f'{label:>17} {len(read_times) / seconds:>9.0f} '
+                f'{statistics.median(read_times):>9.2f} '
+                f'{read_times[int(len(read_times) * 0.99)]:>9.2f} {read_times[-1]:>9.2f} '
+                f'{writes / seconds:>9.0f} {errors:>7}'
+            )
+        self.configure(False)
+
+    def configure(self, tuned):
+        connection.close()
+        options = connection.settings_dict['OPTIONS']
+        if tuned:
+            connection_created.connect(sqlite.apply_profile, dispatch_uid='config.sqlite.apply_profile')
+            options['transaction_mode'] = 'IMMEDIATE'
+        else:
+            connection_created.disconnect(dispatch_uid='config.sqlite.apply_profile')
+            options.pop('transaction_mode', None)
+        with connection.cursor() as cursor:
+            # The journal mode is stored in the file; it needs setting back too
+            cursor.execute(f"PRAGMA journal_mode = {'WAL' if tuned else 'DELETE'}")
+        connection.close()
+
+    def contend(self, venue_ids, renter, reader_count, seconds):
+        # Separate processes, like gunicorn workers: threads would mostly measure the GIL
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        deadline = time.monotonic() + seconds
+        connections.close_all()
+        workers = [
+            context.Process(target=self.read, args=(venue_ids[i % len(venue_ids)], deadline, results))
+            for i in range(reader_count)
+        ] + [
+            context.Process(target=self.write, args=(venue_id, renter, deadline, results))
+            for venue_id in venue_ids
+        ]
+        for worker in workers:
+            worker.start()
+        read_times, writes, errors = [], 0, 0
+        for _ in workers:
+            kind, value, failed = results.get()
+            if kind == 'read':
+                read_times.extend(value)
+            else:
+                writes += value
+            errors += failed
+        for worker in workers:
+            worker.join()
+        return read_times, writes, errors
+
+    def read(self, venue_id, deadline, results):
+        from booking.models import Booking
+
+        samples, errors = [], 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                list(Booking.objects.filter(venue_id=venue_id).order_by('-start_date')[:20])
+            except OperationalError:
+                errors += 1
+                continue
+            samples.append((time.perf_counter() - started) * 1000)
+        connection.close()
+        results.put(('read', samples, errors))
+
+    def write(self, venue_id, renter, deadline, results):
+        from booking.models import Booking
+
+        day = Booking.objects.filter(venue_id=venue_id).aggregate(last=Max('end_date'))['last']
+        writes, errors = 0, 0
+        while time.monotonic() < deadline:
+            day += timedelta(days=1)
+            booking = Booking(
+                venue_id=venue_id, renter=renter, start_date=day, end_date=day,
+                guests_count=10, event_type='OTHER', contact_phone='600000000',
+                subtotal=0, commission=0, deposit_amount=0, total_amount=0,
+            )
+            try:
+                booking.save()
+                writes += 1
+            except OperationalError:
+                errors += 1
+        connection.close()
+        results.put(('write', writes, errors))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from booking import stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild vendor dashboard statistics and monthly earnings from bookings and venues'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendor', type=int, action='append', dest='vendors',
+                            help='Only rebuild these vendor ids (repeatable)')
+
+    def handle(self, *args, **options):
+        vendors = stats.rebuild(options['vendors'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt statistics for {vendors} vendors'))
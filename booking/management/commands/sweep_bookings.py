@@ -0,0 +1,44 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from booking import sweeper
+from booking.models import Booking
+
+
+class Command(BaseCommand):
+    help = 'Complete finished bookings and expire unanswered pending ones, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--ttl-hours', type=int, default=None,
+                            help='Pending bookings older than this expire '
+                                 '(default: PENDING_BOOKING_TTL_HOURS)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the bookings that would be moved')
+        parser.add_argument('--loop', type=int, default=None, metavar='SECONDS',
+                            help='Keep running, sweeping every SECONDS seconds')
+
+    def handle(self, *args, **options):
+        ttl_hours = options['ttl_hours']
+        if ttl_hours is None:
+            ttl_hours = settings.PENDING_BOOKING_TTL_HOURS
+        ttl = timedelta(hours=ttl_hours)
+
+        while True:
+            self.sweep(options['batch_size'], ttl, options['dry_run'])
+            if options['loop'] is None:
+                return
+            time.sleep(options['loop'])
+
+    def sweep(self, batch_size, ttl, dry_run):
+        now = timezone.now()
+        if dry_run:
+            completed = Booking.objects.filter(sweeper.completable(timezone.localdate(now))).count()
+            expired = Booking.objects.filter(sweeper.expirable(now, ttl)).count()
+            self.stdout.write(f'Would complete {completed} and expire {expired} bookings')
+            return
+        completed = sweeper.complete_finished(batch_size, now=now)
+        expired = sweeper.expire_stale(batch_size, ttl=ttl, now=now)
+        self.stdout.write(self.style.SUCCESS(f'Completed {completed} and expired {expired} bookings'))
@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-17 19:14
+
+import django.db.models.deletion
+from datetime import timedelta
+from django.db import migrations, models
+
+
+def fill_ledger(apps, schema_editor):
+    Booking = apps.get_model('booking', 'Booking')
+    BookingDay = apps.get_model('booking', 'BookingDay')
+    rows = []
+    for booking in Booking.objects.filter(status__in=['PENDING', 'CONFIRMED']).order_by('created_at'):
+        for n in range((booking.end_date - booking.start_date).days + 1):
+            rows.append(BookingDay(
+                venue_id=booking.venue_id,
+                day=booking.start_date + timedelta(days=n),
+                booking_id=booking.pk,
+            ))
+    # Bookings that already overlap keep their rows; the earliest one holds the day
+    BookingDay.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0003_remove_booking_bookings_booking_4d53ac_idx_and_more'),
+        ('venues', '0008_featuredranking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='days', to='booking.booking')),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booked_days', to='venues.venue')),
+            ],
+            options={
+                'db_table': 'booking_days',
+                'unique_together': {('venue', 'day')},
+            },
+        ),
+        migrations.RunPython(fill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 6.0 on 2026-10-17 19:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import TruncMonth
+
+
+def fill_vendor_stats(apps, schema_editor):
+    Booking = apps.get_model('booking', 'Booking')
+    Venue = apps.get_model('venues', 'Venue')
+    User = apps.get_model('users', 'User')
+    VendorStats = apps.get_model('booking', 'VendorStats')
+    VendorMonthlyEarnings = apps.get_model('booking', 'VendorMonthlyEarnings')
+
+    totals = {
+        pk: {'total_earnings': 0, 'pending_bookings': 0, 'total_bookings': 0, 'total_venues': 0}
+        for pk in User.objects.filter(role='VENDOR').values_list('pk', flat=True)
+    }
+    empty = {'total_earnings': 0, 'pending_bookings': 0, 'total_bookings': 0, 'total_venues': 0}
+    for row in Booking.objects.order_by().values('venue__owner_id').annotate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status='PENDING')),
+        earnings=Sum('subtotal', filter=Q(status='COMPLETED')),
+    ):
+        stats = totals.setdefault(row['venue__owner_id'], dict(empty))
+        stats.update(total_bookings=row['total'], pending_bookings=row['pending'],
+                     total_earnings=row['earnings'] or 0)
+    for row in Venue.objects.order_by().values('owner_id').annotate(count=Count('id')):
+        totals.setdefault(row['owner_id'], dict(empty))['total_venues'] = row['count']
+    VendorStats.objects.bulk_create(
+        [VendorStats(vendor_id=pk, **values) for pk, values in totals.items()], batch_size=1000
+    )
+
+    VendorMonthlyEarnings.objects.bulk_create([
+        VendorMonthlyEarnings(vendor_id=row['venue__owner_id'], month=row['month'], earnings=row['earnings'])
+        for row in Booking.objects.filter(status='COMPLETED').order_by().annotate(
+            month=TruncMonth('created_at', output_field=DateField())
+        ).values('venue__owner_id', 'month').annotate(earnings=Sum('subtotal'))
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_bookingseries'),
+        ('users', '0002_alter_user_options_remove_user_address_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorStats',
+            fields=[
+                ('vendor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='vendor_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_earnings', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pending_bookings', models.IntegerField(default=0)),
+                ('total_bookings', models.IntegerField(default=0)),
+                ('total_venues', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Vendor stats',
+                'db_table': 'vendor_stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='VendorMonthlyEarnings',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('earnings', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_earnings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'vendor_monthly_earnings',
+                'ordering': ['vendor', '-month'],
+                'unique_together': {('vendor', 'month')},
+            },
+        ),
+        migrations.RunPython(fill_vendor_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-17 19:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_vendor(apps, schema_editor):
+    Booking = apps.get_model('booking', 'Booking')
+    Venue = apps.get_model('venues', 'Venue')
+    Booking.objects.update(vendor_id=Subquery(
+        Venue.objects.filter(pk=OuterRef('venue_id')).values('owner_id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_booking_expired_status'),
+        ('venues', '0008_featuredranking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='vendor',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='vendor_bookings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(fill_vendor, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='booking',
+            name='vendor',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='vendor_bookings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['vendor', 'status', 'created_at'], name='bookings_vendor__e2a94f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['vendor', 'created_at'], name='bookings_vendor__36e56f_idx'),
+        ),
+    ]
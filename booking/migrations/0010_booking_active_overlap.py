@@ -0,0 +1,70 @@
+# Generated by Django 6.0 on 2026-10-17 19:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+POSTGRES_INSTALL = [
+    # venue_id WITH = inside a GiST index needs btree_gist
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    "ALTER TABLE bookings ADD CONSTRAINT bookings_no_active_overlap EXCLUDE USING gist "
+    "(venue_id WITH =, daterange(start_date, end_date, '[]') WITH &&) "
+    "WHERE (status IN ('PENDING', 'CONFIRMED'))",
+]
+
+POSTGRES_UNINSTALL = [
+    "ALTER TABLE bookings DROP CONSTRAINT IF EXISTS bookings_no_active_overlap",
+]
+
+ACTIVE_OVERLAPS = (
+    "SELECT held.venue_id, held.booking_reference, other.booking_reference "
+    "FROM bookings held JOIN bookings other ON other.venue_id = held.venue_id AND other.id > held.id "
+    "AND other.start_date <= held.end_date AND held.start_date <= other.end_date "
+    "WHERE held.status IN ('PENDING', 'CONFIRMED') AND other.status IN ('PENDING', 'CONFIRMED') "
+    "ORDER BY held.venue_id, held.id, other.id"
+)
+
+
+def active_overlaps(connection):
+    """(venue_id, earlier reference, later reference) for active bookings sharing a day."""
+    with connection.cursor() as cursor:
+        cursor.execute(ACTIVE_OVERLAPS)
+        return cursor.fetchall()
+
+
+def install_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # Overlaps older than the ledger (0004) would make ADD CONSTRAINT fail on
+    # an arbitrary row; list them all instead. 0004 gave the days to the
+    # earlier booking, so the later one is the one to cancel or move.
+    overlaps = active_overlaps(schema_editor.connection)
+    if overlaps:
+        raise RuntimeError(
+            'Active bookings overlap; cancel or move the later booking of each pair, then migrate again:\n'
+            + '\n'.join(f'  venue {venue_id}: {held} / {other}' for venue_id, held, other in overlaps)
+        )
+    for statement in POSTGRES_INSTALL:
+        schema_editor.execute(statement)
+
+
+def uninstall_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRES_UNINSTALL:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0009_booking_vendor'),
+        ('venues', '0008_featuredranking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status__in', ['PENDING', 'CONFIRMED'])), fields=['venue', 'end_date', 'start_date'], name='bookings_active_span_idx'),
+        ),
+        migrations.RunPython(install_overlap_constraint, uninstall_overlap_constraint),
+    ]
@@ -1,11 +1,29 @@
-from django.db import models
+import calendar
+from datetime import date, timedelta
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from users.models import User
+from venues.availability import ACTIVE_BOOKING_STATUSES
 from venues.models import Venue
-import random
-import string
 from django.utils import timezone
 
+
+class ActiveStatus(models.Lookup):
+    """``status__active=True``: status IN the active statuses, written as literals.
+
+    SQLite only uses a partial index when the query repeats its WHERE term
+    verbatim; ``status__in`` sends the statuses as bound parameters, which
+    do not match.
+    """
+    lookup_name = 'active'
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs, params = self.process_lhs(compiler, connection)
+        statuses = ', '.join(f"'{status}'" for status in ACTIVE_BOOKING_STATUSES)
+        return f"{lhs} {'IN' if self.rhs else 'NOT IN'} ({statuses})", params
+
+
 class Booking(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending Approval'),
@@ -13,6 +31,7 @@ class Booking(models.Model):
         ('CANCELLED', 'Cancelled'),
         ('COMPLETED', 'Completed'),
         ('REJECTED', 'Rejected'),
+        ('EXPIRED', 'Expired'),
     ]
     
     EVENT_TYPE_CHOICES = [
@@ -27,12 +46,20 @@ class Booking(models.Model):
     booking_reference = models.CharField(max_length=20, unique=True)
     venue = models.ForeignKey(Venue, on_delete=models.CASCADE, related_name='bookings')
     renter = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings')
+    # Copy of venue.owner so vendor queries need no join; the composite
+    # indexes below start with it, hence no index of its own
+    vendor = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='vendor_bookings', editable=False, db_index=False
+    )
     start_date = models.DateField()
     end_date = models.DateField()
     guests_count = models.IntegerField(validators=[MinValueValidator(1)])
     event_type = models.CharField(max_length=20, choices=EVENT_TYPE_CHOICES)
     contact_phone = models.CharField(max_length=20)
     special_requests = models.TextField(blank=True)
+    series = models.ForeignKey(
+        'BookingSeries', on_delete=models.SET_NULL, null=True, blank=True, related_name='bookings'
+    )
     
     # Pricing
     subtotal = models.DecimalField(max_digits=10, decimal_places=2)
@@ -57,16 +84,162 @@ class Booking(models.Model):
             models.Index(fields=['venue', 'start_date', 'end_date']),
             models.Index(fields=['renter', 'status']),
             models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['status', 'end_date']),
+            models.Index(fields=['vendor', 'status', 'created_at']),
+            models.Index(fields=['vendor', 'created_at']),
+            # Overlap checks (venue, active, start <= hi, end >= lo) seek on
+            # end_date past the venue's history instead of scanning it. On
+            # PostgreSQL an exclusion constraint also forbids overlaps (0010).
+            models.Index(
+                fields=['venue', 'end_date', 'start_date'],
+                condition=models.Q(status__in=ACTIVE_BOOKING_STATUSES),
+                name='bookings_active_span_idx',
+            ),
         ]
     
     def __str__(self):
         return f"{self.booking_reference} - {self.venue.name}"
     
     def save(self, *args, **kwargs):
+        from . import ledger, stats
         if not self.booking_reference:
             self.booking_reference = self.generate_reference()
-        super().save(*args, **kwargs)
+        adding = self._state.adding
+        # Read before saving: the post_save receiver re-snapshots the loaded state
+        previous = None if adding else getattr(self, '_loaded_state', None)
+        if self.vendor_id is None or (previous is not None and previous[3] not in (None, self.venue_id)):
+            # New, or moved to another venue
+            self.vendor_id = self.venue.owner_id
+        try:
+            with transaction.atomic():
+                with ledger.overlaps_rejected():
+                    super().save(*args, **kwargs)
+                ledger.sync(self, previous)
+                stats.record_save(self, previous)
+        except ledger.DatesTaken:
+            if adding:
+                self.pk = None
+                self._state.adding = True
+            raise
     
     @staticmethod
     def generate_reference():
-        return 'BOOK-' + ''.join(random.choices(string.digits, k=8))
\ No newline at end of file
+        from .references import next_reference
+        return next_reference()
+
+
+Booking._meta.get_field('status').register_lookup(ActiveStatus)
+
+
+class BookingDay(models.Model):
+    """Reservation ledger: one row per day held by an active booking.
+    
+    The unique (venue, day) constraint makes the database itself reject a
+    second active booking for the same day, whatever races the availability
+    checks lose. Rows are written with the booking (see booking.ledger).
+    """
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE, related_name='booked_days')
+    day = models.DateField()
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='days')
+    
+    class Meta:
+        db_table = 'booking_days'
+        unique_together = ('venue', 'day')
+    
+    def __str__(self):
+        return f"{self.venue_id} - {self.day}"
+
+
+class ReferenceSequence(models.Model):
+    """High-water mark of a sequence handed out in blocks (see booking.references)."""
+    name = models.CharField(max_length=50, unique=True)
+    next_value = models.BigIntegerField(default=1)
+    
+    class Meta:
+        db_table = 'reference_sequences'
+    
+    def __str__(self):
+        return f"{self.name} @ {self.next_value}"
+
+
+class BookingSeries(models.Model):
+    """A recurring event: the same booking repeated every week or month.
+    
+    ``start_date``/``end_date`` are the first occurrence; occurrences() expands
+    the rule into the date ranges of all ``count`` occurrences.
+    """
+    FREQUENCY_CHOICES = [
+        ('WEEKLY', 'Weekly'),
+        ('MONTHLY', 'Monthly'),
+    ]
+    MAX_OCCURRENCES = 104
+    
+    renter = models.ForeignKey(User, on_delete=models.CASCADE, related_name='booking_series')
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE, related_name='booking_series')
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES)
+    interval = models.PositiveSmallIntegerField(default=1, validators=[MinValueValidator(1)])
+    count = models.PositiveSmallIntegerField(validators=[MinValueValidator(1)])
+    start_date = models.DateField()
+    end_date = models.DateField()
+    guests_count = models.IntegerField(validators=[MinValueValidator(1)])
+    event_type = models.CharField(max_length=20, choices=Booking.EVENT_TYPE_CHOICES)
+    contact_phone = models.CharField(max_length=20)
+    special_requests = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    
+    class Meta:
+        db_table = 'booking_series'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.get_frequency_display()} x{self.count} - {self.venue_id}"
+    
+    def occurrences(self):
+        """(start_date, end_date) of every occurrence, in order."""
+        length = self.end_date - self.start_date
+        ranges = []
+        for n in range(self.count):
+            if self.frequency == 'WEEKLY':
+                start = self.start_date + timedelta(weeks=n * self.interval)
+            else:
+                start = add_months(self.start_date, n * self.interval)
+            ranges.append((start, start + length))
+        return ranges
+
+
+class VendorStats(models.Model):
+    """Per-vendor dashboard totals, maintained by booking.stats."""
+    vendor = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='vendor_stats')
+    total_earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    pending_bookings = models.IntegerField(default=0)
+    total_bookings = models.IntegerField(default=0)
+    total_venues = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'vendor_stats'
+        verbose_name_plural = 'Vendor stats'
+    
+    def __str__(self):
+        return f"Stats for {self.vendor_id}"
+
+
+class VendorMonthlyEarnings(models.Model):
+    """Earnings of completed bookings, by the month the booking was made."""
+    vendor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_earnings')
+    month = models.DateField()
+    earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        db_table = 'vendor_monthly_earnings'
+        unique_together = ('vendor', 'month')
+        ordering = ['vendor', '-month']
+    
+    def __str__(self):
+        return f"{self.vendor_id} - {self.month:%Y-%m}"
+
+
+def add_months(day, months):
+    """Same day of the month ``months`` later, clamped to the month's last day."""
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
@@ -0,0 +1,42 @@
+"""
+Booking pricing.
+
+The single place booking amounts are computed, in Decimal. Commission and
+deposit are rounded half-up to the cent, and the total is built from the
+rounded parts. A stored booking, check_availability and the quote endpoint
+therefore always show the same figures.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+CENT = Decimal('0.01')
+
+
+def percentage(amount, percent):
+    return (amount * Decimal(percent) / 100).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def quote(venue, start_date, end_date):
+    """Price breakdown for renting ``venue`` from start_date to end_date inclusive."""
+    days = (end_date - start_date).days + 1
+    price_per_day = Decimal(venue.price_per_day).quantize(CENT)
+    subtotal = price_per_day * days
+    commission = percentage(subtotal, venue.commission_percentage)
+    return {
+        'days': days,
+        'price_per_day': price_per_day,
+        'subtotal': subtotal,
+        'commission': commission,
+        'deposit': percentage(subtotal, venue.deposit_percentage),
+        'total': subtotal + commission,
+    }
+
+
+def booking_amounts(venue, start_date, end_date):
+    """The pricing fields of a Booking, as keyword arguments."""
+    price = quote(venue, start_date, end_date)
+    return {
+        'subtotal': price['subtotal'],
+        'commission': price['commission'],
+        'deposit_amount': price['deposit'],
+        'total_amount': price['total'],
+    }
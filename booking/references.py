@@ -0,0 +1,116 @@
+"""
+Booking reference generation.
+
+References are drawn from a database sequence without a query per booking:
+each worker thread reserves BOOKING_REFERENCE_BLOCK_SIZE values at a time
+with one UPDATE of its ReferenceSequence row (hi/lo allocation), then hands
+them out from memory. Blocks never overlap, so references never collide and
+inserts never need a retry.
+
+Consecutive values would make references guessable, so each value goes
+through a keyed Feistel permutation of VALUE_BITS bits before being written in
+Crockford base32. The permutation is a bijection: distinct values still give
+distinct references.
+"""
+import hashlib
+import threading
+from functools import lru_cache
+from django.conf import settings
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F
+from .models import ReferenceSequence
+
+SEQUENCE_NAME = 'booking_reference'
+PREFIX = 'BK-'
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+VALUE_BITS = 40  # eight base32 characters
+HALF_BITS = VALUE_BITS // 2
+HALF_MASK = (1 << HALF_BITS) - 1
+ROUNDS = 4
+
+
+@lru_cache(maxsize=4)
+def _derive_key(secret):
+    return hashlib.blake2b(secret.encode(), digest_size=32).digest()
+
+
+def _round_key():
+    return _derive_key(settings.BOOKING_REFERENCE_KEY)
+
+
+def permute(value, key=None):
+    """Scramble a VALUE_BITS-bit value; distinct inputs give distinct outputs."""
+    key = key or _round_key()
+    left, right = value >> HALF_BITS, value & HALF_MASK
+    for round_number in range(ROUNDS):
+        digest = hashlib.blake2b(
+            bytes([round_number]) + right.to_bytes(3, 'big'), key=key, digest_size=4
+        ).digest()
+        left, right = right, left ^ (int.from_bytes(digest, 'big') & HALF_MASK)
+    return (left << HALF_BITS) | right
+
+
+def encode(value, key=None):
+    scrambled = permute(value, key)
+    chars = []
+    for _ in range(VALUE_BITS // 5):
+        scrambled, digit = divmod(scrambled, 32)
+        chars.append(ALPHABET[digit])
+    return PREFIX + ''.join(reversed(chars))
+
+
+class _Block(threading.local):
+    next = end = 0
+    # on_commit callback of the transaction the block was claimed in, until it commits
+    pending = None
+
+
+_block = _Block()
+
+
+def claim_block(size, using):
+    """Reserve ``size`` sequence values; returns the half-open range [start, end)."""
+    sequences = ReferenceSequence.objects.using(using).filter(name=SEQUENCE_NAME)
+    with transaction.atomic(using=using):
+        if sequences.update(next_value=F('next_value') + size):
+            end = sequences.values_list('next_value', flat=True).get()
+            return end - size, end
+    try:
+        with transaction.atomic(using=using):
+            ReferenceSequence.objects.using(using).create(name=SEQUENCE_NAME, next_value=1 + size)
+        return 1, 1 + size
+    except IntegrityError:
+        # Another worker created the row first
+        return claim_block(size, using)
+
+
+def _claimed_block_rolled_back(connection):
+    return not any(func is _block.pending for _, func, _ in connection.run_on_commit)
+
+
+def next_value():
+    alias = router.db_for_write(ReferenceSequence)
+    connection = connections[alias]
+    if _block.pending is not None and _claimed_block_rolled_back(connection):
+        # The claim was undone with its transaction; another worker may get the same block
+        _block.next = _block.end = 0
+        _block.pending = None
+
+    if _block.next >= _block.end:
+        _block.next, _block.end = claim_block(settings.BOOKING_REFERENCE_BLOCK_SIZE, alias)
+        if connection.in_atomic_block:
+            def confirm():
+                if _block.pending is confirm:
+                    _block.pending = None
+            _block.pending = confirm
+            transaction.on_commit(confirm, using=alias)
+
+    value = _block.next
+    if value >> VALUE_BITS:
+        raise RuntimeError('Booking reference space exhausted')
+    _block.next += 1
+    return value
+
+
+def next_reference():
+    return encode(next_value())
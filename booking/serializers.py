@@ -1,7 +1,18 @@
 from rest_framework import serializers
+from django.db.models import Prefetch, prefetch_related_objects
 from django.utils import timezone
-from .models import Booking
+from .models import Booking, BookingSeries
 from venues.models import Venue
+from venues import availability
+from . import ledger, pricing
+
+def validate_dates(start_date, end_date):
+    if start_date >= end_date:
+        raise serializers.ValidationError("End date must be after start date")
+    
+    if start_date < timezone.now().date():
+        raise serializers.ValidationError("Start date cannot be in the past")
+
 
 class BookingCreateSerializer(serializers.Serializer):
     venue_id = serializers.IntegerField()
@@ -24,33 +35,21 @@ class BookingCreateSerializer(serializers.Serializer):
         start_date = data['start_date']
         end_date = data['end_date']
         
-        if start_date >= end_date:
-            raise serializers.ValidationError("End date must be after start date")
-        
-        if start_date < timezone.now().date():
-            raise serializers.ValidationError("Start date cannot be in the past")
+        validate_dates(start_date, end_date)
         
         if data['guests_count'] > venue.capacity:
             raise serializers.ValidationError(
                 f"Guest count exceeds venue capacity ({venue.capacity})"
             )
         
-        blocked = venue.blocked_dates.filter(
-            date__gte=start_date,
-            date__lte=end_date
-        ).exists()
-        
-        if blocked:
-            raise serializers.ValidationError("Venue is not available for selected dates (blocked)")
-        
-        conflicting = Booking.objects.filter(
-            venue=venue,
-            status__in=['PENDING', 'CONFIRMED'],
-            start_date__lte=end_date,
-            end_date__gte=start_date
-        ).exists()
-        
-        if conflicting:
+        if not availability.is_free(venue.id, start_date, end_date):
+            blocked = venue.blocked_dates.filter(
+                date__gte=start_date,
+                date__lte=end_date
+            ).exists()
+            
+            if blocked:
+                raise serializers.ValidationError("Venue is not available for selected dates (blocked)")
             raise serializers.ValidationError("Venue is not available for selected dates (already booked)")
         
         return data
@@ -58,22 +57,32 @@ class BookingCreateSerializer(serializers.Serializer):
     def create(self, validated_data):
         venue = validated_data.pop('venue_id')
         
-        days = (validated_data['end_date'] - validated_data['start_date']).days + 1
-        subtotal = float(venue.price_per_day) * days
-        commission = subtotal * (venue.commission_percentage / 100)
-        deposit = subtotal * (venue.deposit_percentage / 100)
-        total = subtotal + commission
-        
-        booking = Booking.objects.create(
-            venue=venue,
-            renter=self.context['request'].user,
-            subtotal=subtotal,
-            commission=commission,
-            deposit_amount=deposit,
-            total_amount=total,
-            **validated_data
-        )
+        try:
+            booking = Booking.objects.create(
+                venue=venue,
+                renter=self.context['request'].user,
+                **pricing.booking_amounts(venue, validated_data['start_date'], validated_data['end_date']),
+                **validated_data
+            )
+        except ledger.DatesTaken:
+            # Lost a race with a booking committed after validate() checked availability
+            raise serializers.ValidationError("Venue is not available for selected dates (already booked)")
         
+        return booking
+
+class BookingBatchItemSerializer(BookingCreateSerializer):
+    """One item of a batch request.
+    
+    Only the item's own fields are checked here; venues, capacity and
+    availability are checked for the whole batch at once (see booking.batch).
+    """
+    
+    def validate_venue_id(self, value):
+        return value
+    
+    def validate(self, data):
+        validate_dates(data['start_date'], data['end_date'])
+        return data
 
 class BookingDetailSerializer(serializers.ModelSerializer):
     venue = serializers.SerializerMethodField()
@@ -111,4 +120,80 @@ class BookingListSerializer(serializers.ModelSerializer):
                   'end_date', 'days', 'event_type', 'status', 'total_amount', 'created_at']
     
     def get_days(self, obj):
-        return (obj.end_date - obj.start_date).days + 1
\ No newline at end of file
+        return (obj.end_date - obj.start_date).days + 1
+
+
+class BookingSeriesSerializer(serializers.ModelSerializer):
+    venue_id = serializers.IntegerField(write_only=True)
+    venue_name = serializers.CharField(source='venue.name', read_only=True)
+    bookings = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = BookingSeries
+        fields = ['id', 'venue_id', 'venue_name', 'frequency', 'interval', 'count',
+                  'start_date', 'end_date', 'guests_count', 'event_type', 'contact_phone',
+                  'special_requests', 'created_at', 'bookings']
+    
+    def validate_venue_id(self, value):
+        try:
+            return Venue.objects.get(id=value, is_active=True)
+        except Venue.DoesNotExist:
+            raise serializers.ValidationError("Venue not found or not available")
+    
+    def validate_count(self, value):
+        if value > BookingSeries.MAX_OCCURRENCES:
+            raise serializers.ValidationError(
+                f"A series has at most {BookingSeries.MAX_OCCURRENCES} occurrences"
+            )
+        return value
+    
+    def validate(self, data):
+        venue = data['venue_id']
+        validate_dates(data['start_date'], data['end_date'])
+        
+        if data['guests_count'] > venue.capacity:
+            raise serializers.ValidationError(
+                f"Guest count exceeds venue capacity ({venue.capacity})"
+            )
+        
+        # Occurrences must not overlap each other
+        interval = data.get('interval', 1)
+        period = 7 * interval if data['frequency'] == 'WEEKLY' else 28 * interval
+        if (data['end_date'] - data['start_date']).days >= period:
+            raise serializers.ValidationError("Each occurrence must end before the next one starts")
+        
+        return data
+    
+    def create(self, validated_data):
+        from .series import create_series
+        
+        series = BookingSeries(
+            venue=validated_data.pop('venue_id'),
+            renter=self.context['request'].user,
+            **validated_data
+        )
+        try:
+            bookings, skipped = create_series(series)
+        except ledger.DatesTaken:
+            raise serializers.ValidationError("Venue is not available for selected dates (already booked)")
+        if not bookings:
+            raise serializers.ValidationError("Venue is not available for any occurrence of this series")
+        
+        prefetch_related_objects(
+            [series], Prefetch('bookings', queryset=Booking.objects.select_related('venue'))
+        )
+        series.skipped = skipped
+        return series
+    
+    def get_bookings(self, obj):
+        bookings = sorted(obj.bookings.all(), key=lambda booking: booking.start_date)
+        return BookingListSerializer(bookings, many=True).data
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if hasattr(instance, 'skipped'):
+            data['skipped'] = [
+                {'start_date': start, 'end_date': end, 'reason': reason}
+                for start, end, reason in instance.skipped
+            ]
+        return data
@@ -0,0 +1,86 @@
+"""
+Recurring booking series.
+
+Every occurrence of a series is checked against existing bookings and blocked
+dates with a single query: the overlap conditions of all occurrences are
+OR-ed into one filter on each table and the two are combined with UNION ALL.
+Occurrences found free are created together with one bulk_create (see
+booking.batch.insert_bookings); the others are reported as skipped.
+"""
+from django.db import transaction
+from django.db.models import F, Q, Value
+from venues.models import BlockedDate
+from .batch import insert_bookings
+from .models import Booking
+from .pricing import booking_amounts
+from .references import next_reference
+
+BOOKED = 'already booked'
+BLOCKED = 'blocked'
+
+
+def find_conflicts(venue_id, ranges):
+    """Map the index of each range overlapping a booking or blocked date to the reason."""
+    booking_overlaps = Q()
+    blocked_overlaps = Q()
+    for start_date, end_date in ranges:
+        booking_overlaps |= Q(start_date__lte=end_date, end_date__gte=start_date)
+        blocked_overlaps |= Q(date__gte=start_date, date__lte=end_date)
+
+    # The overall span lets the database seek to it before testing each range
+    first = min(start_date for start_date, _ in ranges)
+    last = max(end_date for _, end_date in ranges)
+    bookings = Booking.objects.filter(
+        booking_overlaps, venue_id=venue_id, status__active=True, start_date__lte=last, end_date__gte=first
+    ).order_by().annotate(kind=Value(BOOKED)).values_list('start_date', 'end_date', 'kind')
+    blocked = BlockedDate.objects.filter(
+        blocked_overlaps, venue_id=venue_id
+    ).order_by().annotate(
+        first=F('date'), last=F('date'), kind=Value(BLOCKED)
+    ).values_list('first', 'last', 'kind')
+
+    taken = sorted(bookings.union(blocked, all=True))
+    conflicts = {}
+    for index, (start_date, end_date) in enumerate(ranges):
+        for first, last, kind in taken:
+            if first > end_date:
+                break
+            if last >= start_date and conflicts.get(index) != BLOCKED:
+                conflicts[index] = kind
+    return conflicts
+
+
+def create_series(series):
+    """Save ``series`` and the bookings for its free occurrences.
+
+    Returns (created bookings, skipped occurrences as (start, end, reason)).
+    Nothing is saved when no occurrence is free.
+    """
+    ranges = series.occurrences()
+    conflicts = find_conflicts(series.venue_id, ranges)
+    skipped = [(start, end, conflicts[i]) for i, (start, end) in enumerate(ranges) if i in conflicts]
+    free = [r for i, r in enumerate(ranges) if i not in conflicts]
+    if not free:
+        return [], skipped
+
+    bookings = [
+        Booking(
+            venue=series.venue,
+            vendor_id=series.venue.owner_id,
+            renter=series.renter,
+            series=series,
+            booking_reference=next_reference(),
+            start_date=start_date,
+            end_date=end_date,
+            guests_count=series.guests_count,
+            event_type=series.event_type,
+            contact_phone=series.contact_phone,
+            special_requests=series.special_requests,
+            **booking_amounts(series.venue, start_date, end_date)
+        )
+        for start_date, end_date in free
+    ]
+    with transaction.atomic():
+        series.save()
+        insert_bookings(bookings)
+    return bookings, skipped
@@ -0,0 +1,68 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from venues import availability, cache
+from venues.models import Venue
+from . import stats
+from .models import Booking
+
+
+@receiver(post_init, sender=Booking)
+def remember_loaded_state(sender, instance, **kwargs):
+    # __dict__ lookups so deferred fields are not loaded here
+    instance._loaded_state = (
+        instance.__dict__.get('status'),
+        instance.__dict__.get('start_date'),
+        instance.__dict__.get('end_date'),
+        instance.__dict__.get('venue_id'),
+        instance.__dict__.get('vendor_id'),
+    )
+
+
+@receiver(post_save, sender=Booking)
+def refresh_booking_occupancy(sender, instance, created, **kwargs):
+    old_status, old_start, old_end, old_venue_id, _ = instance._loaded_state
+    if not created and (old_status, old_start, old_end, old_venue_id) == (
+        instance.status, instance.start_date, instance.end_date, instance.venue_id
+    ):
+        return
+    
+    if old_venue_id and old_venue_id != instance.venue_id and old_start and old_end:
+        availability.refresh(old_venue_id, old_start, old_end)
+        cache.bump([old_venue_id])
+    elif old_start and old_end and (old_start, old_end) != (instance.start_date, instance.end_date):
+        availability.refresh(instance.venue_id, old_start, old_end)
+    availability.refresh(instance.venue_id, instance.start_date, instance.end_date)
+    cache.bump([instance.venue_id])
+    remember_loaded_state(sender, instance)
+
+
+@receiver(post_delete, sender=Booking)
+def release_booking_occupancy(sender, instance, **kwargs):
+    availability.refresh(instance.venue_id, instance.start_date, instance.end_date)
+    cache.bump([instance.venue_id])
+
+
+@receiver(post_delete, sender=Booking)
+def remove_booking_stats(sender, instance, **kwargs):
+    stats.record_deleted(instance)
+
+
+@receiver(post_init, sender=Venue)
+def remember_loaded_owner(sender, instance, **kwargs):
+    instance._loaded_owner_id = instance.__dict__.get('owner_id')
+
+
+@receiver(post_save, sender=Venue)
+def count_vendor_venue(sender, instance, created, **kwargs):
+    if created:
+        stats.apply(instance.owner_id, venues=1)
+    elif instance._loaded_owner_id is not None and instance._loaded_owner_id != instance.owner_id:
+        # The venue's bookings and earnings move to the new owner too
+        Booking.objects.filter(venue=instance).update(vendor_id=instance.owner_id)
+        stats.rebuild([instance._loaded_owner_id, instance.owner_id])
+    remember_loaded_owner(sender, instance)
+
+
+@receiver(post_delete, sender=Venue)
+def uncount_vendor_venue(sender, instance, **kwargs):
+    stats.apply(instance.owner_id, venues=-1, create_missing=False)
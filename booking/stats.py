@@ -0,0 +1,195 @@
+"""
+Vendor dashboard statistics.
+
+VendorStats and VendorMonthlyEarnings hold running totals per vendor. Every
+booking save applies its change as an F() delta inside the booking's own
+transaction (see Booking.save), so the totals commit or roll back with the
+booking. Deletes and venue changes arrive through booking.signals; bulk
+inserts and status updates (booking.batch, booking.transitions) call
+record_created() and record_transition() themselves.
+
+A missing row is computed from the bookings when first needed. The
+`rebuild_vendor_stats` command recomputes everything from scratch.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from users.models import User
+from venues.models import Venue
+from .models import Booking, VendorStats, VendorMonthlyEarnings
+
+EARNING_STATUS = 'COMPLETED'
+PENDING_STATUS = 'PENDING'
+
+
+def month_of(moment):
+    return timezone.localtime(moment).date().replace(day=1)
+
+
+def _booking_deltas(status, subtotal, sign):
+    return (
+        Decimal(subtotal) * sign if status == EARNING_STATUS else 0,
+        sign if status == PENDING_STATUS else 0,
+    )
+
+
+def compute(vendor_ids=None):
+    """{vendor_id: VendorStats field values} computed from bookings and venues."""
+    bookings = Booking.objects.order_by()
+    venues = Venue.objects.order_by()
+    if vendor_ids is not None:
+        bookings = bookings.filter(vendor_id__in=vendor_ids)
+        venues = venues.filter(owner_id__in=vendor_ids)
+
+    totals = defaultdict(lambda: {
+        'total_earnings': Decimal(0), 'pending_bookings': 0, 'total_bookings': 0, 'total_venues': 0,
+    })
+    for row in bookings.values('vendor_id').annotate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status=PENDING_STATUS)),
+        earnings=Sum('subtotal', filter=Q(status=EARNING_STATUS)),
+    ):
+        stats = totals[row['vendor_id']]
+        stats['total_bookings'] = row['total']
+        stats['pending_bookings'] = row['pending']
+        stats['total_earnings'] = row['earnings'] or Decimal(0)
+    for owner_id, count in venues.values('owner_id').annotate(count=Count('id')).values_list('owner_id', 'count'):
+        totals[owner_id]['total_venues'] = count
+    return totals
+
+
+def compute_months(vendor_ids=None, month=None):
+    """{(vendor_id, month): earnings} computed from completed bookings."""
+    bookings = Booking.objects.filter(status=EARNING_STATUS).order_by()
+    if vendor_ids is not None:
+        bookings = bookings.filter(vendor_id__in=vendor_ids)
+    if month is not None:
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        bookings = bookings.filter(
+            created_at__gte=timezone.make_aware(datetime.combine(month, time.min)),
+            created_at__lt=timezone.make_aware(datetime.combine(next_month, time.min)),
+        )
+    rows = bookings.annotate(
+        month=TruncMonth('created_at', output_field=DateField())
+    ).values('vendor_id', 'month').annotate(earnings=Sum('subtotal'))
+    return {(row['vendor_id'], row['month']): row['earnings'] for row in rows}
+
+
+def apply(vendor_id, earnings=0, pending=0, bookings=0, venues=0, month=None, create_missing=True):
+    """Add deltas to one vendor's totals (and to ``month`` when earnings change).
+
+    Must run after the change is written: a missing row is created from the
+    source tables, which already include it.
+    """
+    if vendor_id is None or not (earnings or pending or bookings or venues):
+        return
+    updated = VendorStats.objects.filter(vendor_id=vendor_id).update(
+        total_earnings=F('total_earnings') + earnings,
+        pending_bookings=F('pending_bookings') + pending,
+        total_bookings=F('total_bookings') + bookings,
+        total_venues=F('total_venues') + venues,
+    )
+    if not updated and create_missing:
+        try:
+            with transaction.atomic():
+                VendorStats.objects.create(vendor_id=vendor_id, **compute([vendor_id])[vendor_id])
+        except IntegrityError:
+            # Created concurrently from data that did not include this change yet
+            return apply(vendor_id, earnings, pending, bookings, venues, month, create_missing)
+
+    if earnings:
+        updated = VendorMonthlyEarnings.objects.filter(vendor_id=vendor_id, month=month).update(
+            earnings=F('earnings') + earnings
+        )
+        if not updated and create_missing:
+            try:
+                with transaction.atomic():
+                    VendorMonthlyEarnings.objects.create(
+                        vendor_id=vendor_id, month=month,
+                        earnings=compute_months([vendor_id], month).get((vendor_id, month), 0)
+                    )
+            except IntegrityError:
+                VendorMonthlyEarnings.objects.filter(vendor_id=vendor_id, month=month).update(
+                    earnings=F('earnings') + earnings
+                )
+
+
+def record_save(booking, previous):
+    """Apply a saved booking; ``previous`` is its loaded state (see ledger.sync), None if new."""
+    earnings, pending = _booking_deltas(booking.status, booking.subtotal, 1)
+    month = month_of(booking.created_at)
+    if previous is None:
+        created = 1
+    elif previous[4] is not None and previous[4] != booking.vendor_id:
+        # Moved to another owner's venue: the booking leaves one vendor's totals for the other's
+        old_earnings, old_pending = _booking_deltas(previous[0], booking.subtotal, -1)
+        apply(previous[4], old_earnings, old_pending, -1, month=month)
+        created = 1
+    elif previous[0] != booking.status:
+        created = 0
+        old_earnings, old_pending = _booking_deltas(previous[0], booking.subtotal, -1)
+        earnings, pending = earnings + old_earnings, pending + old_pending
+    else:
+        return
+    apply(booking.vendor_id, earnings, pending, created, month=month)
+
+
+def record_created(bookings):
+    """Apply bookings inserted with bulk_create, one UPDATE per vendor and month."""
+    deltas = defaultdict(lambda: [0, 0, 0])
+    for booking in bookings:
+        earnings, pending = _booking_deltas(booking.status, booking.subtotal, 1)
+        delta = deltas[booking.vendor_id, month_of(booking.created_at)]
+        delta[0] += earnings
+        delta[1] += pending
+        delta[2] += 1
+    for (vendor_id, month), (earnings, pending, created) in deltas.items():
+        apply(vendor_id, earnings, pending, created, month=month)
+
+
+def record_transition(bookings, old_status):
+    """Apply bookings moved from ``old_status`` to their current status by a queryset update."""
+    deltas = defaultdict(lambda: [0, 0])
+    for booking in bookings:
+        new_earnings, new_pending = _booking_deltas(booking.status, booking.subtotal, 1)
+        old_earnings, old_pending = _booking_deltas(old_status, booking.subtotal, -1)
+        delta = deltas[booking.vendor_id, month_of(booking.created_at)]
+        delta[0] += new_earnings + old_earnings
+        delta[1] += new_pending + old_pending
+    for (vendor_id, month), (earnings, pending) in deltas.items():
+        apply(vendor_id, earnings, pending, month=month)
+
+
+def record_deleted(booking):
+    earnings, pending = _booking_deltas(booking.status, booking.subtotal, -1)
+    apply(booking.vendor_id, earnings, pending, -1, month=month_of(booking.created_at), create_missing=False)
+
+
+def rebuild(vendor_ids=None):
+    """Recompute the stats and monthly earnings rows; returns the number of vendors."""
+    totals = compute(vendor_ids)
+    months = compute_months(vendor_ids)
+    stats_rows = VendorStats.objects.all()
+    month_rows = VendorMonthlyEarnings.objects.all()
+    if vendor_ids is not None:
+        stats_rows = stats_rows.filter(vendor_id__in=vendor_ids)
+        month_rows = month_rows.filter(vendor_id__in=vendor_ids)
+    else:
+        vendor_ids = set(totals) | set(User.objects.filter(role='VENDOR').values_list('pk', flat=True))
+    vendor_ids = {v for v in vendor_ids if v is not None}
+
+    with transaction.atomic():
+        stats_rows.delete()
+        month_rows.delete()
+        VendorStats.objects.bulk_create(
+            [VendorStats(vendor_id=v, **totals[v]) for v in vendor_ids], batch_size=1000
+        )
+        VendorMonthlyEarnings.objects.bulk_create([
+            VendorMonthlyEarnings(vendor_id=vendor_id, month=month, earnings=earnings)
+            for (vendor_id, month), earnings in months.items() if vendor_id in vendor_ids
+        ], batch_size=1000)
+    return len(vendor_ids)
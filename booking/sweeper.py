@@ -0,0 +1,70 @@
+"""
+Booking lifecycle sweeps.
+
+complete_finished() moves CONFIRMED bookings whose end_date has passed to
+COMPLETED. expire_stale() moves PENDING bookings to EXPIRED once the vendor
+has left them unanswered for PENDING_BOOKING_TTL_HOURS, or once their start
+date has passed. Expiring releases their dates.
+
+Both walk the matching ids in primary-key order, batch_size at a time, and
+move each batch with one conditional UPDATE in its own short transaction
+(see booking.transitions.move). Memory stays bounded whatever the table
+size. Nothing needs to be persisted to resume: moved rows stop matching,
+so a restarted sweep picks up where the last one stopped.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from . import transitions
+from .models import Booking
+
+
+def completable(today):
+    return Q(status='CONFIRMED', end_date__lt=today)
+
+
+def expirable(now, ttl):
+    return Q(status='PENDING') & (Q(created_at__lt=now - ttl) | Q(start_date__lt=timezone.localdate(now)))
+
+
+def _sweep(condition, old_status, changes, batch_size):
+    moved = 0
+    last_pk = 0
+    while True:
+        ids = list(Booking.objects.filter(condition, pk__gt=last_pk).order_by('pk').values_list(
+            'pk', flat=True
+        )[:batch_size])
+        if not ids:
+            return moved
+        with transaction.atomic():
+            moved += len(transitions.move(ids, old_status, changes()))
+        last_pk = ids[-1]
+
+
+def complete_finished(batch_size=1000, now=None):
+    """Complete confirmed bookings that have ended; returns how many were moved."""
+    now = now or timezone.now()
+
+    def changes():
+        moment = timezone.now()
+        return {'status': 'COMPLETED', 'completed_at': moment, 'updated_at': moment}
+
+    return _sweep(completable(timezone.localdate(now)), 'CONFIRMED', changes, batch_size)
+
+
+def expire_stale(batch_size=1000, ttl=None, now=None):
+    """Expire unanswered pending bookings; returns how many were moved."""
+    now = now or timezone.now()
+    if ttl is None:
+        ttl = timedelta(hours=settings.PENDING_BOOKING_TTL_HOURS)
+
+    def changes():
+        return {
+            'status': 'EXPIRED',
+            'rejection_reason': 'Expired without a response from the venue',
+            'updated_at': timezone.now(),
+        }
+
+    return _sweep(expirable(now, ttl), 'PENDING', changes, batch_size)
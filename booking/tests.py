@@ -1,3 +1,694 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import date, timedelta
+from importlib import import_module
+from io import StringIO
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from venues import availability
+from venues.models import BlockedDate
+from venues.tests import make_user, make_venue
+from . import ledger, references, stats, sweeper, transitions
+from .models import Booking, BookingDay, BookingSeries, VendorStats, VendorMonthlyEarnings
+from .series import find_conflicts
 
-# Create your tests here.
+
+class BookingCreateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.vendor = make_user('vendor@example.com', role='VENDOR')
+        self.renter = make_user('renter@example.com')
+        self.venue = make_venue(self.vendor)
+        self.client.force_authenticate(self.renter)
+        self.start = timezone.now().date() + timedelta(days=10)
+
+    def payload(self, start, end):
+        return {
+            'venue_id': self.venue.id, 'start_date': start.isoformat(),
+            'end_date': end.isoformat(), 'guests_count': 20,
+            'event_type': 'WEDDING', 'contact_phone': '600000000',
+        }
+
+    def test_rejects_overlapping_and_blocked_dates(self):
+        end = self.start + timedelta(days=2)
+        response = self.client.post('/api/bookings/', self.payload(self.start, end))
+        self.assertEqual(response.status_code, 201)
+        
+        response = self.client.post('/api/bookings/', self.payload(end, end + timedelta(days=1)))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('already booked', str(response.data))
+        
+        blocked_day = end + timedelta(days=5)
+        BlockedDate.objects.create(venue=self.venue, date=blocked_day)
+        response = self.client.post('/api/bookings/', self.payload(blocked_day - timedelta(days=1), blocked_day))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('blocked', str(response.data))
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class BookingBatchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.renter = make_user('renter@example.com')
+        vendor = make_user('vendor@example.com', role='VENDOR')
+        self.hall = make_venue(vendor, 'Hall')
+        self.garden = make_venue(vendor, 'Garden')
+        self.client.force_authenticate(self.renter)
+        self.start = timezone.now().date() + timedelta(days=10)
+
+    def item(self, venue, offset, days=1, **kwargs):
+        start = self.start + timedelta(days=offset)
+        item = {
+            'venue_id': venue.id, 'start_date': start.isoformat(),
+            'end_date': (start + timedelta(days=days)).isoformat(), 'guests_count': 20,
+            'event_type': 'WEDDING', 'contact_phone': '600000000',
+        }
+        item.update(kwargs)
+        return item
+
+    def test_creates_valid_items_and_reports_the_rest(self):
+        BlockedDate.objects.create(venue=self.garden, date=self.start + timedelta(days=20))
+        make_booking(self.hall, self.renter, self.start + timedelta(days=30), self.start + timedelta(days=31)).save()
+        response = self.client.post('/api/bookings/batch/', {'bookings': [
+            self.item(self.hall, 0),
+            self.item(self.garden, 0),
+            self.item(self.hall, 1),                       # overlaps item 0
+            self.item(self.garden, 19),                    # blocked
+            self.item(self.hall, 31),                      # already booked
+            self.item(self.hall, 5, guests_count=10_000),  # over capacity
+            self.item(self.hall, 5, end_date='bad'),
+            {**self.item(self.hall, 5), 'venue_id': 0},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 207)
+        statuses = [r['status'] for r in response.data['results']]
+        self.assertEqual(statuses, ['created', 'created'] + ['error'] * 6)
+        errors = [str(r['errors']) for r in response.data['results'][2:]]
+        self.assertIn('another booking in this request', errors[0])
+        self.assertIn('blocked', errors[1])
+        self.assertIn('already booked', errors[2])
+        self.assertIn('capacity', errors[3])
+        self.assertIn('end_date', errors[4])
+        self.assertIn('not found', errors[5])
+
+        self.assertEqual(Booking.objects.count(), 3)
+        self.assertEqual(BookingDay.objects.count(), 2 + 2 + 2)
+        self.assertFalse(availability.is_free(self.hall.id, self.start, self.start))
+        self.assertFalse(availability.is_free(self.garden.id, self.start + timedelta(days=1), self.start + timedelta(days=1)))
+        created = response.data['results'][0]['booking']
+        self.assertEqual(Booking.objects.get(id=created['id']).total_amount, 110000)
+
+    def test_validation_queries_do_not_grow_with_batch_size(self):
+        references.next_reference()  # claim a reference block up front
+
+        def queries_for(items):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post('/api/bookings/batch/', {'bookings': items}, format='json')
+            self.assertEqual(response.status_code, 201)
+            return len(queries)
+
+        small = queries_for([self.item(self.hall, 0), self.item(self.garden, 0)])
+        large = queries_for([self.item(venue, 3 + 3 * i) for i in range(10) for venue in (self.hall, self.garden)])
+        self.assertEqual(small, large)
+
+    def test_rejects_empty_and_oversized_batches(self):
+        self.assertEqual(self.client.post('/api/bookings/batch/', {'bookings': []}, format='json').status_code, 400)
+        items = [self.item(self.hall, 2 * i) for i in range(51)]
+        self.assertEqual(self.client.post('/api/bookings/batch/', {'bookings': items}, format='json').status_code, 400)
+        self.assertFalse(Booking.objects.exists())
+
+
+class BookingSeriesTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.renter = make_user('renter@example.com')
+        self.venue = make_venue(make_user('vendor@example.com', role='VENDOR'))
+        self.client.force_authenticate(self.renter)
+        self.start = timezone.now().date() + timedelta(days=10)
+
+    def payload(self, **kwargs):
+        data = {
+            'venue_id': self.venue.id, 'frequency': 'WEEKLY', 'count': 6,
+            'start_date': self.start.isoformat(), 'end_date': (self.start + timedelta(days=1)).isoformat(),
+            'guests_count': 20, 'event_type': 'CONFERENCE', 'contact_phone': '600000000',
+        }
+        data.update(kwargs)
+        return data
+
+    def test_monthly_occurrences_clamp_to_month_end(self):
+        series = BookingSeries(
+            frequency='MONTHLY', interval=1, count=4,
+            start_date=date(2031, 1, 31), end_date=date(2031, 2, 1)
+        )
+        self.assertEqual([start for start, _ in series.occurrences()], [
+            date(2031, 1, 31), date(2031, 2, 28), date(2031, 3, 31), date(2031, 4, 30)
+        ])
+
+    def test_conflicts_are_found_with_one_query(self):
+        make_booking(self.venue, self.renter, self.start + timedelta(weeks=1), self.start + timedelta(weeks=1)).save()
+        BlockedDate.objects.create(venue=self.venue, date=self.start + timedelta(weeks=3, days=1))
+        ranges = BookingSeries(
+            frequency='WEEKLY', interval=1, count=52,
+            start_date=self.start, end_date=self.start + timedelta(days=1)
+        ).occurrences()
+        with self.assertNumQueries(1):
+            conflicts = find_conflicts(self.venue.id, ranges)
+        self.assertEqual(conflicts, {1: 'already booked', 3: 'blocked'})
+
+    def test_creates_free_occurrences_and_reports_skipped(self):
+        make_booking(self.venue, self.renter, self.start + timedelta(weeks=2), self.start + timedelta(weeks=2)).save()
+        response = self.client.post('/api/booking-series/', self.payload(), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['bookings']), 5)
+        self.assertEqual(response.data['skipped'], [{
+            'start_date': self.start + timedelta(weeks=2),
+            'end_date': self.start + timedelta(weeks=2, days=1),
+            'reason': 'already booked',
+        }])
+        series = BookingSeries.objects.get()
+        self.assertEqual(series.bookings.count(), 5)
+        self.assertEqual(BookingDay.objects.filter(booking__series=series).count(), 10)
+        self.assertFalse(availability.is_free(self.venue.id, self.start + timedelta(weeks=5), self.start + timedelta(weeks=5)))
+        
+        response = self.client.get(f'/api/booking-series/{series.id}/')
+        self.assertEqual(len(response.data['bookings']), 5)
+        self.assertNotIn('skipped', response.data)
+
+    def test_rejects_overlapping_occurrences_and_fully_booked_series(self):
+        response = self.client.post('/api/booking-series/', self.payload(
+            end_date=(self.start + timedelta(days=7)).isoformat()
+        ), format='json')
+        self.assertEqual(response.status_code, 400)
+        
+        make_booking(self.venue, self.renter, self.start, self.start + timedelta(weeks=6)).save()
+        response = self.client.post('/api/booking-series/', self.payload(), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(BookingSeries.objects.exists())
+
+
+class MyBookingsTests(TestCase):
+    def setUp(self):
+        self.renter = make_user('renter@example.com')
+        self.venue = make_venue(make_user('vendor@example.com', role='VENDOR'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.renter)
+        today = timezone.now().date()
+        # 6 pending upcoming, 3 cancelled, 4 completed in the past
+        for i, status in enumerate(['PENDING'] * 6 + ['CANCELLED'] * 3):
+            start = today + timedelta(days=10 + 3 * i)
+            make_booking(self.venue, self.renter, start, start + timedelta(days=1), status=status).save()
+        for i in range(4):
+            start = today - timedelta(days=30 + 3 * i)
+            make_booking(self.venue, self.renter, start, start + timedelta(days=1), status='COMPLETED').save()
+
+    def test_buckets_are_counted_limited_and_fetched_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/bookings/my_bookings/', {'limit': 4})
+        self.assertEqual(response.status_code, 200)
+        # Count aggregate plus one pass over the rows
+        self.assertEqual(len([q for q in queries if 'bookings' in q['sql']]), 2)
+        data = response.data
+        self.assertEqual({name: data[name]['count'] for name in data},
+                         {'upcoming': 6, 'past': 4, 'pending': 6, 'cancelled': 3})
+        self.assertEqual([len(data[name]['results']) for name in data], [4, 4, 4, 3])
+        self.assertIsNone(data['past']['next'])
+        self.assertIsNone(data['cancelled']['next'])
+        # Pending upcoming rows appear in both buckets as the same serialized row
+        self.assertIs(data['upcoming']['results'][0], data['pending']['results'][0])
+
+        seen = [b['id'] for b in data['upcoming']['results']]
+        response = self.client.get(data['upcoming']['next'])
+        self.assertIsNone(response.data['next'])
+        seen += [b['id'] for b in response.data['results']]
+        expected = Booking.objects.filter(status='PENDING').order_by('-created_at', '-id').values_list('id', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_small_recent_bucket_does_not_scan_the_history(self):
+        renter = make_user('regular@example.com')
+        self.client.force_authenticate(renter)
+        today = timezone.now().date()
+        for i in range(30):
+            start = today - timedelta(days=100 + 3 * i)
+            make_booking(self.venue, renter, start, start, status='COMPLETED').save()
+        make_booking(self.venue, renter, today + timedelta(days=60), today + timedelta(days=60),
+                     status='CANCELLED').save()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/bookings/my_bookings/', {'limit': 2})
+        # Count aggregate plus the first chunk of 4 * limit rows, which holds
+        # the only cancelled booking (the newest) and enough past ones
+        self.assertEqual(len([q for q in queries if 'bookings' in q['sql']]), 2)
+        data = response.data
+        self.assertEqual({name: data[name]['count'] for name in data},
+                         {'upcoming': 0, 'past': 30, 'pending': 0, 'cancelled': 1})
+        self.assertEqual([len(data[name]['results']) for name in data], [0, 2, 0, 1])
+        self.assertIsNotNone(data['past']['next'])
+        self.assertIsNone(data['cancelled']['next'])
+
+    def test_unknown_bucket_is_rejected(self):
+        self.assertEqual(self.client.get('/api/bookings/my_bookings/', {'bucket': 'all'}).status_code, 400)
+
+
+class VendorStatsTests(TestCase):
+    def setUp(self):
+        self.vendor = make_user('vendor@example.com', role='VENDOR')
+        self.renter = make_user('renter@example.com')
+        self.venue = make_venue(self.vendor)
+        self.start = timezone.now().date() + timedelta(days=10)
+
+    def book(self, offset, **kwargs):
+        start = self.start + timedelta(days=offset)
+        booking = make_booking(self.venue, self.renter, start, start, subtotal=1000, total_amount=1100, **kwargs)
+        booking.save()
+        return booking
+
+    def assertStatsMatchSource(self):
+        row = VendorStats.objects.get(vendor=self.vendor)
+        self.assertEqual(
+            {field: getattr(row, field) for field in stats.compute([self.vendor.pk])[self.vendor.pk]},
+            stats.compute([self.vendor.pk])[self.vendor.pk]
+        )
+        self.assertEqual(
+            {(m.vendor_id, m.month): m.earnings for m in VendorMonthlyEarnings.objects.filter(earnings__gt=0)},
+            stats.compute_months([self.vendor.pk])
+        )
+
+    def test_totals_follow_bookings_and_venues(self):
+        first, second, third = self.book(0), self.book(2), self.book(4)
+        first.status = 'COMPLETED'
+        first.save()
+        second.status = 'CANCELLED'
+        second.save()
+        make_venue(self.vendor, 'Garden')
+        self.assertStatsMatchSource()
+        row = VendorStats.objects.get(vendor=self.vendor)
+        self.assertEqual((row.total_earnings, row.pending_bookings, row.total_bookings, row.total_venues),
+                         (1000, 1, 3, 2))
+
+        third.delete()
+        first.delete()
+        self.assertStatsMatchSource()
+
+    def test_bulk_inserted_bookings_are_counted(self):
+        client = APIClient()
+        client.force_authenticate(self.renter)
+        items = [{
+            'venue_id': self.venue.id, 'start_date': (self.start + timedelta(days=3 * i)).isoformat(),
+            'end_date': (self.start + timedelta(days=3 * i + 1)).isoformat(), 'guests_count': 5,
+            'event_type': 'OTHER', 'contact_phone': '600000000',
+        } for i in range(3)]
+        self.assertEqual(client.post('/api/bookings/batch/', {'bookings': items}, format='json').status_code, 201)
+        self.assertEqual(VendorStats.objects.get(vendor=self.vendor).pending_bookings, 3)
+        self.assertStatsMatchSource()
+
+    def test_venue_transfer_moves_totals(self):
+        self.book(0, status='COMPLETED')
+        new_owner = make_user('other@example.com', role='VENDOR')
+        self.venue.owner = new_owner
+        self.venue.save()
+        self.assertEqual(VendorStats.objects.get(vendor=self.vendor).total_earnings, 0)
+        self.assertEqual(VendorStats.objects.get(vendor=new_owner).total_earnings, 1000)
+        self.assertEqual(VendorStats.objects.get(vendor=new_owner).total_venues, 1)
+        self.assertEqual(list(Booking.objects.values_list('vendor', flat=True)), [new_owner.pk])
+
+    def test_vendor_booking_list_needs_no_venue_join(self):
+        self.assertEqual(self.book(0).vendor_id, self.vendor.pk)
+        client = APIClient()
+        client.force_authenticate(self.vendor)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/vendor/bookings/')
+        self.assertEqual(len(response.data['pending']), 1)
+        listing = next(q['sql'] for q in queries if q['sql'].startswith('SELECT "bookings"'))
+        self.assertIn('"bookings"."vendor_id" = %d' % self.vendor.pk, listing)
+        self.assertNotIn('"venues"."owner_id" =', listing)
+
+    def test_dashboard_reads_stats_row(self):
+        self.book(0, status='COMPLETED')
+        self.book(2)
+        VendorStats.objects.all().delete()  # a missing row is rebuilt on first read
+        client = APIClient()
+        client.force_authenticate(self.vendor)
+        client.get('/api/vendor/dashboard/')
+        with self.assertNumQueries(2):
+            response = client.get('/api/vendor/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_earnings'], 1000.0)
+        self.assertEqual(response.data['this_month_earnings'], 1000.0)
+        self.assertEqual(response.data['pending_bookings'], 1)
+        self.assertEqual(response.data['total_bookings'], 2)
+        self.assertEqual(response.data['total_venues'], 1)
+        self.assertEqual(len(response.data['recent_bookings']), 2)
+
+
+class BookingTransitionTests(TestCase):
+    def setUp(self):
+        self.vendor = make_user('vendor@example.com', role='VENDOR')
+        self.renter = make_user('renter@example.com')
+        self.venue = make_venue(self.vendor)
+        self.start = timezone.now().date() + timedelta(days=10)
+        self.bookings = []
+        for i in range(4):
+            booking = make_booking(self.venue, self.renter, self.start + timedelta(days=2 * i), self.start + timedelta(days=2 * i))
+            booking.save()
+            self.bookings.append(booking)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_transition_is_one_conditional_update(self):
+        booking = self.bookings[0]
+        with CaptureQueriesContext(connection) as queries:
+            transitions.transition(booking.pk, 'CONFIRMED', self.vendor)
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "bookings"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"status" = \'PENDING\'', updates[0])
+        self.assertNotIn('"guests_count"', updates[0])
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'CONFIRMED')
+        self.assertIsNotNone(booking.confirmed_at)
+
+    def test_endpoints_check_actor_and_source_status(self):
+        booking = self.bookings[0]
+        vendor, renter = self.client_for(self.vendor), self.client_for(self.renter)
+        url = f'/api/bookings/{booking.pk}/'
+        self.assertEqual(renter.patch(url + 'update_status/', {'status': 'CONFIRMED'}).status_code, 403)
+        self.assertEqual(vendor.patch(url + 'update_status/', {'status': 'COMPLETED'}).status_code, 400)
+        self.assertEqual(vendor.patch(url + 'update_status/', {'status': 'CONFIRMED'}).status_code, 200)
+        self.assertEqual(vendor.post(url + 'cancel/').status_code, 403)
+        stranger = self.client_for(make_user('stranger@example.com'))
+        self.assertEqual(stranger.post(url + 'cancel/').status_code, 404)
+
+        response = renter.post(url + 'cancel/', {'reason': 'Change of plans'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'CANCELLED')
+        self.assertEqual(renter.post(url + 'cancel/').data['error'], 'Cannot cancel this booking')
+        # Cancelling released the days and updated the stats
+        self.assertFalse(BookingDay.objects.filter(booking=booking).exists())
+        self.assertTrue(availability.is_free(self.venue.id, booking.start_date, booking.end_date))
+        self.assertEqual(VendorStats.objects.get(vendor=self.vendor).pending_bookings, 3)
+
+    def test_bulk_transition_reports_updated_and_skipped(self):
+        other_venue = make_venue(make_user('other@example.com', role='VENDOR'), 'Other')
+        foreign = make_booking(other_venue, self.renter, self.start, self.start)
+        foreign.save()
+        transitions.transition(self.bookings[3].pk, 'CONFIRMED', self.vendor)
+        ids = [b.pk for b in self.bookings] + [foreign.pk]
+        response = self.client_for(self.vendor).post('/api/bookings/bulk_status/', {
+            'ids': ids, 'status': 'REJECTED', 'rejection_reason': 'Closed for works',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], [b.pk for b in self.bookings[:3]])
+        self.assertEqual(response.data['skipped'], [self.bookings[3].pk, foreign.pk])
+        self.assertEqual(Booking.objects.filter(status='REJECTED', rejection_reason='Closed for works').count(), 3)
+        self.assertEqual(BookingDay.objects.filter(venue=self.venue).count(), 1)
+        row = VendorStats.objects.get(vendor=self.vendor)
+        self.assertEqual((row.pending_bookings, row.total_bookings), (0, 4))
+
+
+class BookingTransitionConcurrencyTests(TransactionTestCase):
+    def test_concurrent_transitions_apply_once(self):
+        vendor = make_user('vendor@example.com', role='VENDOR')
+        renter = make_user('renter@example.com')
+        venue = make_venue(vendor)
+        start = timezone.now().date() + timedelta(days=10)
+        booking = make_booking(venue, renter, start, start + timedelta(days=2))
+        booking.save()
+
+        attempts = [('CONFIRMED', vendor)] * 3 + [('CANCELLED', renter)] * 3
+        barrier = threading.Barrier(len(attempts))
+        winners = []
+
+        def attempt(new_status, user):
+            barrier.wait()
+            try:
+                for _ in range(200):
+                    try:
+                        transitions.transition(booking.pk, new_status, user)
+                        winners.append(new_status)
+                        return
+                    except transitions.TransitionError:
+                        return
+                    except OperationalError:
+                        time.sleep(0.005)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt, args=args) for args in attempts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        booking.refresh_from_db()
+        if winners == ['CONFIRMED']:
+            self.assertEqual(booking.status, 'CONFIRMED')
+        else:
+            # Confirm first then cancel is the only way for two transitions to both succeed
+            self.assertIn(winners, [['CANCELLED'], ['CONFIRMED', 'CANCELLED']])
+            self.assertEqual(booking.status, 'CANCELLED')
+        self.assertEqual(BookingDay.objects.count(), 3 if booking.status == 'CONFIRMED' else 0)
+        self.assertEqual(VendorStats.objects.get(vendor=vendor).pending_bookings, 0)
+
+
+class BookingSweeperTests(TestCase):
+    def setUp(self):
+        self.vendor = make_user('vendor@example.com', role='VENDOR')
+        self.renter = make_user('renter@example.com')
+        self.venue = make_venue(self.vendor)
+        self.today = timezone.localdate()
+
+    def book(self, offset, status='PENDING', age_hours=0):
+        start = self.today + timedelta(days=offset)
+        booking = make_booking(self.venue, self.renter, start, start, status=status, subtotal=1000)
+        booking.save()
+        if age_hours:
+            Booking.objects.filter(pk=booking.pk).update(created_at=timezone.now() - timedelta(hours=age_hours))
+        return booking
+
+    def test_sweeps_finished_and_stale_bookings_in_batches(self):
+        finished = [self.book(-3 - i, 'CONFIRMED') for i in range(3)]
+        upcoming = self.book(5, 'CONFIRMED')
+        stale = self.book(10, age_hours=100)
+        missed = self.book(-1)
+        fresh = self.book(12, age_hours=1)
+
+        self.assertEqual(sweeper.complete_finished(batch_size=2), 3)
+        self.assertEqual(sweeper.expire_stale(batch_size=2, ttl=timedelta(hours=72)), 2)
+        statuses = dict(Booking.objects.values_list('pk', 'status'))
+        self.assertEqual([statuses[b.pk] for b in finished], ['COMPLETED'] * 3)
+        self.assertEqual([statuses[b.pk] for b in (upcoming, stale, missed, fresh)],
+                         ['CONFIRMED', 'EXPIRED', 'EXPIRED', 'PENDING'])
+        self.assertFalse(BookingDay.objects.filter(booking__in=[stale, missed]).exists())
+        self.assertTrue(availability.is_free(self.venue.id, stale.start_date, stale.end_date))
+        row = VendorStats.objects.get(vendor=self.vendor)
+        self.assertEqual((row.total_earnings, row.pending_bookings), (3000, 1))
+
+        # Moved rows no longer match, so a rerun has nothing left to do
+        self.assertEqual(sweeper.complete_finished(), 0)
+        self.assertEqual(sweeper.expire_stale(ttl=timedelta(hours=72)), 0)
+
+    def test_command_dry_run_only_counts(self):
+        self.book(-2, 'CONFIRMED')
+        self.book(10, age_hours=100)
+        out = StringIO()
+        call_command('sweep_bookings', '--dry-run', '--ttl-hours=72', stdout=out)
+        self.assertIn('Would complete 1 and expire 1 bookings', out.getvalue())
+        self.assertFalse(Booking.objects.exclude(status__in=['PENDING', 'CONFIRMED']).exists())
+
+        call_command('sweep_bookings', '--ttl-hours=72', stdout=out)
+        self.assertEqual(sorted(Booking.objects.values_list('status', flat=True)), ['COMPLETED', 'EXPIRED'])
+
+
+class BookingListPaginationTests(TestCase):
+    def test_pages_through_renter_bookings(self):
+        vendor = make_user('vendor@example.com', role='VENDOR')
+        renter = make_user('renter@example.com')
+        venue = make_venue(vendor)
+        start = timezone.now().date()
+        for i in range(7):
+            Booking.objects.create(
+                venue=venue, renter=renter, start_date=start + timedelta(days=3 * i),
+                end_date=start + timedelta(days=3 * i + 1), guests_count=5, event_type='OTHER',
+                contact_phone='600000000', subtotal=0, commission=0, deposit_amount=0, total_amount=0
+            )
+        client = APIClient()
+        client.force_authenticate(renter)
+        response = client.get('/api/bookings/', {'page_size': 3, 'ordering': 'start_date'})
+        ids = []
+        while True:
+            ids.extend(b['id'] for b in response.data['results'])
+            if not response.data['next']:
+                break
+            response = client.get(response.data['next'])
+        self.assertEqual(ids, list(Booking.objects.order_by('start_date', 'id').values_list('id', flat=True)))
+
+
+def make_booking(venue, renter, start, end, **kwargs):
+    fields = dict(
+        guests_count=5, event_type='OTHER', contact_phone='600000000',
+        subtotal=0, commission=0, deposit_amount=0, total_amount=0,
+    )
+    fields.update(kwargs)
+    return Booking(venue=venue, renter=renter, start_date=start, end_date=end, **fields)
+
+
+class BookingReferenceTests(TestCase):
+    def setUp(self):
+        # Start each test without a block claimed by an earlier one
+        references._block.next = references._block.end = 0
+        references._block.pending = None
+
+    @override_settings(BOOKING_REFERENCE_BLOCK_SIZE=100)
+    def test_references_are_unique_and_claimed_in_blocks(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                refs = [references.next_reference() for _ in range(150)]
+        writes = [q for q in queries if q['sql'].startswith(('UPDATE', 'INSERT'))]
+        # Two blocks of 100: the first claim creates the sequence row, the second is one UPDATE
+        self.assertEqual(len(writes), 3)
+        self.assertEqual(len(set(refs)), 150)
+        self.assertTrue(all(ref.startswith('BK-') and len(ref) == 11 for ref in refs))
+        # Consecutive sequence values do not give neighbouring references
+        self.assertNotEqual(refs[0][:-1], refs[1][:-1])
+
+    def test_permutation_is_a_bijection(self):
+        key = b'k' * 32
+        values = range(0, 1 << references.VALUE_BITS, (1 << references.VALUE_BITS) // 5000 + 7)
+        self.assertEqual(len({references.permute(v, key) for v in values}), len(values))
+
+    def test_block_claimed_in_rolled_back_transaction_is_dropped(self):
+        try:
+            with transaction.atomic():
+                first = references.next_value()
+                references.next_value()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        # The claim was rolled back, so the same block is claimed again, from the start
+        self.assertEqual(references.next_value(), first)
+
+
+class BookingLedgerTests(TestCase):
+    def setUp(self):
+        self.renter = make_user('renter@example.com')
+        self.venue = make_venue(make_user('vendor@example.com', role='VENDOR'))
+        self.start = timezone.now().date() + timedelta(days=10)
+
+    def test_ledger_follows_booking_status(self):
+        booking = make_booking(self.venue, self.renter, self.start, self.start + timedelta(days=2))
+        booking.save()
+        self.assertEqual(BookingDay.objects.filter(booking=booking).count(), 3)
+        
+        booking.status = 'CANCELLED'
+        booking.save()
+        self.assertFalse(BookingDay.objects.exists())
+        
+        # The freed days can be booked again
+        make_booking(self.venue, self.renter, self.start, self.start).save()
+        self.assertEqual(BookingDay.objects.count(), 1)
+
+    def test_overlapping_save_is_rolled_back(self):
+        make_booking(self.venue, self.renter, self.start, self.start + timedelta(days=2)).save()
+        clash = make_booking(self.venue, self.renter, self.start + timedelta(days=2), self.start + timedelta(days=4))
+        with self.assertRaises(ledger.DatesTaken):
+            clash.save()
+        self.assertIsNone(clash.pk)
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(BookingDay.objects.count(), 3)
+
+    def test_moving_to_another_venue_moves_days_and_vendor(self):
+        other_vendor = make_user('other-vendor@example.com', role='VENDOR')
+        other = make_venue(other_vendor, name='Garden')
+        end = self.start + timedelta(days=2)
+        booking = make_booking(self.venue, self.renter, self.start, end)
+        booking.save()
+
+        booking = Booking.objects.get(pk=booking.pk)
+        booking.venue = other
+        booking.save()
+        self.assertEqual(booking.vendor_id, other_vendor.pk)
+        self.assertEqual(set(BookingDay.objects.values_list('venue_id', flat=True)), {other.pk})
+        self.assertTrue(availability.is_free(self.venue.pk, self.start, end))
+        self.assertFalse(availability.is_free(other.pk, self.start, end))
+        self.assertEqual(
+            dict(VendorStats.objects.values_list('vendor_id', 'pending_bookings')),
+            {self.venue.owner_id: 0, other_vendor.pk: 1},
+        )
+        # The old venue's days can be booked again
+        make_booking(self.venue, self.renter, self.start, end).save()
+
+    def test_overlap_check_reads_active_bookings_by_end_date(self):
+        active = make_booking(self.venue, self.renter, self.start, self.start + timedelta(days=2))
+        active.save()
+        make_booking(self.venue, self.renter, self.start - timedelta(days=30), self.start + timedelta(days=1),
+                     status='COMPLETED').save()
+        overlapping = Booking.objects.filter(
+            venue=self.venue, status__active=True, start_date__lte=self.start + timedelta(days=5),
+            end_date__gte=self.start + timedelta(days=1),
+        ).order_by()
+        self.assertEqual(list(overlapping), [active])
+        self.assertEqual(Booking.objects.filter(status__active=False).count(), 1)
+        if connection.vendor == 'sqlite':
+            self.assertIn('bookings_active_span_idx', overlapping.explain())
+
+    def test_overlap_migration_lists_existing_overlaps(self):
+        migration = import_module('booking.migrations.0010_booking_active_overlap')
+        make_booking(self.venue, self.renter, self.start, self.start + timedelta(days=2)).save()
+        # Rows from before the ledger, which nothing checked
+        Booking.objects.bulk_create([
+            make_booking(self.venue, self.renter, self.start + timedelta(days=2), self.start + timedelta(days=3),
+                         booking_reference='OLD-1', vendor=self.venue.owner),
+            make_booking(self.venue, self.renter, self.start, self.start, status='CANCELLED',
+                         booking_reference='OLD-2', vendor=self.venue.owner),
+        ])
+        held = Booking.objects.order_by('pk').first().booking_reference
+        self.assertEqual(migration.active_overlaps(connection), [(self.venue.pk, held, 'OLD-1')])
+
+
+class BookingLedgerConcurrencyTests(TransactionTestCase):
+    THREADS = 8
+
+    def test_concurrent_overlapping_bookings_commit_once(self):
+        renter = make_user('renter@example.com')
+        venue = make_venue(make_user('vendor@example.com', role='VENDOR'))
+        start = timezone.now().date() + timedelta(days=10)
+        barrier = threading.Barrier(self.THREADS)
+        outcomes = []
+
+        def attempt(offset):
+            # Every attempt overlaps the others on day start + 3
+            booking = make_booking(venue, renter, start + timedelta(days=offset), start + timedelta(days=offset + 3))
+            barrier.wait()
+            try:
+                for _ in range(200):
+                    try:
+                        booking.save()
+                        outcomes.append('booked')
+                        return
+                    except ledger.DatesTaken:
+                        outcomes.append('rejected')
+                        return
+                    except OperationalError:
+                        # SQLite allows one writer; wait for the lock and retry
+                        time.sleep(0.005)
+                outcomes.append('gave up')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt, args=(i % 4,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(outcomes), ['booked'] + ['rejected'] * (self.THREADS - 1))
+        booking = Booking.objects.get()
+        self.assertEqual(
+            list(BookingDay.objects.order_by('day').values_list('day', flat=True)),
+            [booking.start_date + timedelta(days=n) for n in range(4)]
+        )
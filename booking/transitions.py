@@ -0,0 +1,147 @@
+"""
+Booking status state machine.
+
+Each transition is one conditional UPDATE:
+
+    UPDATE bookings SET status = ..., <timestamp> = ..., updated_at = ...
+    WHERE id = ? AND status = <allowed source> AND <actor owns the booking>
+
+Only the changed columns are written, and the affected-row count decides
+whether the transition happened. Of two concurrent transitions on one
+booking, the second matches no row and fails cleanly instead of
+overwriting the first. The booking row is read only afterwards, to build
+the response. Queryset updates send no signals, so the side effects (ledger,
+occupancy bitmap, response cache, vendor stats) are applied here.
+"""
+from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
+from venues import availability, cache
+from venues.availability import ACTIVE_BOOKING_STATUSES
+from . import ledger, stats
+from .models import Booking
+
+VENDOR = 'vendor'
+RENTER = 'renter'
+
+# new status: (allowed source statuses, who may apply it, timestamp field to set)
+TRANSITIONS = {
+    'CONFIRMED': (['PENDING'], VENDOR, 'confirmed_at'),
+    'REJECTED': (['PENDING'], VENDOR, None),
+    'COMPLETED': (['CONFIRMED'], VENDOR, 'completed_at'),
+    'CANCELLED': (['PENDING', 'CONFIRMED'], RENTER, None),
+}
+VENDOR_STATUSES = [name for name, (_, actor, _) in TRANSITIONS.items() if actor == VENDOR]
+
+
+class TransitionError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def _actor_filter(actor, user):
+    return {'vendor': user} if actor == VENDOR else {'renter': user}
+
+
+def _changes(new_status, timestamp_field, reason):
+    now = timezone.now()
+    changes = {'status': new_status, 'updated_at': now}
+    if timestamp_field:
+        changes[timestamp_field] = now
+    if reason is not None:
+        changes['rejection_reason'] = reason
+    return changes
+
+
+def move(booking_ids, old_status, changes):
+    """Apply ``changes`` (status, updated_at, ...) to the listed bookings still in ``old_status``.
+
+    Returns the moved bookings, reloaded, after applying their side effects.
+    Run inside a transaction.
+    """
+    if not Booking.objects.filter(pk__in=booking_ids, status=old_status).update(**changes):
+        return []
+    # updated_at marks this UPDATE's rows, in case another transition got in
+    # without a row lock (SQLite) and moved one of them first
+    moved = list(Booking.objects.filter(
+        pk__in=booking_ids, status=changes['status'], updated_at=changes['updated_at']
+    ))
+    _after_transition(moved, old_status)
+    return moved
+
+
+def _after_transition(bookings, old_status):
+    """Side effects of moving ``bookings`` (reloaded, new status) out of ``old_status``."""
+    if not bookings:
+        return
+    new_status = bookings[0].status
+    if (old_status in ACTIVE_BOOKING_STATUSES) != (new_status in ACTIVE_BOOKING_STATUSES):
+        ledger.release([b.pk for b in bookings])
+        spans = {}
+        for booking in bookings:
+            first, last = spans.get(booking.venue_id, (booking.start_date, booking.end_date))
+            spans[booking.venue_id] = (min(first, booking.start_date), max(last, booking.end_date))
+        for venue_id, (first, last) in sorted(spans.items()):
+            availability.refresh(venue_id, first, last)
+        cache.bump(spans)
+    stats.record_transition(bookings, old_status)
+
+
+def _explain_failure(booking_id, new_status, user):
+    """Why a transition matched no row (only queried on failure)."""
+    sources, actor, _ = TRANSITIONS[new_status]
+    row = Booking.objects.filter(pk=booking_id).values('status', 'renter_id', 'vendor_id').first()
+    if row is None or user.pk not in (row['renter_id'], row['vendor_id']):
+        return TransitionError('Booking not found', 404)
+    if actor == VENDOR and row['vendor_id'] != user.pk:
+        return TransitionError('Only venue owner can update booking status', 403)
+    if actor == RENTER and row['renter_id'] != user.pk:
+        return TransitionError('Only the renter can cancel this booking', 403)
+    return TransitionError(f"Cannot change a {row['status'].lower()} booking to {new_status.lower()}")
+
+
+def transition(booking_id, new_status, user, reason=None):
+    """Move one booking to ``new_status`` on behalf of ``user``; returns the updated booking.
+
+    Raises TransitionError when the status is unknown, the user may not apply
+    it, or the booking is not in an allowed source status (anymore).
+    """
+    if new_status not in TRANSITIONS:
+        raise TransitionError('Invalid status')
+    sources, actor, timestamp_field = TRANSITIONS[new_status]
+    bookings = Booking.objects.filter(pk=booking_id, **_actor_filter(actor, user))
+    changes = _changes(new_status, timestamp_field, reason)
+    with transaction.atomic():
+        for old_status in sources:
+            if bookings.filter(status=old_status).update(**changes):
+                booking = Booking.objects.select_related('venue', 'renter').get(pk=booking_id)
+                _after_transition([booking], old_status)
+                return booking
+    raise _explain_failure(booking_id, new_status, user)
+
+
+def bulk_transition(booking_ids, new_status, user, reason=None):
+    """Apply ``new_status`` to every listed booking it is allowed for.
+
+    Returns (updated ids, skipped ids). Bookings are locked while they are
+    selected, where the database supports row locks, so a concurrent
+    transition cannot slip in between the SELECT and the conditional UPDATE.
+    """
+    if new_status not in TRANSITIONS:
+        raise TransitionError('Invalid status')
+    sources, actor, timestamp_field = TRANSITIONS[new_status]
+    changes = _changes(new_status, timestamp_field, reason)
+    candidates = Booking.objects.filter(pk__in=booking_ids, **_actor_filter(actor, user))
+    updated = []
+    with transaction.atomic():
+        by_status = defaultdict(list)
+        for pk, status in candidates.filter(status__in=sources).select_for_update(of=('self',)).values_list(
+            'pk', 'status'
+        ):
+            by_status[status].append(pk)
+        for old_status, ids in by_status.items():
+            updated.extend(b.pk for b in move(ids, old_status, changes))
+    updated_ids = set(updated)
+    return sorted(updated_ids), sorted(set(booking_ids) - updated_ids)
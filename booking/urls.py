@@ -2,13 +2,16 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import BookingViewSet
+from .views import BookingViewSet, BookingSeriesViewSet, vendor_dashboard, vendor_bookings
 
 
 
 router = DefaultRouter()
 router.register(r'bookings', BookingViewSet, basename='booking')
+router.register(r'booking-series', BookingSeriesViewSet, basename='booking-series')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('vendor/dashboard/', vendor_dashboard, name='vendor-dashboard'),
+    path('vendor/bookings/', vendor_bookings, name='vendor-bookings'),
 ]
@@ -1,22 +1,38 @@
 
-from rest_framework import viewsets, status
+from rest_framework import viewsets, mixins, status, filters
 from rest_framework.decorators import api_view, action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
-from django.db.models import Sum, Q
-from .models import Booking
+from decimal import Decimal
+from django.db.models import (
+    Q, Prefetch, Count, BooleanField, DecimalField, ExpressionWrapper, OuterRef, Subquery, Value,
+)
+from django.db.models.functions import Coalesce
+from rest_framework.utils.urls import replace_query_param
+from config.pagination import KeysetPagination
+from config.routers import use_primary
+from .models import Booking, BookingSeries, VendorStats, VendorMonthlyEarnings
+from . import ledger, stats, transitions
+from .batch import MAX_BATCH_SIZE, create_batch
 from .serializers import (
     BookingCreateSerializer,
     BookingDetailSerializer,
     BookingListSerializer,
+    BookingSeriesSerializer,
 )
 
 class BookingViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['status', 'event_type']
+    ordering_fields = ['created_at', 'start_date', 'total_amount']
+    pagination_class = KeysetPagination
+    # Rows per bucket in my_bookings before its "next" link takes over
+    MY_BOOKINGS_LIMIT = 10
+    MY_BOOKINGS_MAX_LIMIT = 100
+    BULK_STATUS_MAX_IDS = 200
     
     def get_queryset(self):
         user = self.request.user
@@ -24,7 +40,7 @@ class BookingViewSet(viewsets.ModelViewSet):
         if user.role == 'RENTER':
             return Booking.objects.filter(renter=user).select_related('venue', 'renter')
         elif user.role == 'VENDOR':
-            return Booking.objects.filter(venue__owner=user).select_related('venue', 'renter')
+            return Booking.objects.filter(vendor=user).select_related('venue', 'renter')
         
         return Booking.objects.none()
     
@@ -35,89 +51,188 @@ class BookingViewSet(viewsets.ModelViewSet):
             return BookingListSerializer
         return BookingDetailSerializer
     
-    @action(detail=False, methods=['get'])
-    def my_bookings(self, request):
-        bookings = self.get_queryset()
-        today = timezone.now().date()
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        items = request.data.get('bookings')
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'bookings must be a non-empty list'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > MAX_BATCH_SIZE:
+            return Response(
+                {'error': f'At most {MAX_BATCH_SIZE} bookings per request'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        upcoming = bookings.filter(
-            start_date__gte=today,
-            status__in=['PENDING', 'CONFIRMED']
-        )
-        past = bookings.filter(
-            Q(end_date__lt=today) | Q(status='COMPLETED')
-        )
-        pending = bookings.filter(status='PENDING')
-        cancelled = bookings.filter(status='CANCELLED')
+        try:
+            results, created = create_batch(request.user, items)
+        except ledger.DatesTaken:
+            return Response(
+                {'error': 'Some dates were booked while this request was processed; please retry'}, 
+                status=status.HTTP_409_CONFLICT
+            )
         
-        return Response({
-            'upcoming': BookingListSerializer(upcoming, many=True).data,
-            'past': BookingListSerializer(past, many=True).data,
-            'pending': BookingListSerializer(pending, many=True).data,
-            'cancelled': BookingListSerializer(cancelled, many=True).data
-        })
+        for result in results:
+            if 'booking' in result:
+                result['booking'] = BookingListSerializer(result['booking']).data
+        
+        if len(created) == len(results):
+            response_status = status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'results': results}, status=response_status)
     
-    @action(detail=True, methods=['patch'])
-    def update_status(self, request, pk=None):
-        booking = self.get_object()
+    def my_bookings_buckets(self):
+        today = timezone.now().date()
+        return {
+            'upcoming': Q(start_date__gte=today, status__in=['PENDING', 'CONFIRMED']),
+            'past': Q(end_date__lt=today) | Q(status='COMPLETED'),
+            'pending': Q(status='PENDING'),
+            'cancelled': Q(status='CANCELLED'),
+        }
+    
+    @action(detail=False, methods=['get'])
+    def my_bookings(self, request):
+        buckets = self.my_bookings_buckets()
+        bookings = self.get_queryset().order_by('-created_at', '-id')
         
-        if booking.venue.owner != request.user:
-            return Response(
-                {'error': 'Only venue owner can update booking status'}, 
-                status=status.HTTP_403_FORBIDDEN
-            )
+        # One bucket, paged with ?cursor= (the "next" links of the overview point here)
+        bucket = request.query_params.get('bucket')
+        if bucket is not None:
+            if bucket not in buckets:
+                return Response(
+                    {'error': f"bucket must be one of: {', '.join(buckets)}"}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            page = self.paginate_queryset(bookings.filter(buckets[bucket]))
+            return self.get_paginated_response(BookingListSerializer(page, many=True).data)
         
-        new_status = request.data.get('status')
-        rejection_reason = request.data.get('rejection_reason', '')
+        try:
+            limit = int(request.query_params.get('limit', self.MY_BOOKINGS_LIMIT))
+        except ValueError:
+            limit = self.MY_BOOKINGS_LIMIT
+        limit = min(max(limit, 1), self.MY_BOOKINGS_MAX_LIMIT)
         
-        if new_status == 'CONFIRMED':
-            booking.status = 'CONFIRMED'
-            booking.confirmed_at = timezone.now()
-            
-           
+        counts = bookings.aggregate(**{
+            name: Count('id', filter=condition) for name, condition in buckets.items()
+        })
         
-        elif new_status == 'REJECTED':
-            booking.status = 'REJECTED'
-            booking.rejection_reason = rejection_reason
-            
-            
-               
+        # A booking can sit in several buckets: fetch it once, flagged with each
+        # membership, and stop reading once every bucket has min(count, limit + 1)
+        # rows. Rows are read in keyset chunks so the scan stops at a chunk boundary.
+        any_bucket = Q()
+        for condition in buckets.values():
+            any_bucket |= condition
+        rows = bookings.filter(any_bucket).annotate(**{
+            f'in_{name}': ExpressionWrapper(condition, output_field=BooleanField())
+            for name, condition in buckets.items()
+        })
         
-        elif new_status == 'COMPLETED':
-            booking.status = 'COMPLETED'
-            booking.completed_at = timezone.now()
+        paginator = self.pagination_class()
+        paginator.ordering = paginator.get_ordering(bookings)
+        chunk_size = 4 * limit
+        members = {name: [] for name in buckets}
+        wanted = {name for name in buckets if counts[name]}
+        position = None
+        while wanted:
+            chunk = rows if position is None else rows.filter(paginator.keyset_filter(position, False))
+            chunk = list(chunk[:chunk_size])
+            for booking in chunk:
+                data = None
+                for name in list(wanted):
+                    if getattr(booking, f'in_{name}'):
+                        if data is None:
+                            data = BookingListSerializer(booking).data
+                        members[name].append((booking, data))
+                        if len(members[name]) >= min(counts[name], limit + 1):
+                            wanted.discard(name)
+                if not wanted:
+                    break
+            if len(chunk) < chunk_size:
+                break
+            position = paginator.position_of(chunk[-1])
         
-        else:
+        response = {}
+        for name, page in members.items():
+            next_link = None
+            if len(page) > limit:
+                page = page[:limit]
+                url = replace_query_param(request.build_absolute_uri(), 'bucket', name)
+                paginator.base_url = replace_query_param(url, paginator.page_size_query_param, limit)
+                next_link = paginator.encode_cursor(paginator.position_of(page[-1][0]), False)
+            response[name] = {
+                'count': counts[name],
+                'next': next_link,
+                'results': [data for _, data in page],
+            }
+        return Response(response)
+    
+    @action(detail=True, methods=['patch'])
+    def update_status(self, request, pk=None):
+        new_status = request.data.get('status')
+        if new_status not in transitions.VENDOR_STATUSES:
             return Response(
                 {'error': 'Invalid status'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        booking.save()
+        reason = request.data.get('rejection_reason', '') if new_status == 'REJECTED' else None
+        try:
+            booking = transitions.transition(pk, new_status, request.user, reason=reason)
+        except transitions.TransitionError as exc:
+            return Response({'error': exc.message}, status=exc.status_code)
         
         return Response(BookingDetailSerializer(booking, context={'request': request}).data)
     
-    @action(detail=True, methods=['post'])
-    def cancel(self, request, pk=None):
-        booking = self.get_object()
-        
-        if booking.renter != request.user:
+    @action(detail=False, methods=['post'])
+    def bulk_status(self, request):
+        new_status = request.data.get('status')
+        ids = request.data.get('ids')
+        if new_status not in ('CONFIRMED', 'REJECTED'):
             return Response(
-                {'error': 'Only the renter can cancel this booking'}, 
-                status=status.HTTP_403_FORBIDDEN
+                {'error': 'status must be CONFIRMED or REJECTED'}, 
+                status=status.HTTP_400_BAD_REQUEST
             )
-        
-        if booking.status in ['COMPLETED', 'CANCELLED']:
+        if (not isinstance(ids, list) or not ids or len(ids) > self.BULK_STATUS_MAX_IDS
+                or not all(isinstance(i, int) for i in ids)):
             return Response(
-                {'error': 'Cannot cancel this booking'}, 
+                {'error': f'ids must be a list of 1 to {self.BULK_STATUS_MAX_IDS} booking ids'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        booking.status = 'CANCELLED'
-        booking.rejection_reason = request.data.get('reason', 'Cancelled by renter')
-        booking.save()
-        
+        reason = request.data.get('rejection_reason', '') if new_status == 'REJECTED' else None
+        updated, skipped = transitions.bulk_transition(ids, new_status, request.user, reason=reason)
+        return Response({'updated': updated, 'skipped': skipped})
+    
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        reason = request.data.get('reason', 'Cancelled by renter')
+        try:
+            booking = transitions.transition(pk, 'CANCELLED', request.user, reason=reason)
+        except transitions.TransitionError as exc:
+            if exc.status_code == status.HTTP_400_BAD_REQUEST:
+                exc.message = 'Cannot cancel this booking'
+            return Response({'error': exc.message}, status=exc.status_code)
         
+        return Response(BookingDetailSerializer(booking, context={'request': request}).data)
+
+
+class BookingSeriesViewSet(mixins.CreateModelMixin,
+                           mixins.ListModelMixin,
+                           mixins.RetrieveModelMixin,
+                           viewsets.GenericViewSet):
+    permission_classes = [IsAuthenticated]
+    serializer_class = BookingSeriesSerializer
+    pagination_class = KeysetPagination
+    
+    def get_queryset(self):
+        return BookingSeries.objects.filter(renter=self.request.user).select_related('venue').prefetch_related(
+            Prefetch('bookings', queryset=Booking.objects.select_related('venue'))
+        )
+
 
 @api_view(['GET'])
 def vendor_dashboard(request):
@@ -127,36 +242,31 @@ def vendor_dashboard(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    from venues.models import Venue
-    
-    venues = Venue.objects.filter(owner=request.user)
-    bookings = Booking.objects.filter(venue__owner=request.user)
-    
-    this_month_start = timezone.now().replace(day=1).date()
-    this_month_bookings = bookings.filter(
-        created_at__gte=this_month_start,
-        status='COMPLETED'
-    )
-    
-    total_earnings = bookings.filter(status='COMPLETED').aggregate(
-        total=Sum('subtotal')
-    )['total'] or 0
-    
-    this_month_earnings = this_month_bookings.aggregate(
-        total=Sum('subtotal')
-    )['total'] or 0
+    def read_stats():
+        this_month = VendorMonthlyEarnings.objects.filter(
+            vendor=OuterRef('vendor'), month=stats.month_of(timezone.now())
+        ).values('earnings')[:1]
+        return VendorStats.objects.filter(vendor=request.user).annotate(
+            this_month_earnings=Coalesce(Subquery(this_month), Value(Decimal(0)), output_field=DecimalField())
+        ).first()
     
-    pending_bookings = bookings.filter(status='PENDING').count()
-    total_bookings = bookings.count()
+    vendor_stats = read_stats()
+    if vendor_stats is None:
+        # Rebuild from the primary's bookings, not a lagging replica's
+        with use_primary():
+            stats.rebuild([request.user.pk])
+            vendor_stats = read_stats()
     
-    recent_bookings = bookings.order_by('-created_at')[:5]
+    recent_bookings = Booking.objects.filter(
+        vendor=request.user
+    ).select_related('venue').order_by('-created_at')[:5]
     
     return Response({
-        'total_earnings': float(total_earnings),
-        'this_month_earnings': float(this_month_earnings),
-        'pending_bookings': pending_bookings,
-        'total_bookings': total_bookings,
-        'total_venues': venues.count(),
+        'total_earnings': float(vendor_stats.total_earnings),
+        'this_month_earnings': float(vendor_stats.this_month_earnings),
+        'pending_bookings': vendor_stats.pending_bookings,
+        'total_bookings': vendor_stats.total_bookings,
+        'total_venues': vendor_stats.total_venues,
         'recent_bookings': BookingListSerializer(recent_bookings, many=True).data
     })
 
@@ -169,8 +279,8 @@ def vendor_bookings(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    bookings = Booking.objects.filter(venue__owner=request.user).select_related('venue', 'renter')
+    bookings = Booking.objects.filter(vendor=request.user).select_related('venue', 'renter')
     
     return Response({
-        'pending': BookingListSerializer(
-            bookings.filter(status='PENDING'), many=True) })
\ No newline at end of file
+        'pending': BookingListSerializer(bookings.filter(status='PENDING'), many=True).data
+    })
\ No newline at end of file
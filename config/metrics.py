@@ -0,0 +1,188 @@
+"""
+Per-request instrumentation (METRICS_ENABLED, on by default).
+
+MetricsMiddleware tags every request with the view that served it:
+- the DRF router basename and action for viewsets (venue.list,
+  booking.my_bookings);
+- the URL name for other views (vendor-dashboard, login);
+- "unmatched" for everything else.
+
+It measures:
+
+    queries     SQL statements run, on every database alias
+    db          time spent running them
+    serializer  time spent building serializer.data
+    view        time from this middleware to the response
+
+They go back to the client in a Server-Timing header, which browser
+devtools show per request. They are also added to in-process histograms,
+which metrics_view serves at /metrics in the Prometheus text format to
+scrapers sending "Authorization: Bearer <METRICS_TOKEN>". Without a
+METRICS_TOKEN the endpoint answers 404: it exposes per-route query counts
+and latencies, so it is never public.
+
+Queries are counted with connection.execute_wrapper and serializers timed
+by wrapping BaseSerializer.data, so none of this needs DEBUG. The cost is
+a few function calls per query and one lock per request. Each process
+keeps its own histograms: with several gunicorn workers, a scrape reads
+the worker that answered it.
+"""
+import hmac
+import threading
+from bisect import bisect_left
+from contextlib import ExitStack
+from contextvars import ContextVar
+from time import perf_counter
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.series = {}  # view: [count per bucket (last one is +Inf), sum]
+
+    def observe(self, view, value):
+        series = self.series.get(view)
+        if series is None:
+            series = self.series[view] = [[0] * (len(self.buckets) + 1), 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        for view, (counts, total) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{view="{view}"}} {total:g}')
+            lines.append(f'{self.name}_count{{view="{view}"}} {cumulative}')
+        return lines
+
+
+REQUEST_SECONDS = Histogram('request_duration_seconds', 'Time to produce the response.', SECONDS_BUCKETS)
+DB_SECONDS = Histogram('request_db_seconds', 'Time spent in SQL per request.', SECONDS_BUCKETS)
+DB_QUERIES = Histogram('request_db_queries', 'SQL statements per request.', QUERY_BUCKETS)
+SERIALIZER_SECONDS = Histogram(
+    'request_serializer_seconds', 'Time spent building serializer data per request.', SECONDS_BUCKETS
+)
+HISTOGRAMS = [REQUEST_SECONDS, DB_SECONDS, DB_QUERIES, SERIALIZER_SECONDS]
+_lock = threading.Lock()
+
+
+class _RequestMetrics:
+    __slots__ = ('view', 'queries', 'db_time', 'serializer_time', 'serializing')
+
+    def __init__(self):
+        self.view = 'unmatched'
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += perf_counter() - started
+            self.queries += 1
+
+
+_state = ContextVar('request_metrics', default=None)
+
+
+def _install_serializer_timing():
+    from rest_framework.serializers import BaseSerializer
+
+    data = BaseSerializer.data
+    if getattr(data.fget, 'timed', False):
+        return
+
+    def timed_data(self):
+        metrics = _state.get()
+        # Serializers nested through .data are part of the outer one's time
+        if metrics is None or metrics.serializing:
+            return data.fget(self)
+        metrics.serializing = True
+        started = perf_counter()
+        try:
+            return data.fget(self)
+        finally:
+            metrics.serializer_time += perf_counter() - started
+            metrics.serializing = False
+
+    timed_data.timed = True
+    BaseSerializer.data = property(timed_data)
+
+
+def view_name(request, view_func):
+    actions = getattr(view_func, 'actions', None)
+    if actions:
+        action = actions.get(request.method.lower(), request.method.lower())
+        return f"{view_func.initkwargs.get('basename')}.{action}"
+    match = request.resolver_match
+    return (match.url_name or match.view_name) if match else 'unmatched'
+
+
+def record(metrics, elapsed):
+    with _lock:
+        REQUEST_SECONDS.observe(metrics.view, elapsed)
+        DB_SECONDS.observe(metrics.view, metrics.db_time)
+        DB_QUERIES.observe(metrics.view, metrics.queries)
+        SERIALIZER_SECONDS.observe(metrics.view, metrics.serializer_time)
+
+
+def render():
+    with _lock:
+        lines = [line for histogram in HISTOGRAMS for line in histogram.render()]
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        _install_serializer_timing()
+
+    def __call__(self, request):
+        metrics = _RequestMetrics()
+        token = _state.set(metrics)
+        started = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        elapsed = perf_counter() - started
+        record(metrics, elapsed)
+        response['Server-Timing'] = (
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries", '
+            f'serializer;dur={metrics.serializer_time * 1000:.1f}, '
+            f'view;dur={elapsed * 1000:.1f}'
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _state.get().view = view_name(request, view_func)
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    if not token:
+        raise Http404
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
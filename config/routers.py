@@ -0,0 +1,107 @@
+"""
+Read-replica routing (replicas come from DATABASE_REPLICA_URLS, see
+config/database.py).
+
+Reads go to a replica only inside a request that ReplicaMiddleware let
+through as read-only: a GET, HEAD or OPTIONS without the stickiness
+cookie. That covers the public venue list, retrieve, featured and
+availability reads, and the vendor dashboard. Everything else uses the
+primary:
+- unsafe requests;
+- the rest of a request once it has written;
+- reads inside a transaction;
+- code run outside requests, such as management commands and the sweeper.
+Code that reads and then writes therefore never decides on replica data.
+
+A request that wrote sets a cookie lasting REPLICA_STICKY_SECONDS. While
+it lasts, that client's reads stay on the primary, so a renter sees the
+booking they just made even while the replicas lag behind.
+
+Locally, two SQLite files can stand in for a primary and a replica:
+
+    DATABASE_URL=sqlite:///primary.sqlite3
+    DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class _RequestState:
+    __slots__ = ('use_replica', 'wrote')
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+_state = ContextVar('replica_routing', default=None)
+
+
+@contextmanager
+def use_primary():
+    """Send the reads in the block to the primary."""
+    state = _state.get()
+    if state is None or not state.use_replica:
+        yield
+        return
+    state.use_replica = False
+    try:
+        yield
+    finally:
+        # A write in the block keeps the rest of the request on the primary
+        state.use_replica = not state.wrote
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (
+            state is None or not state.use_replica or not settings.DATABASE_REPLICAS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            # The rest of this request reads its own writes
+            state.wrote = True
+            state.use_replica = False
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = _RequestState(
+            request.method in SAFE_METHODS and settings.REPLICA_STICKY_COOKIE not in request.COOKIES
+        )
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote and settings.DATABASE_REPLICAS:
+            secure = request.is_secure()
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, secure=secure,
+                # The frontend calls the API cross-site
+                samesite='None' if secure else 'Lax',
+            )
+        return response
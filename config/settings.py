@@ -15,6 +15,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 from decouple import config
+from .database import database_settings, replica_settings
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -48,8 +49,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'config.routers.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -79,12 +82,52 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 # Database
+# SQLite file by default; set DATABASE_URL (and the DB_* pool and connection
+# variables) to use PostgreSQL, see config/database.py
 DATABASES = {
-    'default':{
-    'ENGINE': 'django.db.backends.sqlite3',  # SQLite engine
-        'NAME': BASE_DIR / 'db.sqlite3',
-        }
+    'default': database_settings(BASE_DIR),
+    **replica_settings(BASE_DIR),
+}
+
+# Read replicas (DATABASE_REPLICA_URLS): read-only requests read from them;
+# a client that wrote keeps reading from the primary for REPLICA_STICKY_SECONDS
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['config.routers.ReplicaRouter']
+REPLICA_STICKY_COOKIE = 'primary_reads'
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=10, cast=int)
+
+# Per-request query counts and timings: Server-Timing headers and Prometheus
+# histograms at /metrics (see config/metrics.py), served only to requests
+# bearing METRICS_TOKEN; without one, /metrics is off
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Cache
+# Local-memory by default; set CACHE_BACKEND to
+# django.core.cache.backends.filebased.FileBasedCache and CACHE_LOCATION to a
+# directory to share cached responses between gunicorn workers on one box.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='venue-backend'),
+        'OPTIONS': {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int)},
     }
+}
+
+# Seconds a cached public venue response may live; writes invalidate earlier
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=300, cast=int)
+
+# Venues kept per scope (global and per city) in the featured ranking table
+FEATURED_RANKING_SIZE = config('FEATURED_RANKING_SIZE', default=12, cast=int)
+
+# Booking references: sequence values reserved per worker per claim, and the key
+# that scrambles them. Never change the key once references have been issued.
+BOOKING_REFERENCE_BLOCK_SIZE = config('BOOKING_REFERENCE_BLOCK_SIZE', default=100, cast=int)
+BOOKING_REFERENCE_KEY = config('BOOKING_REFERENCE_KEY', default=SECRET_KEY)
+
+# PENDING bookings the vendor has not answered within this many hours are expired
+# by the sweep_bookings command, releasing their dates
+PENDING_BOOKING_TTL_HOURS = config('PENDING_BOOKING_TTL_HOURS', default=72, cast=int)
 
 
 # Password validation
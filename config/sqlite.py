@@ -0,0 +1,44 @@
+"""
+SQLite profile for single-node deployments (see config/database.py).
+
+In the default rollback-journal mode a writer locks the whole file, so
+readers in other gunicorn workers wait behind every booking insert, and
+writers that lose the race fail with "database is locked". This profile
+switches the database to WAL, where readers keep reading the last
+committed snapshot while one writer appends. Every new connection gets:
+
+    journal_mode=WAL        readers no longer block on the writer
+    synchronous=NORMAL      fsync at checkpoints only (safe in WAL mode)
+    busy_timeout            wait this many ms for the write lock instead of failing
+    mmap_size, cache_size   read pages through the OS page cache / keep more in memory
+    temp_store=MEMORY       sort and index scratch space in memory
+
+Write transactions also start with BEGIN IMMEDIATE (transaction_mode). The
+write lock is taken up front, so a transaction that reads and then writes
+waits its turn. Upgrading a read lock part-way would deadlock and fail at
+once, whatever the busy timeout.
+
+DB_SQLITE_TUNING=1 turns the profile on. WAL is stored in the database
+file and adds -wal/-shm files beside it. DB_SQLITE_BUSY_TIMEOUT (ms),
+DB_SQLITE_MMAP_SIZE (bytes) and DB_SQLITE_CACHE_SIZE (KiB) tune it.
+"""
+from decouple import config
+
+PRAGMAS = [
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', config('DB_SQLITE_BUSY_TIMEOUT', default=5000, cast=int)),
+    ('mmap_size', config('DB_SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int)),
+    # negative: size in KiB rather than in pages
+    ('cache_size', -config('DB_SQLITE_CACHE_SIZE', default=64 * 1024, cast=int)),
+    ('temp_store', 'MEMORY'),
+]
+
+
+def apply_profile(sender, connection, **kwargs):
+    """connection_created receiver: set the pragmas on each new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in PRAGMAS:
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -21,12 +21,14 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from .metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('users.urls')),
     path('api/', include('venues.urls')),
     path('api/', include('booking.urls')),
+    path('metrics', metrics_view, name='metrics'),
     
 ]
 
@@ -2,6 +2,7 @@ from django.shortcuts import render
 
 # Create your views here.
 
+from django.db.models import Prefetch
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
@@ -72,9 +73,12 @@ def add_favorite(request):
 @api_view(['GET'])
 def get_favorites(request):
     """Get user's favorite venues"""
-    favorites = Favorite.objects.filter(user=request.user).select_related('venue')
-    
+    from venues.models import Venue
     from venues.serializers import VenueListSerializer
+    
+    favorites = Favorite.objects.filter(user=request.user).prefetch_related(
+        Prefetch('venue', queryset=Venue.objects.with_list_data())
+    )
     venues = [f.venue for f in favorites]
     serializer = VenueListSerializer(venues, many=True, context={'request': request})
     
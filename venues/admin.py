@@ -2,7 +2,9 @@ from django.contrib import admin
 
 # Register your models here.
 from django.contrib import admin
-from .models import Venue, VenueImage, Amenity, VenueAmenity, BlockedDate
+from .models import Venue, VenueImage, Amenity, VenueAmenity, BlockedDate, Review
+from .cache import bump
+from . import rankings
 
 class VenueImageInline(admin.TabularInline):
     model = VenueImage
@@ -18,7 +20,7 @@ class BlockedDateInline(admin.TabularInline):
 
 @admin.register(Venue)
 class VenueAdmin(admin.ModelAdmin):
-    list_display = ['name', 'city', 'owner', 'capacity', 'price_per_day', 'is_active', 'created_at']
+    list_display = ['name', 'city', 'owner', 'capacity', 'price_per_day', 'rating_avg', 'reviews_count', 'is_active', 'created_at']
     list_filter = ['city', 'is_active', 'created_at']
     search_fields = ['name', 'description', 'address', 'owner__email']
     readonly_fields = ['created_at', 'updated_at']
@@ -27,16 +29,26 @@ class VenueAdmin(admin.ModelAdmin):
     actions = ['deactivate_venues', 'activate_venues']
     
     def deactivate_venues(self, request, queryset):
+        bump(queryset.values_list('id', flat=True))
         updated = queryset.update(is_active=False)
+        rankings.rebuild()
         self.message_user(request, f'{updated} venues were deactivated.')
     deactivate_venues.short_description = "Deactivate selected venues"
     
     def activate_venues(self, request, queryset):
+        bump(queryset.values_list('id', flat=True))
         updated = queryset.update(is_active=True)
+        rankings.rebuild()
         self.message_user(request, f'{updated} venues were activated.')
     activate_venues.short_description = "Activate selected venues"
 
 @admin.register(Amenity)
 class AmenityAdmin(admin.ModelAdmin):
     list_display = ['name', 'icon', 'created_at']
-    search_fields = ['name']
\ No newline at end of file
+    search_fields = ['name']
+
+@admin.register(Review)
+class ReviewAdmin(admin.ModelAdmin):
+    list_display = ['venue', 'user', 'rating', 'created_at']
+    list_filter = ['rating', 'created_at']
+    search_fields = ['venue__name', 'user__email', 'comment']
@@ -4,4 +4,10 @@ from django.apps import AppConfig
 class VenuesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'venues'
-    verbose_name = 'Venue Management'
\ No newline at end of file
+    verbose_name = 'Venue Management'
+    
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from . import signals
+        
+        post_migrate.connect(signals.ensure_search_index, sender=self)
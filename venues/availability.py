@@ -0,0 +1,138 @@
+"""
+Per-venue occupancy bitmap.
+
+Days are numbered from EPOCH and grouped into blocks of BLOCK_DAYS days, so a
+block's bitmap fits in one BigIntegerField. Only blocks with at least one
+occupied day have a VenueOccupancy row, which keeps the table proportional to
+the number of booked/blocked days rather than venues x horizon.
+
+The bitmap is derived from Booking and BlockedDate rows and is refreshed by
+their signals; `rebuild_occupancy` recomputes it from scratch.
+
+refresh() locks the venue row before reading, so two transactions
+refreshing the same venue take turns: the second one reads the first one's
+committed booking instead of overwriting its bits from an older snapshot.
+Callers refreshing several venues go in venue id order.
+"""
+from datetime import date, timedelta
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.db.models.lookups import GreaterThan
+from .models import Venue, VenueOccupancy, BlockedDate
+
+EPOCH = date(2000, 1, 1)
+BLOCK_DAYS = 32
+ACTIVE_BOOKING_STATUSES = ['PENDING', 'CONFIRMED']
+
+
+def day_number(day):
+    return (day - EPOCH).days
+
+
+def block_range(block):
+    start = EPOCH + timedelta(days=block * BLOCK_DAYS)
+    return start, start + timedelta(days=BLOCK_DAYS - 1)
+
+
+def range_masks(start_date, end_date):
+    """Return {block: mask} with a bit set for every day in [start_date, end_date]."""
+    masks = {}
+    first, last = day_number(start_date), day_number(end_date)
+    for block in range(first // BLOCK_DAYS, last // BLOCK_DAYS + 1):
+        lo = max(first, block * BLOCK_DAYS) - block * BLOCK_DAYS
+        hi = min(last, block * BLOCK_DAYS + BLOCK_DAYS - 1) - block * BLOCK_DAYS
+        masks[block] = ((1 << (hi - lo + 1)) - 1) << lo
+    return masks
+
+
+def _overlap_q(masks):
+    condition = Q()
+    for block, mask in masks.items():
+        condition |= Q(block=block) & Q(GreaterThan(F('mask').bitand(mask), 0))
+    return condition
+
+
+def is_free(venue_id, start_date, end_date):
+    """True when no day in [start_date, end_date] is booked or blocked."""
+    return not VenueOccupancy.objects.filter(
+        Q(venue_id=venue_id) & _overlap_q(range_masks(start_date, end_date))
+    ).exists()
+
+
+def free_between(start_date, end_date):
+    """Filter expression keeping venues free for every day in the range."""
+    return ~Exists(VenueOccupancy.objects.filter(
+        Q(venue=OuterRef('pk')) & _overlap_q(range_masks(start_date, end_date))
+    ))
+
+
+def refresh(venue_id, start_date, end_date):
+    """Recompute the blocks covering [start_date, end_date] for one venue."""
+    from booking.models import Booking
+    
+    blocks = list(range_masks(start_date, end_date))
+    lo = block_range(blocks[0])[0]
+    hi = block_range(blocks[-1])[1]
+    
+    masks = dict.fromkeys(blocks, 0)
+    
+    def occupy(first, last):
+        for block, mask in range_masks(max(first, lo), min(last, hi)).items():
+            masks[block] |= mask
+    
+    with transaction.atomic():
+        # NO KEY: the booking insert already holds a key-share lock on the venue
+        list(Venue.objects.select_for_update(no_key=True).filter(pk=venue_id).values_list('pk'))
+        
+        bookings = Booking.objects.filter(
+            venue_id=venue_id,
+            status__active=True,
+            start_date__lte=hi,
+            end_date__gte=lo
+        ).order_by().values_list('start_date', 'end_date')
+        for first, last in bookings:
+            occupy(first, last)
+        
+        blocked = BlockedDate.objects.filter(
+            venue_id=venue_id, date__gte=lo, date__lte=hi
+        ).values_list('date', flat=True)
+        for day in blocked:
+            occupy(day, day)
+        
+        VenueOccupancy.objects.filter(venue_id=venue_id, block__in=blocks).delete()
+        VenueOccupancy.objects.bulk_create([
+            VenueOccupancy(venue_id=venue_id, block=block, mask=mask)
+            for block, mask in masks.items() if mask
+        ])
+
+
+def rebuild(venue_ids=None):
+    """Recompute every stored block from Booking and BlockedDate rows."""
+    from booking.models import Booking
+    
+    masks = {}
+    
+    def occupy(venue_id, first, last):
+        for block, mask in range_masks(first, last).items():
+            key = (venue_id, block)
+            masks[key] = masks.get(key, 0) | mask
+    
+    bookings = Booking.objects.filter(status__active=True).order_by()
+    blocked = BlockedDate.objects.all()
+    occupancy = VenueOccupancy.objects.all()
+    if venue_ids is not None:
+        bookings = bookings.filter(venue_id__in=venue_ids)
+        blocked = blocked.filter(venue_id__in=venue_ids)
+        occupancy = occupancy.filter(venue_id__in=venue_ids)
+    
+    for venue_id, first, last in bookings.values_list('venue_id', 'start_date', 'end_date').iterator():
+        occupy(venue_id, first, last)
+    for venue_id, day in blocked.values_list('venue_id', 'date').iterator():
+        occupy(venue_id, day, day)
+    
+    occupancy.delete()
+    VenueOccupancy.objects.bulk_create(
+        [VenueOccupancy(venue_id=v, block=b, mask=m) for (v, b), m in masks.items()],
+        batch_size=1000
+    )
+    return len(masks)
@@ -0,0 +1,131 @@
+"""
+Versioned response cache for the public venue endpoints.
+
+Cached responses are keyed on the action, host, path and sorted query
+parameters plus a version number: the global venues version for list-style
+actions, or that venue's version for detail-style ones. Writes never delete
+entries; they bump versions (see venues.signals and booking.signals), which
+makes every entry built from older data unreachable. Entries then age out via
+RESPONSE_CACHE_TIMEOUT or the backend's culling.
+
+Only the cache API common to every backend is used (get_many, add, incr,
+set), so local-memory and file-based caches work without Redis.
+
+With read replicas, a miss is computed on a replica that may not have the
+write behind the latest bump yet. Such a response is served but not stored
+until REPLICA_STICKY_SECONDS after the bump, so stale replica data is never
+cached under the new version.
+"""
+import hashlib
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+GLOBAL_VERSION_KEY = 'venues:v'
+CACHE_ALIAS = getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def venue_version_key(venue_id):
+    return f'venues:v:{venue_id}'
+
+
+def _bump_keys(keys):
+    cache = get_cache()
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Start from the clock so a key evicted and re-created never reuses an old number
+            cache.add(key, time.time_ns(), timeout=None)
+
+
+def _recent_key(key):
+    return f'{key}:recent'
+
+
+def _bump_and_mark(keys):
+    _bump_keys(keys)
+    if settings.DATABASE_REPLICAS:
+        get_cache().set_many(
+            {_recent_key(key): 1 for key in keys}, timeout=settings.REPLICA_STICKY_SECONDS
+        )
+
+
+def bump(venue_ids=()):
+    """Invalidate cached responses for these venues and every list response.
+
+    Bumped now, so this process stops serving old entries, and again on
+    commit, so entries cached from pre-commit data in between are dropped too.
+    """
+    keys = [GLOBAL_VERSION_KEY] + [venue_version_key(v) for v in set(venue_ids) if v is not None]
+    _bump_and_mark(keys)
+    transaction.on_commit(lambda: _bump_and_mark(keys))
+
+
+def replicas_may_lag(key):
+    """True while a replica may still miss the write behind ``key``'s last bump."""
+    return bool(settings.DATABASE_REPLICAS) and get_cache().get(_recent_key(key)) is not None
+
+
+def versions(*keys):
+    cache = get_cache()
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        _bump_keys(missing)
+        found.update(cache.get_many(missing))
+    return [found.get(key, 0) for key in keys]
+
+
+def response_key(request, action, version):
+    params = sorted(request.query_params.lists())
+    raw = f'{request.get_host()}|{request.path}|{params}'.encode()
+    return f'venues:resp:{action}:{version}:{hashlib.sha1(raw).hexdigest()}'
+
+
+def is_cacheable(request):
+    user = request.user
+    # Vendors see their own venues on list/retrieve, so their responses are per-user
+    return request.method == 'GET' and not (user.is_authenticated and user.role == 'VENDOR')
+
+
+def cached_response(per_venue=False):
+    """Cache a viewset action's 200 responses under the current version.
+
+    ``per_venue`` actions (detail routes) are keyed on the venue's version so
+    writes to other venues do not evict them.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if not is_cacheable(request):
+                return method(self, request, *args, **kwargs)
+
+            if per_venue:
+                version_key = venue_version_key(kwargs.get(self.lookup_url_kwarg or self.lookup_field))
+            else:
+                version_key = GLOBAL_VERSION_KEY
+            key = response_key(request, method.__name__, versions(version_key)[0])
+
+            cache = get_cache()
+            hit = cache.get(key)
+            if hit is not None:
+                response = Response(hit)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                if not replicas_may_lag(version_key):
+                    cache.set(key, response.data, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+                response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,99 @@
+"""
+Geohash cells and haversine distances for "venues near me".
+
+Venue.geohash stores the cell of the venue's coordinates at GEOHASH_PRECISION.
+A radius query first covers its bounding box with a few coarser cells, turning
+the search into indexed range scans on that column, then applies the exact
+haversine distance to the surviving candidates only.
+"""
+import math
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import ASin, Cast, Cos, Power, Radians, Sin, Sqrt
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+MAX_COVER_CELLS = 16
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if longitude >= mid:
+                value, lng_lo = value * 2 + 1, mid
+            else:
+                value, lng_hi = value * 2, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if latitude >= mid:
+                value, lat_lo = value * 2 + 1, mid
+            else:
+                value, lat_hi = value * 2, mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) of a cell in degrees."""
+    total_bits = precision * 5
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def bounding_box(latitude, longitude, radius_km):
+    dlat = radius_km / KM_PER_DEGREE
+    dlng = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    return (max(latitude - dlat, -90.0), min(latitude + dlat, 90.0),
+            max(longitude - dlng, -180.0), min(longitude + dlng, 180.0))
+
+
+def _steps(lo, hi, step):
+    value = lo
+    while value < hi:
+        yield value
+        value += step
+    yield hi
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """The finest set of at most MAX_COVER_CELLS geohash prefixes covering the radius."""
+    south, north, west, east = bounding_box(latitude, longitude, radius_km)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.floor(north / height) - math.floor(south / height) + 1
+        cols = math.floor(east / width) - math.floor(west / width) + 1
+        if rows * cols <= MAX_COVER_CELLS:
+            break
+    return sorted({
+        encode(lat, lng, precision)
+        for lat in _steps(south, north, height)
+        for lng in _steps(west, east, width)
+    })
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def distance_expression(latitude, longitude):
+    """Haversine distance in km from a point to each row's latitude/longitude."""
+    phi1 = Value(math.radians(latitude), output_field=FloatField())
+    lambda1 = Value(math.radians(longitude), output_field=FloatField())
+    phi2 = Radians(Cast(F('latitude'), FloatField()))
+    lambda2 = Radians(Cast(F('longitude'), FloatField()))
+    a = (Power(Sin((phi2 - phi1) / 2), 2) +
+         Cos(phi1) * Cos(phi2) * Power(Sin((lambda2 - lambda1) / 2), 2))
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(a))
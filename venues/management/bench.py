@@ -0,0 +1,48 @@
+"""Helpers shared by the bench_* management commands."""
+import statistics
+import time
+from contextlib import contextmanager
+from django.db import connection
+
+
+@contextmanager
+def scratch_database(verbosity=0):
+    """Run the block against a throwaway test database, never the real one."""
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, keepdb=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+
+
+def timed(fn, repeat=5):
+    """Median wall time of ``fn`` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def make_owner(email='bench-owner@example.com', role='VENDOR'):
+    from users.models import User
+    return User.objects.create_user(
+        email=email, username=email.split('@')[0], password='bench',
+        first_name='Bench', last_name='Owner', phone='600000000', role=role
+    )
+
+
+def make_venues(owner, count, **kwargs):
+    from venues.models import Venue
+    defaults = {
+        'description': 'Benchmark venue', 'city': 'Douala', 'address': 'Akwa',
+        'capacity': 200, 'price_per_day': 100000,
+    }
+    defaults.update(kwargs)
+    Venue.objects.bulk_create(
+        [Venue(owner=owner, name=f'Venue {i}', **defaults) for i in range(count)],
+        batch_size=1000
+    )
+    return list(Venue.objects.values_list('id', flat=True))
@@ -0,0 +1,54 @@
+import random
+from django.core.management.base import BaseCommand
+from venues.management.bench import scratch_database, timed, make_owner, make_venues
+from venues.models import Venue, Amenity, VenueAmenity
+from venues.views import venues_with_all_amenities
+
+
+class Command(BaseCommand):
+    help = 'Compare chained per-amenity joins with the GROUP BY/HAVING amenity filter'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--venues', type=int, default=5000)
+        parser.add_argument('--amenities', type=int, default=30)
+        parser.add_argument('--selected', default='5,10,20')
+        parser.add_argument('--repeat', type=int, default=5)
+    
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.run(options)
+    
+    def run(self, options):
+        rng = random.Random(3)
+        venue_ids = make_venues(make_owner(), options['venues'])
+        amenities = [Amenity.objects.create(name=f'Amenity {i}') for i in range(options['amenities'])]
+        links = []
+        for venue_id in venue_ids:
+            # Popular amenities are common, so large selections still match some venues
+            for index, amenity in enumerate(amenities):
+                if rng.random() < 0.97 - index * 0.015:
+                    links.append(VenueAmenity(venue_id=venue_id, amenity=amenity))
+        VenueAmenity.objects.bulk_create(links, batch_size=5000)
+        base = Venue.objects.filter(is_active=True)
+        
+        def page(queryset):
+            return list(queryset.order_by('-created_at').values_list('id', flat=True)[:20]), queryset.count()
+        
+        self.stdout.write(f"{options['venues']} venues, {len(links)} venue amenities; "
+                          f"count + first page, median of {options['repeat']} runs (ms)")
+        self.stdout.write(f"{'selected':>9} {'matches':>8} {'chained joins':>14} {'group by':>10}")
+        for selected in [int(n) for n in options['selected'].split(',')]:
+            names = [a.name.lower() for a in amenities[:selected]]
+            
+            def chained():
+                queryset = base
+                for name in names:
+                    queryset = queryset.filter(venueamenity__amenity__name__iexact=name)
+                return page(queryset.distinct())
+            
+            def grouped():
+                return page(base.filter(id__in=venues_with_all_amenities(names)))
+            
+            assert chained() == grouped()
+            self.stdout.write(f'{selected:>9} {grouped()[1]:>8} {timed(chained, options["repeat"]):>14.2f} '
+                              f'{timed(grouped, options["repeat"]):>10.2f}')
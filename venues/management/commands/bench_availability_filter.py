@@ -0,0 +1,90 @@
+import random
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef, Q
+from venues import availability
+from venues.management.bench import scratch_database, timed, make_owner, make_venues
+from venues.models import Venue, BlockedDate
+
+
+class Command(BaseCommand):
+    help = 'Compare venue date-range availability filters as the bookings table grows'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--venues', type=int, default=1000)
+        parser.add_argument('--sizes', default='1000,10000,50000',
+                            help='Comma-separated booking table sizes')
+        parser.add_argument('--repeat', type=int, default=5)
+    
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options['sizes'].split(',')]
+        with scratch_database():
+            self.run(options['venues'], sizes, options['repeat'])
+    
+    def run(self, venue_count, sizes, repeat):
+        from booking.models import Booking
+        
+        rng = random.Random(42)
+        owner = make_owner()
+        renter = make_owner('bench-renter@example.com', role='RENTER')
+        venue_ids = make_venues(owner, venue_count)
+        first_day = date(2030, 1, 1)
+        start, end = first_day + timedelta(days=180), first_day + timedelta(days=183)
+        
+        BlockedDate.objects.bulk_create([
+            BlockedDate(venue_id=rng.choice(venue_ids), date=first_day + timedelta(days=d))
+            for d in range(0, 365, 3)
+        ], ignore_conflicts=True)
+        
+        def exclude_join():
+            return list(Venue.objects.filter(is_active=True).exclude(
+                Q(blocked_dates__date__gte=start, blocked_dates__date__lte=end) |
+                Q(bookings__start_date__lte=end,
+                  bookings__end_date__gte=start,
+                  bookings__status__in=['PENDING', 'CONFIRMED'])
+            ).distinct().values_list('id', flat=True))
+        
+        def not_exists_rows():
+            return list(Venue.objects.filter(is_active=True).filter(
+                ~Exists(BlockedDate.objects.filter(
+                    venue=OuterRef('pk'), date__gte=start, date__lte=end
+                )),
+                ~Exists(Booking.objects.filter(
+                    venue=OuterRef('pk'), status__in=['PENDING', 'CONFIRMED'],
+                    start_date__lte=end, end_date__gte=start
+                )),
+            ).values_list('id', flat=True))
+        
+        def not_exists_bitmap():
+            return list(Venue.objects.filter(is_active=True).filter(
+                availability.free_between(start, end)
+            ).values_list('id', flat=True))
+        
+        self.stdout.write(f'{venue_count} venues, range {start} .. {end}, median of {repeat} runs (ms)')
+        self.stdout.write(f"{'bookings':>10} {'exclude+distinct':>18} {'NOT EXISTS rows':>16} {'NOT EXISTS bitmap':>18}")
+        
+        created = 0
+        for size in sizes:
+            batch = []
+            for i in range(created, size):
+                booking_start = first_day + timedelta(days=rng.randrange(365))
+                batch.append(Booking(
+                    booking_reference=f'BENCH-{i}', venue_id=rng.choice(venue_ids), vendor=owner, renter=renter,
+                    start_date=booking_start, end_date=booking_start + timedelta(days=rng.randrange(3)),
+                    guests_count=50, event_type='OTHER', contact_phone='600000000',
+                    subtotal=0, commission=0, deposit_amount=0, total_amount=0,
+                    status=rng.choice(['PENDING', 'CONFIRMED', 'CANCELLED', 'COMPLETED']),
+                ))
+            Booking.objects.bulk_create(batch, batch_size=2000)
+            created = size
+            availability.rebuild()
+            
+            free = set(not_exists_rows())
+            assert set(not_exists_bitmap()) == free
+            
+            self.stdout.write(f'{size:>10} {timed(exclude_join, repeat):>18.2f} '
+                              f'{timed(not_exists_rows, repeat):>16.2f} {timed(not_exists_bitmap, repeat):>18.2f}'
+                              f'   free venues: {len(free)} (exclude+distinct: {len(exclude_join())})')
+        
+        self.stdout.write('exclude() over two multi-valued relations may match the conditions on different '
+                          'bookings, so it can drop venues that are actually free.')
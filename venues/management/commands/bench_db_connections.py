@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.test import Client
+from config.database import pool_available
+from venues.management.bench import scratch_database, timed, make_owner, make_venues
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request latency with a new connection per request, persistent connections and pooling'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per timed run')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--connect-latency', type=float, default=0,
+                            help='Milliseconds added to every new connection, standing in for '
+                                 'the TCP/TLS/auth handshake of a remote server')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            if connection.vendor == 'sqlite':
+                # Closing an in-memory test database would drop it; use a file
+                connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'bench.sqlite3')
+            with scratch_database():
+                self.run(options['requests'], options['repeat'], options['connect_latency'] / 1000)
+
+    def run(self, request_count, repeat, connect_latency):
+        venue_ids = make_venues(make_owner(), 20)
+        body = json.dumps({'items': [
+            {'venue_id': venue_id, 'start_date': '2030-01-01', 'end_date': '2030-01-04'}
+            for venue_id in venue_ids
+        ]})
+        client = Client(HTTP_HOST='localhost')
+        opened = []
+
+        def on_connect(sender, connection, **kwargs):
+            opened.append(1)
+            if connect_latency:
+                time.sleep(connect_latency)
+
+        def requests():
+            for _ in range(request_count):
+                # What the WSGI handler does on request_started / request_finished;
+                # the test client disconnects those receivers
+                close_old_connections()
+                response = client.post('/api/venues/quote/', body, content_type='application/json')
+                assert response.status_code == 200, response.content
+                close_old_connections()
+
+        modes = [('per request', 0, False), ('persistent', 600, False)]
+        if connection.vendor == 'postgresql' and pool_available():
+            modes.append(('pool', 0, True))
+
+        self.stdout.write(f'{connection.vendor}, {request_count} requests per run, '
+                          f'+{connect_latency * 1000:.1f} ms per connect, median of {repeat} runs')
+        self.stdout.write(f"{'mode':>12} {'ms/request':>11} {'connects/run':>13}")
+        connection_created.connect(on_connect)
+        try:
+            for label, max_age, pool in modes:
+                self.configure(max_age, pool)
+                opened.clear()
+                per_request = timed(requests, repeat) / request_count
+                self.stdout.write(f'{label:>12} {per_request:>11.3f} {len(opened) / repeat:>13.1f}')
+        finally:
+            connection_created.disconnect(on_connect)
+            self.configure(0, False)
+
+        if len(modes) < 3:
+            self.stdout.write('pool: skipped (needs PostgreSQL with psycopg 3 and psycopg_pool)')
+
+    def configure(self, max_age, pool):
+        connection.close()
+        if connection.vendor == 'postgresql':
+            connection.close_pool()
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        if pool:
+            connection.settings_dict['OPTIONS']['pool'] = True
+        else:
+            connection.settings_dict['OPTIONS'].pop('pool', None)
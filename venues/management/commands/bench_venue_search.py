@@ -0,0 +1,50 @@
+import random
+from django.core.management.base import BaseCommand
+from venues.management.bench import scratch_database, timed, make_owner
+from venues.models import Venue
+from venues.search import LikeSearchBackend, get_backend
+
+WORDS = ('hall garden terrace rooftop beach villa lounge ballroom chapel studio loft '
+         'conference wedding birthday concert gala seminar banquet parking stage wifi '
+         'akwa bonapriso bonanjo bastos kribi limbe buea bafoussam garoua deido').split()
+
+
+class Command(BaseCommand):
+    help = 'Compare icontains search with the full-text index on a large venue table'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--venues', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=5)
+    
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.run(options['venues'], options['repeat'])
+    
+    def run(self, count, repeat):
+        rng = random.Random(7)
+        owner = make_owner()
+        
+        def text(n):
+            return ' '.join(rng.choice(WORDS) for _ in range(n))
+        
+        Venue.objects.bulk_create([
+            Venue(owner=owner, name=f'{text(2)} {i}', description=text(40), address=text(3),
+                  city='Douala', capacity=100, price_per_day=1000)
+            for i in range(count)
+        ], batch_size=2000)
+        
+        like, indexed = LikeSearchBackend(), get_backend()
+        base = Venue.objects.filter(is_active=True)
+        
+        self.stdout.write(f'{count} venues, count + first page of 20 (what the list endpoint runs), median of {repeat} runs (ms)')
+        self.stdout.write(f"{'query':>24} {'matches':>8} {'icontains':>10} {type(indexed).__name__:>18}")
+        for query in [['rooftop', 'kribi'], ['ballroom', 'gala', 'bastos'], ['nomatch']]:
+            matches = indexed.search(base, query).count()
+            
+            def page(backend):
+                results = backend.search(base, query).order_by('-search_rank', '-created_at')
+                return results.count(), list(results[:20])
+            
+            like_ms = timed(lambda: page(like), repeat)
+            fts_ms = timed(lambda: page(indexed), repeat)
+            self.stdout.write(f"{' '.join(query):>24} {matches:>8} {like_ms:>10.2f} {fts_ms:>18.2f}")
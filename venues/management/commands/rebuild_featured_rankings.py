@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from venues import cache, rankings
+
+
+class Command(BaseCommand):
+    help = 'Recompute the featured venue rankings (global and per city)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--scope', action='append', dest='scopes',
+                            help='Only rebuild this scope: a city code or "*" (repeatable)')
+    
+    def handle(self, *args, **options):
+        scopes = options['scopes'] or rankings.all_scopes()
+        for scope in scopes:
+            rankings.rerank(scope)
+        cache.bump()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(scopes)} featured rankings'))
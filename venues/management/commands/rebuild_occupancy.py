@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from venues import availability
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the venue occupancy bitmap from bookings and blocked dates'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--venue', type=int, action='append', dest='venues',
+                            help='Only rebuild these venue ids (repeatable)')
+    
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            blocks = availability.rebuild(options['venues'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {blocks} occupancy blocks'))
@@ -0,0 +1,53 @@
+# Generated by Django 6.0 on 2026-10-17 18:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_occupancy(apps, schema_editor):
+    from venues.availability import range_masks
+    Booking = apps.get_model('booking', 'Booking')
+    BlockedDate = apps.get_model('venues', 'BlockedDate')
+    VenueOccupancy = apps.get_model('venues', 'VenueOccupancy')
+    
+    masks = {}
+    
+    def occupy(venue_id, first, last):
+        for block, mask in range_masks(first, last).items():
+            masks[(venue_id, block)] = masks.get((venue_id, block), 0) | mask
+    
+    bookings = Booking.objects.filter(status__in=['PENDING', 'CONFIRMED'])
+    for venue_id, first, last in bookings.values_list('venue_id', 'start_date', 'end_date').iterator():
+        occupy(venue_id, first, last)
+    for venue_id, day in BlockedDate.objects.values_list('venue_id', 'date').iterator():
+        occupy(venue_id, day, day)
+    
+    VenueOccupancy.objects.bulk_create(
+        [VenueOccupancy(venue_id=v, block=b, mask=m) for (v, b), m in masks.items()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venues', '0003_review'),
+        ('booking', '0003_remove_booking_bookings_booking_4d53ac_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VenueOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('block', models.IntegerField()),
+                ('mask', models.BigIntegerField(default=0)),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='venues.venue')),
+            ],
+            options={
+                'db_table': 'venue_occupancy',
+                'unique_together': {('venue', 'block')},
+            },
+        ),
+        migrations.RunPython(build_occupancy, migrations.RunPython.noop),
+    ]
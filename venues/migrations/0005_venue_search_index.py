@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-17 19:20
+
+from django.db import migrations
+
+
+def install_index(apps, schema_editor):
+    from venues.search import install_index
+    install_index(schema_editor.connection)
+
+
+def uninstall_index(apps, schema_editor):
+    from venues.search import uninstall_index
+    uninstall_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venues', '0004_venueoccupancy'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_index, uninstall_index),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-17 19:03
+
+from django.db import migrations, models
+
+
+def fill_geohash(apps, schema_editor):
+    from venues.geo import encode
+    Venue = apps.get_model('venues', 'Venue')
+    venues = Venue.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    batch = []
+    for venue in venues.only('id', 'latitude', 'longitude').iterator():
+        venue.geohash = encode(float(venue.latitude), float(venue.longitude))
+        batch.append(venue)
+    Venue.objects.bulk_update(batch, ['geohash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venues', '0005_venue_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venue',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
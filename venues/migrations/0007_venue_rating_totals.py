@@ -0,0 +1,48 @@
+# Generated by Django 6.0 on 2026-10-17 19:06
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_rating_totals(apps, schema_editor):
+    Venue = apps.get_model('venues', 'Venue')
+    Review = apps.get_model('venues', 'Review')
+    totals = Review.objects.values('venue_id').annotate(total=Sum('rating'), count=Count('id'))
+    for row in totals.iterator():
+        Venue.objects.filter(pk=row['venue_id']).update(
+            rating_sum=row['total'],
+            reviews_count=row['count'],
+            rating_avg=row['total'] / row['count'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venues', '0006_venue_geohash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venue',
+            name='rating_avg',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='rating_sum',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='reviews_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='venue',
+            index=models.Index(fields=['is_active', '-rating_avg'], name='venues_is_acti_7ad0fd_idx'),
+        ),
+        migrations.RunPython(fill_rating_totals, migrations.RunPython.noop),
+    ]
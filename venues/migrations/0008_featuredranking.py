@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-17 19:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_rankings(apps, schema_editor):
+    Venue = apps.get_model('venues', 'Venue')
+    FeaturedRanking = apps.get_model('venues', 'FeaturedRanking')
+    cities = Venue.objects.values_list('city', flat=True).distinct()
+    for scope in ['*', *cities]:
+        venues = Venue.objects.filter(is_active=True)
+        if scope != '*':
+            venues = venues.filter(city=scope)
+        top = venues.order_by('-rating_avg', '-created_at', '-id').values_list('id', 'rating_avg')[:12]
+        FeaturedRanking.objects.bulk_create([
+            FeaturedRanking(scope=scope, position=position, venue_id=venue_id, score=score)
+            for position, (venue_id, score) in enumerate(top, start=1)
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venues', '0007_venue_rating_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeaturedRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=50)),
+                ('position', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='featured_rankings', to='venues.venue')),
+            ],
+            options={
+                'db_table': 'featured_rankings',
+                'ordering': ['scope', 'position'],
+                'unique_together': {('scope', 'position'), ('scope', 'venue')},
+            },
+        ),
+        migrations.RunPython(build_rankings, migrations.RunPython.noop),
+    ]
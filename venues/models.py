@@ -1,8 +1,46 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from users.models import User
+from django.db.models.functions import Cast
 from django.utils import timezone
 
+
+class VenueQuerySet(models.QuerySet):
+    def with_list_data(self, available_on=None):
+        """Prefetch everything VenueListSerializer reads.
+
+        With ``available_on``, each venue is annotated with whether that day
+        is free, from the occupancy bitmap.
+        """
+        queryset = self.prefetch_related(
+            'images',
+            models.Prefetch(
+                'venueamenity_set',
+                queryset=VenueAmenity.objects.select_related('amenity'),
+            ),
+        )
+        if available_on is not None:
+            from .availability import free_between
+            queryset = queryset.annotate(available=free_between(available_on, available_on))
+        return queryset
+    
+    def adjust_rating(self, rating_delta, count_delta):
+        """Apply a review change to the running rating totals in one UPDATE."""
+        rating_sum = models.F('rating_sum') + rating_delta
+        reviews_count = models.F('reviews_count') + count_delta
+        return self.update(
+            rating_sum=rating_sum,
+            reviews_count=reviews_count,
+            rating_avg=models.Case(
+                models.When(
+                    models.Q(reviews_count__gt=-count_delta),
+                    then=Cast(rating_sum, models.FloatField()) / reviews_count
+                ),
+                default=0.0,
+            ),
+        )
+
+
 class Venue(models.Model):
     CITY_CHOICES = [
         ('Douala', 'Douala'),
@@ -21,6 +59,7 @@ class Venue(models.Model):
     address = models.CharField(max_length=300)
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
     capacity = models.IntegerField(validators=[MinValueValidator(1)])
     price_per_day = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     deposit_percentage = models.IntegerField(default=30, validators=[MinValueValidator(0), MaxValueValidator(100)])
@@ -28,29 +67,51 @@ class Venue(models.Model):
     cancellation_policy = models.TextField(default="Full refund 7 days before event date")
     rules = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
+    
+    # Running review totals, maintained by venues.signals (see VenueQuerySet.adjust_rating)
+    rating_sum = models.IntegerField(default=0, editable=False)
+    reviews_count = models.IntegerField(default=0, editable=False)
+    rating_avg = models.FloatField(default=0.0, editable=False)
+    
     created_at = models.DateTimeField(default=timezone.now, editable=False)
     updated_at = models.DateTimeField(default=timezone.now, editable=False)
     
+    objects = VenueQuerySet.as_manager()
+    
+    RATING_FIELDS = ('rating_sum', 'reviews_count', 'rating_avg')
+    
     class Meta:
         db_table = 'venues'
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['city', 'is_active']),
             models.Index(fields=['price_per_day']),
+            models.Index(fields=['is_active', '-rating_avg']),
         ]
     
     def __str__(self):
         return f"{self.name} - {self.city}"
     
-    @property
-    def rating(self):
-        from django.db.models import Avg
-        avg_rating = self.reviews.aggregate(Avg('rating'))['rating__avg']
-        return round(avg_rating, 1) if avg_rating else 0.0
+    def save(self, *args, **kwargs):
+        from .geo import encode
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode(float(self.latitude), float(self.longitude))
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        elif update_fields is None and not self._state.adding:
+            # Never write back rating totals read before a concurrent review changed them
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.RATING_FIELDS
+            ]
+        super().save(*args, **kwargs)
     
     @property
-    def reviews_count(self):
-        return self.reviews.count()
+    def rating(self):
+        return round(self.rating_avg, 1)
 
 
 class VenueImage(models.Model):
@@ -108,4 +169,59 @@ class BlockedDate(models.Model):
         ]
     
     def __str__(self):
-        return f"{self.venue.name} - {self.date}"
\ No newline at end of file
+        return f"{self.venue.name} - {self.date}"
+
+
+class Review(models.Model):
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE, related_name='reviews')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reviews')
+    rating = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
+    comment = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'reviews'
+        unique_together = ('venue', 'user')
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.user.email} - {self.venue.name} ({self.rating})"
+
+
+class VenueOccupancy(models.Model):
+    """Occupancy bitmap for one block of BLOCK_DAYS days (see venues.availability).
+    
+    Bit n of ``mask`` is set when day n of the block is booked or blocked.
+    Blocks with no occupied day are not stored.
+    """
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE, related_name='occupancy')
+    block = models.IntegerField()
+    mask = models.BigIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'venue_occupancy'
+        unique_together = ('venue', 'block')
+    
+    def __str__(self):
+        return f"{self.venue_id} - block {self.block}"
+
+
+class FeaturedRanking(models.Model):
+    """Materialized top venues per scope, maintained by venues.rankings.
+    
+    ``scope`` is a city code, or GLOBAL_SCOPE for the whole catalogue.
+    """
+    GLOBAL_SCOPE = '*'
+    
+    scope = models.CharField(max_length=50)
+    position = models.PositiveSmallIntegerField()
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE, related_name='featured_rankings')
+    score = models.FloatField()
+    
+    class Meta:
+        db_table = 'featured_rankings'
+        ordering = ['scope', 'position']
+        unique_together = [('scope', 'position'), ('scope', 'venue')]
+    
+    def __str__(self):
+        return f"{self.scope} #{self.position} - {self.venue_id}"
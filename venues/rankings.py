@@ -0,0 +1,72 @@
+"""
+Featured venue rankings.
+
+FeaturedRanking keeps the top FEATURED_RANKING_SIZE active venues by rating,
+globally and per city, so the featured endpoint is one indexed lookup on
+(scope, position) instead of sorting the catalogue per request.
+
+`rebuild_featured_rankings` recomputes every scope (run it from cron); venue
+and review signals call `patch_venue`, which re-ranks a scope only when the
+change can alter it.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Min, Q
+from .models import Venue, FeaturedRanking
+
+GLOBAL_SCOPE = FeaturedRanking.GLOBAL_SCOPE
+
+
+def ranking_size():
+    return getattr(settings, 'FEATURED_RANKING_SIZE', 12)
+
+
+def all_scopes():
+    return [GLOBAL_SCOPE] + [code for code, _ in Venue.CITY_CHOICES]
+
+
+def rerank(scope):
+    """Recompute one scope from the (is_active, -rating_avg) index."""
+    venues = Venue.objects.filter(is_active=True)
+    if scope != GLOBAL_SCOPE:
+        venues = venues.filter(city=scope)
+    top = venues.order_by('-rating_avg', '-created_at', '-id').values_list('id', 'rating_avg')[:ranking_size()]
+    try:
+        with transaction.atomic():
+            FeaturedRanking.objects.filter(scope=scope).delete()
+            FeaturedRanking.objects.bulk_create([
+                FeaturedRanking(scope=scope, position=position, venue_id=venue_id, score=score)
+                for position, (venue_id, score) in enumerate(top, start=1)
+            ])
+    except IntegrityError:
+        # A concurrent rerank of the same scope won; its rows are just as fresh
+        pass
+
+
+def rebuild():
+    for scope in all_scopes():
+        rerank(scope)
+
+
+def _can_change(scope, venue_id, rating, active):
+    current = FeaturedRanking.objects.filter(scope=scope).aggregate(
+        ranked=Count('id'),
+        lowest=Min('score'),
+        present=Count('id', filter=Q(venue_id=venue_id)),
+    )
+    if current['present']:
+        return True
+    return active and (current['ranked'] < ranking_size() or rating >= current['lowest'])
+
+
+def patch_venue(venue_id, extra_scopes=()):
+    """Re-rank the scopes a venue's current rating/city/status can affect."""
+    venue = Venue.objects.filter(pk=venue_id).values('city', 'rating_avg', 'is_active').first()
+    if venue is None:
+        scopes = set(FeaturedRanking.objects.filter(venue_id=venue_id).values_list('scope', flat=True))
+        for scope in scopes | set(extra_scopes):
+            rerank(scope)
+        return
+    for scope in {GLOBAL_SCOPE, venue['city'], *extra_scopes}:
+        if _can_change(scope, venue_id, venue['rating_avg'], venue['is_active']):
+            rerank(scope)
@@ -0,0 +1,161 @@
+"""
+Full-text search backends for venues.
+
+SQLite uses an external-content FTS5 table (``venues_fts``) kept in sync by
+triggers; PostgreSQL uses a generated ``search_vector`` tsvector column with a
+GIN index. Both are installed by ``install_index`` from the venues migrations
+and re-checked on post_migrate, because SQLite drops triggers whenever a later
+migration rebuilds the ``venues`` table.
+
+Set ``VENUE_SEARCH_BACKEND`` to a dotted path to override the vendor default.
+"""
+import re
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework import filters
+
+SEARCH_COLUMNS = ['name', 'description', 'address']
+
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS venues_fts USING fts5("
+    "name, description, address, content='venues', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS venues_fts_ai AFTER INSERT ON venues BEGIN "
+    "INSERT INTO venues_fts(rowid, name, description, address) "
+    "VALUES (new.id, new.name, new.description, new.address); END",
+    "CREATE TRIGGER IF NOT EXISTS venues_fts_ad AFTER DELETE ON venues BEGIN "
+    "INSERT INTO venues_fts(venues_fts, rowid, name, description, address) "
+    "VALUES ('delete', old.id, old.name, old.description, old.address); END",
+    "CREATE TRIGGER IF NOT EXISTS venues_fts_au AFTER UPDATE OF name, description, address ON venues BEGIN "
+    "INSERT INTO venues_fts(venues_fts, rowid, name, description, address) "
+    "VALUES ('delete', old.id, old.name, old.description, old.address); "
+    "INSERT INTO venues_fts(rowid, name, description, address) "
+    "VALUES (new.id, new.name, new.description, new.address); END",
+]
+
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS venues_fts_ai",
+    "DROP TRIGGER IF EXISTS venues_fts_ad",
+    "DROP TRIGGER IF EXISTS venues_fts_au",
+    "DROP TABLE IF EXISTS venues_fts",
+]
+
+POSTGRES_INSTALL = [
+    "ALTER TABLE venues ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(address, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')) STORED",
+    "CREATE INDEX IF NOT EXISTS venues_search_vector_gin ON venues USING gin (search_vector)",
+]
+
+POSTGRES_UNINSTALL = [
+    "DROP INDEX IF EXISTS venues_search_vector_gin",
+    "ALTER TABLE venues DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def install_index(conn=connection):
+    """Create the vendor's search index if missing. Safe to call repeatedly."""
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+                ['venues_fts_ai', 'venues_fts_ad', 'venues_fts_au']
+            )
+            if cursor.fetchone()[0] == 3:
+                return
+            for statement in SQLITE_INSTALL:
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO venues_fts(venues_fts) VALUES ('rebuild')")
+        elif conn.vendor == 'postgresql':
+            for statement in POSTGRES_INSTALL:
+                cursor.execute(statement)
+
+
+def uninstall_index(conn=connection):
+    statements = {'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRES_UNINSTALL}.get(conn.vendor, [])
+    with conn.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def search_tokens(terms):
+    return [t for t in (re.sub(r'[^\w-]', '', term) for term in terms) if t]
+
+
+class BaseSearchBackend:
+    """Filters a venue queryset to matches and annotates ``search_rank`` (higher is better)."""
+    
+    def search(self, queryset, terms):
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    def search(self, queryset, terms):
+        tokens = search_tokens(terms)
+        if not tokens:
+            return queryset.none()
+        # Every token must match, each as a prefix: "conf"* "douala"*
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        # Joined rather than correlated so FTS5 evaluates the MATCH once
+        return queryset.extra(
+            tables=['venues_fts'],
+            where=['venues_fts.rowid = venues.id', 'venues_fts MATCH %s'],
+            params=[match],
+        ).annotate(search_rank=RawSQL('-venues_fts.rank', [], output_field=FloatField()))
+
+
+class PostgresFTSBackend(BaseSearchBackend):
+    def search(self, queryset, terms):
+        query = ' '.join(terms)
+        return queryset.annotate(
+            search_rank=RawSQL(
+                "ts_rank(venues.search_vector, websearch_to_tsquery('simple', %s))",
+                [query], output_field=FloatField()
+            )
+        ).filter(RawSQL(
+            "venues.search_vector @@ websearch_to_tsquery('simple', %s)",
+            [query], output_field=BooleanField()
+        ))
+
+
+class LikeSearchBackend(BaseSearchBackend):
+    """Unindexed fallback: every term must appear in one of the search columns."""
+    
+    def search(self, queryset, terms):
+        from django.db.models import Q, Value
+        for term in terms:
+            condition = Q()
+            for column in SEARCH_COLUMNS:
+                condition |= Q(**{f'{column}__icontains': term})
+            queryset = queryset.filter(condition)
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+DEFAULT_BACKENDS = {
+    'sqlite': SQLiteFTSBackend,
+    'postgresql': PostgresFTSBackend,
+}
+
+
+def get_backend():
+    path = getattr(settings, 'VENUE_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return DEFAULT_BACKENDS.get(connection.vendor, LikeSearchBackend)()
+
+
+class VenueSearchFilter(filters.SearchFilter):
+    """``?search=`` backed by the full-text index, ranked by relevance.
+    
+    An explicit ``?ordering=`` still wins, since OrderingFilter runs afterwards.
+    """
+    
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return get_backend().search(queryset, terms).order_by('-search_rank', '-created_at')
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Venue, VenueImage, Amenity, VenueAmenity, BlockedDate
+from .models import Venue, VenueImage, Amenity, VenueAmenity, BlockedDate, Review
 
 class AmenitySerializer(serializers.ModelSerializer):
     class Meta:
@@ -22,19 +22,23 @@ class VenueImageSerializer(serializers.ModelSerializer):
 
 
 class VenueListSerializer(serializers.ModelSerializer):
+    """Expects a queryset built with Venue.objects.with_list_data()."""
     images = serializers.SerializerMethodField()
     amenities = serializers.SerializerMethodField()
     rating = serializers.FloatField(read_only=True)
-    available = serializers.SerializerMethodField()
+    # Annotated by with_list_data(available_on=...); free unless a day was asked about
+    available = serializers.BooleanField(read_only=True, default=True)
+    distance_km = serializers.SerializerMethodField()
     
     class Meta:
         model = Venue
         fields = ['id', 'name', 'city', 'capacity', 'price_per_day', 'rating', 
-                  'reviews_count', 'images', 'amenities', 'available']
+                  'reviews_count', 'images', 'amenities', 'available', 'distance_km']
     
     def get_images(self, obj):
         request = self.context.get('request')
-        images = obj.images.all()[:2]
+        # Slice the prefetched list rather than the queryset so no query is issued
+        images = list(obj.images.all())[:2]
         image_urls = []
         for img in images:
             if request:
@@ -44,13 +48,11 @@ class VenueListSerializer(serializers.ModelSerializer):
         return image_urls
     
     def get_amenities(self, obj):
-        return [va.amenity.name for va in obj.venueamenity_set.select_related('amenity').all()]
+        return [va.amenity.name for va in obj.venueamenity_set.all()]
     
-    def get_available(self, obj):
-        request_date = self.context.get('date')
-        if request_date:
-            return not obj.blocked_dates.filter(date=request_date).exists()
-        return True
+    def get_distance_km(self, obj):
+        distance = getattr(obj, 'distance_km', None)
+        return round(distance, 2) if distance is not None else None
 
 
 class VenueDetailSerializer(serializers.ModelSerializer):
@@ -79,6 +81,34 @@ class VenueDetailSerializer(serializers.ModelSerializer):
         }
 
 
+class ReviewSerializer(serializers.ModelSerializer):
+    user_name = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Review
+        fields = ['id', 'venue', 'user_name', 'rating', 'comment', 'created_at']
+        read_only_fields = ['id', 'created_at']
+    
+    def get_user_name(self, obj):
+        return f"{obj.user.first_name} {obj.user.last_name}"
+    
+    def validate_venue(self, value):
+        if self.instance and value != self.instance.venue:
+            raise serializers.ValidationError("A review cannot be moved to another venue")
+        return value
+    
+    def validate(self, data):
+        if self.instance is None:
+            from booking.models import Booking
+            user = self.context['request'].user
+            venue = data['venue']
+            if Review.objects.filter(venue=venue, user=user).exists():
+                raise serializers.ValidationError("You have already reviewed this venue")
+            if not Booking.objects.filter(venue=venue, renter=user, status='COMPLETED').exists():
+                raise serializers.ValidationError("You can only review venues you have completed a booking at")
+        return data
+
+
 class VenueCreateSerializer(serializers.ModelSerializer):
     amenities = serializers.ListField(
         child=serializers.CharField(),
@@ -147,4 +177,20 @@ class VenueCreateSerializer(serializers.ModelSerializer):
             for date in blocked_dates:
                 BlockedDate.objects.create(venue=instance, date=date)
         
-        return instance
\ No newline at end of file
+        return instance
+
+class QuoteItemSerializer(serializers.Serializer):
+    venue_id = serializers.IntegerField()
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    
+    def validate(self, data):
+        if data['start_date'] >= data['end_date']:
+            raise serializers.ValidationError("End date must be after start date")
+        return data
+
+
+class QuoteRequestSerializer(serializers.Serializer):
+    MAX_ITEMS = 100
+    
+    items = QuoteItemSerializer(many=True, allow_empty=False, max_length=MAX_ITEMS)
@@ -0,0 +1,89 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from users.models import User
+from .models import Venue, VenueImage, VenueAmenity, BlockedDate, Review
+from . import availability, cache, rankings, search
+
+
+@receiver(post_save, sender=BlockedDate)
+@receiver(post_delete, sender=BlockedDate)
+def refresh_blocked_date_occupancy(sender, instance, **kwargs):
+    availability.refresh(instance.venue_id, instance.date, instance.date)
+
+
+def ensure_search_index(sender, using, **kwargs):
+    from django.db import connections
+    conn = connections[using]
+    if Venue._meta.db_table in conn.introspection.table_names():
+        search.install_index(conn)
+
+
+@receiver(post_init, sender=Review)
+def remember_loaded_rating(sender, instance, **kwargs):
+    instance._loaded_rating = (instance.__dict__.get('venue_id'), instance.__dict__.get('rating'))
+
+
+@receiver(post_save, sender=Review)
+def apply_review_rating(sender, instance, created, **kwargs):
+    old_venue_id, old_rating = instance._loaded_rating
+    if created:
+        Venue.objects.filter(pk=instance.venue_id).adjust_rating(instance.rating, 1)
+    elif old_venue_id != instance.venue_id:
+        Venue.objects.filter(pk=old_venue_id).adjust_rating(-old_rating, -1)
+        Venue.objects.filter(pk=instance.venue_id).adjust_rating(instance.rating, 1)
+        rankings.patch_venue(old_venue_id)
+    elif old_rating != instance.rating:
+        Venue.objects.filter(pk=instance.venue_id).adjust_rating(instance.rating - old_rating, 0)
+    else:
+        return
+    rankings.patch_venue(instance.venue_id)
+    remember_loaded_rating(sender, instance)
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_rating(sender, instance, **kwargs):
+    Venue.objects.filter(pk=instance.venue_id).adjust_rating(-instance.rating, -1)
+    rankings.patch_venue(instance.venue_id)
+
+
+@receiver(post_init, sender=Venue)
+def remember_loaded_ranking_fields(sender, instance, **kwargs):
+    instance._loaded_ranking_fields = (instance.__dict__.get('city'), instance.__dict__.get('is_active'))
+
+
+@receiver(post_save, sender=Venue)
+def patch_featured_rankings(sender, instance, created, **kwargs):
+    old_city, old_active = instance._loaded_ranking_fields
+    if created or (old_city, old_active) != (instance.city, instance.is_active):
+        rankings.patch_venue(instance.pk, extra_scopes=[old_city] if old_city else [])
+    remember_loaded_ranking_fields(sender, instance)
+
+
+@receiver(post_delete, sender=Venue)
+def drop_featured_rankings(sender, instance, **kwargs):
+    rankings.patch_venue(instance.pk, extra_scopes=[rankings.GLOBAL_SCOPE, instance.city])
+
+
+@receiver(post_save, sender=Venue)
+@receiver(post_delete, sender=Venue)
+def bump_venue_cache(sender, instance, **kwargs):
+    cache.bump([instance.pk])
+
+
+@receiver(post_save, sender=VenueImage)
+@receiver(post_delete, sender=VenueImage)
+@receiver(post_save, sender=VenueAmenity)
+@receiver(post_delete, sender=VenueAmenity)
+@receiver(post_save, sender=BlockedDate)
+@receiver(post_delete, sender=BlockedDate)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def bump_related_venue_cache(sender, instance, **kwargs):
+    cache.bump([instance.venue_id])
+
+
+@receiver(post_save, sender=User)
+def bump_owned_venues_cache(sender, instance, created, **kwargs):
+    # Venue detail responses embed the owner's name and phone
+    if not created and instance.role == 'VENDOR':
+        cache.bump(Venue.objects.filter(owner=instance).values_list('id', flat=True))
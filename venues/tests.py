@@ -1,3 +1,979 @@
-from django.test import TestCase
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connection, connections, router, transaction
+from django.db.backends.signals import connection_created
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.db.utils import ConnectionHandler
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from config import sqlite
+from config.database import POSTGRESQL, SQLITE, database_settings, parse_url
+from config.routers import ReplicaMiddleware, use_primary
+from users.models import User
+from .models import (
+    Venue, VenueImage, Amenity, VenueAmenity, Review, BlockedDate, VenueOccupancy, FeaturedRanking,
+)
+from . import availability, geo
+from . import cache as response_cache
 
-# Create your tests here.
+
+def make_user(email, role='RENTER'):
+    return User.objects.create_user(
+        email=email, username=email.split('@')[0], password='secret123',
+        first_name='Test', last_name='User', phone='600000000', role=role
+    )
+
+
+def make_venue(owner, name='Hall', **kwargs):
+    defaults = {
+        'description': 'A venue', 'city': 'Douala', 'address': 'Bonapriso',
+        'capacity': 100, 'price_per_day': 50000,
+    }
+    defaults.update(kwargs)
+    return Venue.objects.create(owner=owner, name=name, **defaults)
+
+
+class VenueListQueryCountTests(TestCase):
+    """A page of venues must cost the same number of queries whatever its size."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.vendor = make_user('vendor@example.com', role='VENDOR')
+        self.renters = [make_user(f'renter{i}@example.com') for i in range(2)]
+        self.amenities = [
+            Amenity.objects.create(name=name) for name in ['Parking', 'WiFi', 'Stage']
+        ]
+
+    def add_venues(self, count):
+        venues = []
+        for i in range(count):
+            venue = make_venue(self.vendor, name=f'Hall {Venue.objects.count()}')
+            for j in range(3):
+                VenueImage.objects.create(venue=venue, image=f'venues/{i}_{j}.jpg', is_primary=(j == 0))
+            for amenity in self.amenities[:2]:
+                VenueAmenity.objects.create(venue=venue, amenity=amenity)
+            for renter in self.renters:
+                Review.objects.create(venue=venue, user=renter, rating=4)
+            venues.append(venue)
+        return venues
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def assertConstantQueries(self, url):
+        self.add_venues(2)
+        small, _ = self.count_queries(url)
+        self.add_venues(18)
+        large, response = self.count_queries(url)
+        self.assertEqual(small, large, f'{url} grew from {small} to {large} queries')
+        return large, response
+
+    def test_list_is_constant(self):
+        queries, response = self.assertConstantQueries('/api/venues/')
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertLessEqual(queries, 3)
+        first = response.data['results'][0]
+        self.assertEqual(len(first['images']), 2)
+        self.assertEqual(sorted(first['amenities']), ['Parking', 'WiFi'])
+        self.assertEqual(first['rating'], 4.0)
+        self.assertEqual(first['reviews_count'], 2)
+
+    def test_filtered_list_is_constant(self):
+        self.assertConstantQueries('/api/venues/?amenities=parking,wifi&date=2030-01-01')
+
+    def test_featured_is_constant(self):
+        queries, response = self.assertConstantQueries('/api/venues/featured/')
+        self.assertEqual(len(response.data['venues']), 6)
+        self.assertLessEqual(queries, 3)
+
+    def test_favorites_is_constant(self):
+        from users.models import Favorite
+        renter = self.renters[0]
+        self.client.force_authenticate(renter)
+        self.add_venues(2)
+        for venue in Venue.objects.all():
+            Favorite.objects.get_or_create(user=renter, venue=venue)
+        small, _ = self.count_queries('/api/users/favorites/list/')
+        for venue in self.add_venues(18):
+            Favorite.objects.create(user=renter, venue=venue)
+        large, response = self.count_queries('/api/users/favorites/list/')
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.data['venues']), 20)
+
+    def test_date_filter_hides_blocked_and_booked_venues(self):
+        from datetime import date
+        from .models import BlockedDate
+        from booking.models import Booking
+        free, blocked, booked = self.add_venues(3)
+        BlockedDate.objects.create(venue=blocked, date=date(2030, 1, 1))
+        Booking.objects.create(
+            venue=booked, renter=self.renters[0],
+            start_date=date(2029, 12, 31), end_date=date(2030, 1, 2),
+            guests_count=10, event_type='WEDDING', contact_phone='600000000',
+            subtotal=0, commission=0, deposit_amount=0, total_amount=0,
+        )
+        response = self.client.get('/api/venues/?date=2030-01-01')
+        self.assertEqual([v['id'] for v in response.data['results']], [free.pk])
+        self.assertTrue(response.data['results'][0]['available'])
+
+
+class AvailabilityBitmapTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.vendor = make_user('vendor@example.com', role='VENDOR')
+        self.renter = make_user('renter@example.com')
+        self.venue = make_venue(self.vendor)
+        self.other = make_venue(self.vendor, name='Garden')
+        self.day = date(2030, 1, 30)
+
+    def book(self, venue, start, end, status='PENDING'):
+        from booking.models import Booking
+        return Booking.objects.create(
+            venue=venue, renter=self.renter, start_date=start, end_date=end,
+            guests_count=10, event_type='WEDDING', contact_phone='600000000',
+            subtotal=0, commission=0, deposit_amount=0, total_amount=0, status=status
+        )
+
+    def test_range_masks_span_blocks(self):
+        masks = availability.range_masks(self.day, self.day + timedelta(days=40))
+        self.assertEqual(sum(bin(m).count('1') for m in masks.values()), 41)
+        self.assertEqual(len(masks), 2)
+
+    def test_booking_lifecycle_updates_bitmap(self):
+        end = self.day + timedelta(days=3)
+        booking = self.book(self.venue, self.day, end)
+        self.assertFalse(availability.is_free(self.venue.id, end, end + timedelta(days=5)))
+        self.assertTrue(availability.is_free(self.venue.id, end + timedelta(days=1), end + timedelta(days=5)))
+        self.assertTrue(availability.is_free(self.other.id, self.day, end))
+        
+        booking.status = 'CANCELLED'
+        booking.save()
+        self.assertTrue(availability.is_free(self.venue.id, self.day, end))
+        
+        booking.status = 'CONFIRMED'
+        booking.save()
+        booking.delete()
+        self.assertTrue(availability.is_free(self.venue.id, self.day, end))
+        self.assertFalse(VenueOccupancy.objects.exists())
+
+    def test_blocked_dates_update_bitmap(self):
+        blocked = BlockedDate.objects.create(venue=self.venue, date=self.day)
+        self.assertFalse(availability.is_free(self.venue.id, self.day, self.day))
+        blocked.delete()
+        self.assertTrue(availability.is_free(self.venue.id, self.day, self.day))
+
+    def test_rebuild_matches_incremental(self):
+        self.book(self.venue, self.day, self.day + timedelta(days=70))
+        BlockedDate.objects.create(venue=self.other, date=self.day)
+        incremental = set(VenueOccupancy.objects.values_list('venue_id', 'block', 'mask'))
+        availability.rebuild()
+        self.assertEqual(set(VenueOccupancy.objects.values_list('venue_id', 'block', 'mask')), incremental)
+
+    def test_date_filter_and_check_availability(self):
+        self.book(self.venue, self.day, self.day + timedelta(days=1))
+        response = self.client.get('/api/venues/', {'date': self.day.isoformat()})
+        self.assertEqual([v['id'] for v in response.data['results']], [self.other.id])
+        self.assertTrue(response.data['results'][0]['available'])
+
+        from .serializers import VenueListSerializer
+        venues = Venue.objects.with_list_data(available_on=self.day).order_by('pk')
+        with self.assertNumQueries(3):
+            data = VenueListSerializer(venues, many=True).data
+        self.assertEqual([v['available'] for v in data], [False, True])
+
+        response = self.client.get(f'/api/venues/{self.venue.id}/check_availability/', {
+            'start_date': (self.day - timedelta(days=2)).isoformat(),
+            'end_date': self.day.isoformat(),
+        })
+        self.assertFalse(response.data['available'])
+
+    def test_range_filter_requires_every_day_free(self):
+        self.book(self.venue, self.day + timedelta(days=3), self.day + timedelta(days=4))
+        BlockedDate.objects.create(venue=self.other, date=self.day + timedelta(days=40))
+        
+        def free_ids(start, end):
+            response = self.client.get('/api/venues/', {
+                'start_date': start.isoformat(), 'end_date': end.isoformat()
+            })
+            return {v['id'] for v in response.data['results']}
+        
+        self.assertEqual(free_ids(self.day, self.day + timedelta(days=2)), {self.venue.id, self.other.id})
+        self.assertEqual(free_ids(self.day, self.day + timedelta(days=3)), {self.other.id})
+        self.assertEqual(free_ids(self.day, self.day + timedelta(days=45)), set())
+
+
+class AvailabilityConcurrencyTests(TransactionTestCase):
+    THREADS = 8
+
+    def test_concurrent_bookings_sharing_blocks_keep_every_day(self):
+        from booking.models import Booking
+        renter = make_user('renter@example.com')
+        venue = make_venue(make_user('vendor@example.com', role='VENDOR'))
+        block = availability.day_number(date(2030, 1, 1)) // availability.BLOCK_DAYS
+        # Two-day stays on different days, across the end of one block and the start of the next
+        start = availability.block_range(block + 1)[0] - timedelta(days=self.THREADS)
+        barrier = threading.Barrier(self.THREADS)
+        outcomes = []
+
+        def attempt(offset):
+            first = start + timedelta(days=2 * offset)
+            booking = Booking(
+                venue=venue, renter=renter, start_date=first, end_date=first + timedelta(days=1),
+                guests_count=10, event_type='WEDDING', contact_phone='600000000',
+                subtotal=0, commission=0, deposit_amount=0, total_amount=0,
+            )
+            barrier.wait()
+            try:
+                for _ in range(200):
+                    try:
+                        booking.save()
+                        outcomes.append('booked')
+                        return
+                    except OperationalError:
+                        # SQLite allows one writer; wait for the lock and retry
+                        time.sleep(0.005)
+                outcomes.append('gave up')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(outcomes, ['booked'] * self.THREADS)
+        self.assertEqual(dict(VenueOccupancy.objects.values_list('block', 'mask')), {
+            block: ((1 << self.THREADS) - 1) << (availability.BLOCK_DAYS - self.THREADS),
+            block + 1: (1 << self.THREADS) - 1,
+        })
+        incremental = set(VenueOccupancy.objects.values_list('block', 'mask'))
+        availability.rebuild()
+        self.assertEqual(set(VenueOccupancy.objects.values_list('block', 'mask')), incremental)
+
+
+class VenueSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        vendor = make_user('vendor@example.com', role='VENDOR')
+        self.hall = make_venue(vendor, name='Conference Hall', description='Seats for a conference',
+                               address='Akwa')
+        self.garden = make_venue(vendor, name='Palm Garden', description='Open air, good for a conference',
+                                 address='Bonanjo')
+        self.beach = make_venue(vendor, name='Beach House', description='Weddings by the sea',
+                                address='Kribi seafront')
+
+    def search(self, query, **params):
+        response = self.client.get('/api/venues/', {'search': query, **params})
+        return [v['id'] for v in response.data['results']]
+
+    def test_ranks_name_matches_first(self):
+        self.assertEqual(self.search('conference'), [self.hall.id, self.garden.id])
+
+    def test_all_terms_must_match_as_prefixes(self):
+        self.assertEqual(self.search('confer akwa'), [self.hall.id])
+        self.assertEqual(self.search('wedd'), [self.beach.id])
+        self.assertEqual(self.search('"); DROP'), [])
+
+    def test_index_follows_venue_writes(self):
+        self.beach.name = 'Seaside Conference Centre'
+        self.beach.save()
+        self.assertIn(self.beach.id, self.search('conference'))
+        self.hall.delete()
+        self.assertEqual(self.search('seats'), [])
+
+    def test_explicit_ordering_wins(self):
+        self.garden.price_per_day = 1
+        self.garden.save()
+        self.assertEqual(self.search('conference', ordering='price_per_day'), [self.garden.id, self.hall.id])
+
+
+class GeoSearchTests(TestCase):
+    # Douala city centre; Bonaberi is ~5 km away, Limbe ~60 km, Yaounde ~200 km
+    CENTRE = (4.0511, 9.7679)
+
+    def setUp(self):
+        self.client = APIClient()
+        vendor = make_user('vendor@example.com', role='VENDOR')
+        self.akwa = make_venue(vendor, name='Akwa', latitude='4.0500', longitude='9.7000')
+        self.bonaberi = make_venue(vendor, name='Bonaberi', latitude='4.0730', longitude='9.6780')
+        self.limbe = make_venue(vendor, name='Limbe', latitude='4.0167', longitude='9.2000')
+        self.yaounde = make_venue(vendor, name='Yaounde', latitude='3.8480', longitude='11.5021')
+        self.unplaced = make_venue(vendor, name='Unknown')
+
+    def near(self, radius_km):
+        response = self.client.get('/api/venues/', {
+            'near': '%s,%s' % self.CENTRE, 'radius_km': radius_km
+        })
+        return response.data['results']
+
+    def test_geohash_follows_coordinates(self):
+        self.assertEqual(self.akwa.geohash, geo.encode(4.05, 9.7))
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.unplaced.latitude, self.unplaced.longitude = 4.05, 9.7
+        self.unplaced.save(update_fields=['latitude', 'longitude'])
+        self.unplaced.refresh_from_db()
+        self.assertEqual(self.unplaced.geohash, self.akwa.geohash)
+
+    def test_radius_filter_is_exact_and_ordered_by_distance(self):
+        results = self.near(15)
+        self.assertEqual([v['id'] for v in results], [self.akwa.id, self.bonaberi.id])
+        expected = geo.haversine_km(*self.CENTRE, 4.05, 9.7)
+        self.assertAlmostEqual(results[0]['distance_km'], expected, places=1)
+        self.assertEqual([v['id'] for v in self.near(80)], [self.akwa.id, self.bonaberi.id, self.limbe.id])
+
+    def test_covering_cells_contain_every_venue_in_radius(self):
+        for radius in [0.5, 5, 50, 300]:
+            cells = geo.covering_cells(*self.CENTRE, radius)
+            self.assertLessEqual(len(cells), geo.MAX_COVER_CELLS)
+            for venue in [self.akwa, self.bonaberi, self.limbe, self.yaounde]:
+                lat, lng = float(venue.latitude), float(venue.longitude)
+                if geo.haversine_km(*self.CENTRE, lat, lng) <= radius:
+                    self.assertTrue(any(venue.geohash.startswith(c) for c in cells), (radius, venue.name))
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        vendor = make_user('vendor@example.com', role='VENDOR')
+        for i in range(25):
+            # Few distinct prices so most page boundaries fall inside a tie
+            make_venue(vendor, name=f'Conference Hall {i}', price_per_day=1000 * (i % 3), capacity=10 + i)
+
+    def walk(self, params):
+        ids, url, pages = [], '/api/venues/', 0
+        response = self.client.get(url, {**params, 'page_size': 4})
+        while True:
+            pages += 1
+            ids.extend(v['id'] for v in response.data['results'])
+            if not response.data['next']:
+                return ids, response, pages
+            response = self.client.get(response.data['next'])
+
+    def expected(self, *ordering):
+        return list(Venue.objects.order_by(*ordering, 'id').values_list('id', flat=True))
+
+    def test_walks_every_ordering_without_gaps_or_duplicates(self):
+        for ordering in ['price_per_day', '-price_per_day', 'capacity', '-created_at']:
+            ids, _, pages = self.walk({'ordering': ordering})
+            expected = self.expected(ordering) if not ordering.startswith('-') else \
+                list(Venue.objects.order_by(ordering, '-id').values_list('id', flat=True))
+            self.assertEqual(ids, expected, ordering)
+            self.assertEqual(pages, 7)
+
+    def test_previous_links_walk_back(self):
+        ids, response, _ = self.walk({'ordering': 'price_per_day'})
+        back = []
+        while response.data['previous']:
+            response = self.client.get(response.data['previous'])
+            back = [v['id'] for v in response.data['results']] + back
+        self.assertEqual(back, ids[:len(back)])
+        self.assertEqual(len(back), 24)
+
+    def test_search_results_page_by_rank(self):
+        ids, _, _ = self.walk({'search': 'conference'})
+        self.assertEqual(sorted(ids), sorted(Venue.objects.values_list('id', flat=True)))
+
+    def test_deep_pages_cost_the_same_as_page_one(self):
+        first = self.client.get('/api/venues/', {'ordering': 'price_per_day', 'page_size': 4})
+        response = first
+        for _ in range(5):
+            response = self.client.get(response.data['next'])
+        cache.clear()
+        with CaptureQueriesContext(connection) as page_one:
+            self.client.get('/api/venues/', {'ordering': 'price_per_day', 'page_size': 4})
+        with CaptureQueriesContext(connection) as deep:
+            self.client.get(response.request['PATH_INFO'] + '?' + response.request['QUERY_STRING'])
+        self.assertEqual(len(deep), len(page_one))
+        self.assertFalse(any('COUNT(*)' in q['sql'].upper() for q in deep.captured_queries))
+        self.assertFalse(any('OFFSET' in q['sql'].upper() for q in deep.captured_queries))
+
+    def test_counts_and_bad_cursor(self):
+        self.assertNotIn('count', self.client.get('/api/venues/').data)
+        self.assertEqual(self.client.get('/api/venues/', {'count': 'exact'}).data['count'], 25)
+        self.assertEqual(self.client.get('/api/venues/', {'count': 'estimate'}).data['count'], 25)
+        self.assertEqual(self.client.get('/api/venues/', {'cursor': 'garbage'}).status_code, 404)
+
+
+class ReviewRatingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.vendor = make_user('vendor@example.com', role='VENDOR')
+        self.renters = [make_user(f'renter{i}@example.com') for i in range(3)]
+        self.venue = make_venue(self.vendor)
+        self.other = make_venue(self.vendor, name='Garden')
+
+    def complete_booking(self, renter, venue):
+        from booking.models import Booking
+        Booking.objects.create(
+            venue=venue, renter=renter, start_date=date(2024, 1, 1), end_date=date(2024, 1, 2),
+            guests_count=10, event_type='OTHER', contact_phone='600000000', status='COMPLETED',
+            subtotal=0, commission=0, deposit_amount=0, total_amount=0
+        )
+
+    def totals(self, venue):
+        venue.refresh_from_db()
+        return venue.rating_sum, venue.reviews_count, venue.rating_avg
+
+    def test_running_totals_follow_create_edit_delete(self):
+        first = Review.objects.create(venue=self.venue, user=self.renters[0], rating=5)
+        Review.objects.create(venue=self.venue, user=self.renters[1], rating=2)
+        self.assertEqual(self.totals(self.venue), (7, 2, 3.5))
+        
+        first.rating = 3
+        first.save()
+        self.assertEqual(self.totals(self.venue), (5, 2, 2.5))
+        
+        first.delete()
+        Review.objects.filter(user=self.renters[1]).delete()
+        self.assertEqual(self.totals(self.venue), (0, 0, 0.0))
+
+    def test_stale_venue_save_keeps_totals(self):
+        stale = Venue.objects.get(pk=self.venue.pk)
+        Review.objects.create(venue=self.venue, user=self.renters[0], rating=4)
+        stale.name = 'Renamed'
+        stale.save()
+        self.assertEqual(self.totals(self.venue), (4, 1, 4.0))
+        self.assertEqual(self.venue.name, 'Renamed')
+
+    def test_review_api_requires_completed_booking(self):
+        renter = self.renters[0]
+        self.client.force_authenticate(renter)
+        payload = {'venue': self.venue.id, 'rating': 5, 'comment': 'Great'}
+        self.assertEqual(self.client.post('/api/reviews/', payload).status_code, 400)
+        
+        self.complete_booking(renter, self.venue)
+        response = self.client.post('/api/reviews/', payload)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.post('/api/reviews/', payload).status_code, 400)
+        
+        review_id = response.data['id']
+        self.client.patch(f'/api/reviews/{review_id}/', {'rating': 1})
+        self.assertEqual(self.totals(self.venue), (1, 1, 1.0))
+        
+        self.client.force_authenticate(self.renters[1])
+        self.assertEqual(self.client.delete(f'/api/reviews/{review_id}/').status_code, 404)
+
+    def test_list_and_featured_sort_and_filter_by_rating(self):
+        Review.objects.create(venue=self.venue, user=self.renters[0], rating=3)
+        Review.objects.create(venue=self.other, user=self.renters[0], rating=5)
+        
+        response = self.client.get('/api/venues/featured/')
+        self.assertEqual([v['id'] for v in response.data['venues']], [self.other.id, self.venue.id])
+        
+        response = self.client.get('/api/venues/', {'rating_min': 4})
+        self.assertEqual([v['id'] for v in response.data['results']], [self.other.id])
+        response = self.client.get('/api/venues/', {'rating_min': 'x'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({v['id'] for v in response.data['results']}, {self.venue.id, self.other.id})
+        
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/venues/', {'ordering': '-rating_avg'})
+        self.assertEqual([v['id'] for v in response.data['results']], [self.other.id, self.venue.id])
+        self.assertFalse(any('"reviews"' in q['sql'] for q in ctx.captured_queries))
+
+
+class AmenityFilterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        vendor = make_user('vendor@example.com', role='VENDOR')
+        self.amenities = {name: Amenity.objects.create(name=name)
+                          for name in ['Parking', 'WiFi', 'Stage', 'Pool', 'Bar']}
+        self.full = make_venue(vendor, name='Full')
+        self.partial = make_venue(vendor, name='Partial')
+        for name in self.amenities:
+            VenueAmenity.objects.create(venue=self.full, amenity=self.amenities[name])
+        for name in ['Parking', 'WiFi']:
+            VenueAmenity.objects.create(venue=self.partial, amenity=self.amenities[name])
+
+    def filter_ids(self, amenities):
+        response = self.client.get('/api/venues/', {'amenities': amenities})
+        return {v['id'] for v in response.data['results']}
+
+    def test_requires_every_amenity(self):
+        self.assertEqual(self.filter_ids('parking, WIFI'), {self.full.id, self.partial.id})
+        self.assertEqual(self.filter_ids('parking,wifi,pool'), {self.full.id})
+        self.assertEqual(self.filter_ids('parking,sauna'), set())
+        self.assertEqual(self.filter_ids('wifi,WiFi'), {self.full.id, self.partial.id})
+
+    def test_case_variant_amenities_count_once(self):
+        variant = Amenity.objects.create(name='wifi')
+        other = make_venue(self.full.owner, name='Variant')
+        VenueAmenity.objects.create(venue=other, amenity=variant)
+        VenueAmenity.objects.create(venue=other, amenity=self.amenities['Parking'])
+        self.assertEqual(self.filter_ids('wifi,parking'), {self.full.id, self.partial.id, other.id})
+
+    def test_query_shape_is_flat_in_selected_amenities(self):
+        def list_sql(amenities):
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get('/api/venues/', {'amenities': amenities})
+            return [q['sql'] for q in ctx.captured_queries]
+        
+        def venue_query(queries):
+            return next(sql for sql in queries if sql.startswith('SELECT "venues"'))
+        
+        two, five = list_sql('parking,wifi'), list_sql('parking,wifi,stage,pool,bar')
+        self.assertEqual(len(two), len(five))
+        self.assertEqual(venue_query(five).count('"venue_amenities"'), venue_query(two).count('"venue_amenities"'))
+        self.assertNotIn('DISTINCT', venue_query(five))
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.vendor = make_user('vendor@example.com', role='VENDOR')
+        self.renter = make_user('renter@example.com')
+        self.venue = make_venue(self.vendor)
+        self.other = make_venue(self.vendor, name='Garden')
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_repeat_requests_hit_without_queries(self):
+        self.assertEqual(self.get('/api/venues/', city='Douala')['X-Cache'], 'MISS')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.get('/api/venues/', city='Douala')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(len(ctx), 0)
+        # Parameter order does not matter
+        self.assertEqual(self.client.get('/api/venues/?page_size=5&city=Douala')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/venues/?city=Douala&page_size=5')['X-Cache'], 'HIT')
+
+    def test_writes_invalidate_exactly(self):
+        detail = f'/api/venues/{self.venue.id}/'
+        other_detail = f'/api/venues/{self.other.id}/'
+        for url in ['/api/venues/', detail, other_detail]:
+            self.get(url)
+        
+        VenueAmenity.objects.create(venue=self.venue, amenity=Amenity.objects.create(name='Stage'))
+        response = self.get(detail)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['amenities'], ['Stage'])
+        self.assertEqual(self.get('/api/venues/')['X-Cache'], 'MISS')
+        self.assertEqual(self.get(other_detail)['X-Cache'], 'HIT')
+
+    def test_bookings_invalidate_availability(self):
+        from booking.models import Booking
+        day = date(2030, 5, 5)
+        url = f'/api/venues/{self.venue.id}/check_availability/'
+        params = {'start_date': day.isoformat(), 'end_date': (day + timedelta(days=1)).isoformat()}
+        self.assertTrue(self.get(url, **params).data['available'])
+        self.assertEqual(len(self.get('/api/venues/', date=day.isoformat()).data['results']), 2)
+        
+        Booking.objects.create(
+            venue=self.venue, renter=self.renter, start_date=day, end_date=day,
+            guests_count=5, event_type='OTHER', contact_phone='600000000',
+            subtotal=0, commission=0, deposit_amount=0, total_amount=0
+        )
+        self.assertFalse(self.get(url, **params).data['available'])
+        self.assertEqual(len(self.get('/api/venues/', date=day.isoformat()).data['results']), 1)
+
+    def test_vendor_requests_bypass_cache(self):
+        self.client.force_authenticate(self.vendor)
+        self.assertNotIn('X-Cache', self.get('/api/venues/'))
+
+    def test_file_based_backend(self):
+        import tempfile
+        from django.test import override_settings
+        with tempfile.TemporaryDirectory() as location:
+            backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+            with override_settings(CACHES={'default': backend}):
+                self.assertEqual(self.get('/api/venues/')['X-Cache'], 'MISS')
+                self.assertEqual(self.get('/api/venues/')['X-Cache'], 'HIT')
+                self.venue.name = 'Renamed'
+                self.venue.save()
+                self.assertEqual(self.get('/api/venues/')['X-Cache'], 'MISS')
+
+
+class FeaturedRankingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.vendor = make_user('vendor@example.com', role='VENDOR')
+        self.renters = [make_user(f'renter{i}@example.com') for i in range(3)]
+        self.douala = [make_venue(self.vendor, name=f'Douala {i}') for i in range(3)]
+        self.kribi = make_venue(self.vendor, name='Kribi Beach', city='Kribi')
+
+    def featured(self, **params):
+        response = self.client.get('/api/venues/featured/', params)
+        return [v['id'] for v in response.data['venues']]
+
+    def snapshot(self):
+        return list(FeaturedRanking.objects.values_list('scope', 'position', 'venue_id', 'score'))
+
+    def test_reviews_patch_rankings(self):
+        Review.objects.create(venue=self.kribi, user=self.renters[0], rating=5)
+        Review.objects.create(venue=self.douala[2], user=self.renters[0], rating=4)
+        self.assertEqual(self.featured()[:2], [self.kribi.id, self.douala[2].id])
+        self.assertEqual(self.featured(city='Douala')[0], self.douala[2].id)
+        self.assertEqual(self.featured(city='Kribi'), [self.kribi.id])
+        
+        Review.objects.create(venue=self.douala[0], user=self.renters[1], rating=5)
+        Review.objects.create(venue=self.douala[0], user=self.renters[2], rating=5)
+        Review.objects.filter(venue=self.kribi).update(rating=1)
+        Review.objects.get(venue=self.kribi).save()
+        self.assertEqual(self.featured(city='Douala')[0], self.douala[0].id)
+
+    def test_status_and_city_changes_move_venues(self):
+        self.kribi.city = 'Douala'
+        self.kribi.save()
+        self.assertEqual(self.featured(city='Kribi'), [])
+        self.assertIn(self.kribi.id, self.featured(city='Douala'))
+        
+        self.kribi.is_active = False
+        self.kribi.save()
+        self.assertNotIn(self.kribi.id, self.featured())
+        self.douala[1].delete()
+        self.assertEqual(len(self.featured()), 2)
+
+    def test_ranking_size_is_bounded_and_rebuild_matches(self):
+        from django.core.management import call_command
+        from django.test import override_settings
+        with override_settings(FEATURED_RANKING_SIZE=2):
+            for i, venue in enumerate(self.douala):
+                Review.objects.create(venue=venue, user=self.renters[i], rating=i + 1)
+            self.assertEqual(FeaturedRanking.objects.filter(scope='*').count(), 2)
+            incremental = self.snapshot()
+            call_command('rebuild_featured_rankings', stdout=open('/dev/null', 'w'))
+            self.assertEqual(self.snapshot(), incremental)
+
+    def test_reads_ranking_in_one_venue_query(self):
+        self.client.get('/api/venues/featured/', {'city': 'Douala'})
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/venues/featured/', {'city': 'Douala'})
+        self.assertEqual(len(response.data['venues']), 3)
+        self.assertLessEqual(len(ctx), 3)
+        self.assertIn('"featured_rankings"', ctx.captured_queries[0]['sql'])
+        self.assertEqual(self.client.get('/api/venues/featured/', {'city': 'Paris'}).status_code, 400)
+
+
+class QuoteTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.vendor = make_user('vendor@example.com', role='VENDOR')
+        self.start = date.today() + timedelta(days=10)
+        self.end = self.start + timedelta(days=2)
+
+    def test_quote_matches_availability_check_and_stored_booking(self):
+        venue = make_venue(self.vendor, price_per_day='333.33')
+        response = self.client.get(f'/api/venues/{venue.id}/check_availability/', {
+            'start_date': self.start.isoformat(), 'end_date': self.end.isoformat()
+        })
+        breakdown = response.json()['price_breakdown']
+        self.assertEqual(breakdown, {
+            'days': 3, 'price_per_day': 333.33, 'subtotal': 999.99,
+            'commission': 100.0, 'deposit': 300.0, 'total': 1099.99,
+        })
+
+        self.client.force_authenticate(make_user('renter@example.com'))
+        response = self.client.post('/api/bookings/', {
+            'venue_id': venue.id, 'start_date': self.start.isoformat(), 'end_date': self.end.isoformat(),
+            'guests_count': 10, 'event_type': 'OTHER', 'contact_phone': '600000000',
+        })
+        self.assertEqual(response.status_code, 201)
+        from booking.models import Booking
+        booking = Booking.objects.get()
+        self.assertEqual(
+            [float(booking.subtotal), float(booking.commission), float(booking.deposit_amount), float(booking.total_amount)],
+            [breakdown['subtotal'], breakdown['commission'], breakdown['deposit'], breakdown['total']]
+        )
+
+    def test_quotes_many_venues_with_one_query(self):
+        venues = [make_venue(self.vendor, f'Hall {i}', price_per_day=10000 * (i + 1)) for i in range(5)]
+        items = [
+            {'venue_id': venue.id, 'start_date': self.start.isoformat(), 'end_date': self.end.isoformat()}
+            for venue in venues
+        ] + [{'venue_id': 0, 'start_date': self.start.isoformat(), 'end_date': self.end.isoformat()}]
+        with self.assertNumQueries(1):
+            response = self.client.post('/api/venues/quote/', {'items': items}, format='json')
+        self.assertEqual(response.status_code, 200)
+        quotes = response.json()['quotes']
+        self.assertEqual([q['price_breakdown']['total'] for q in quotes[:5]], [33000.0 * (i + 1) for i in range(5)])
+        self.assertIn('error', quotes[5])
+
+        response = self.client.post('/api/venues/quote/', {'items': [
+            {'venue_id': venues[0].id, 'start_date': self.end.isoformat(), 'end_date': self.start.isoformat()}
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    base_dir = Path('/srv/app')
+
+    def settings_for(self, url, **env):
+        with mock.patch.dict(os.environ, env):
+            return database_settings(self.base_dir, url)
+
+    def test_sqlite_urls(self):
+        self.assertEqual(parse_url('sqlite:///db.sqlite3', self.base_dir),
+                         {'ENGINE': SQLITE, 'NAME': self.base_dir / 'db.sqlite3'})
+        self.assertEqual(parse_url('sqlite:////var/data/db.sqlite3', self.base_dir)['NAME'],
+                         Path('/var/data/db.sqlite3'))
+        self.assertEqual(parse_url('sqlite://:memory:', self.base_dir)['NAME'], ':memory:')
+        self.assertEqual(parse_url('sqlite://', self.base_dir)['NAME'], ':memory:')
+
+    def test_postgres_urls(self):
+        expected = {
+            'ENGINE': POSTGRESQL, 'NAME': 'venues', 'USER': 'app', 'PASSWORD': 'p@ss/word',
+            'HOST': 'db.internal', 'PORT': '6432',
+            'OPTIONS': {'sslmode': 'require', 'application_name': 'web'},
+        }
+        for scheme in ['postgres', 'postgresql']:
+            url = f'{scheme}://app:p%40ss%2Fword@db.internal:6432/venues?sslmode=require&application_name=web'
+            self.assertEqual(parse_url(url, self.base_dir), expected)
+        database = parse_url('postgres://localhost/venues', self.base_dir)
+        self.assertEqual((database['HOST'], database['PORT'], database['USER']), ('localhost', '', ''))
+        with self.assertRaises(ImproperlyConfigured):
+            parse_url('mysql://localhost/venues', self.base_dir)
+
+    def test_pool_switch(self):
+        url = 'postgres://localhost/venues?sslmode=require'
+        pooled = self.settings_for(url, DB_POOL='1', DB_CONN_MAX_AGE='300', DB_POOL_MAX_SIZE='20')
+        self.assertEqual(pooled['CONN_MAX_AGE'], 0)
+        self.assertEqual(pooled['OPTIONS'], {
+            'sslmode': 'require', 'pool': {'min_size': 2, 'max_size': 20, 'timeout': 10},
+        })
+
+        persistent = self.settings_for(url, DB_POOL='0', DB_CONN_MAX_AGE='300')
+        self.assertEqual(persistent['CONN_MAX_AGE'], 300)
+        self.assertTrue(persistent['CONN_HEALTH_CHECKS'])
+        self.assertEqual(persistent['OPTIONS'], {'sslmode': 'require'})
+
+        # SQLite never pools
+        self.assertNotIn('OPTIONS', self.settings_for('sqlite:///db.sqlite3', DB_POOL='1'))
+
+
+class SQLiteProfileTests(SimpleTestCase):
+    def open(self, **env):
+        """A fresh connection to a new SQLite file configured from ``env``."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.addCleanup(connection_created.disconnect, dispatch_uid='config.sqlite.apply_profile')
+        with mock.patch.dict(os.environ, env):
+            database = database_settings(directory, 'sqlite:///profile.sqlite3')
+        settings_dict = ConnectionHandler().configure_settings({'default': dict(database)})['default']
+        wrapper = DatabaseWrapper(settings_dict, 'profile')
+        self.addCleanup(wrapper.close)
+        return database, wrapper
+
+    def pragmas(self, wrapper):
+        with wrapper.cursor() as cursor:
+            return {
+                name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                for name in ['journal_mode', 'synchronous', 'busy_timeout', 'mmap_size']
+            }
+
+    def test_profile_applies_to_new_connections(self):
+        database, wrapper = self.open(DB_SQLITE_TUNING='1')
+        self.assertEqual(database['OPTIONS'], {'transaction_mode': 'IMMEDIATE'})
+        # synchronous=NORMAL is 1
+        profile = dict(sqlite.PRAGMAS)
+        self.assertEqual(self.pragmas(wrapper), {
+            'journal_mode': 'wal', 'synchronous': 1,
+            'busy_timeout': profile['busy_timeout'], 'mmap_size': profile['mmap_size'],
+        })
+
+    def test_nothing_changes_when_off(self):
+        database, wrapper = self.open(DB_SQLITE_TUNING='0')
+        self.assertNotIn('OPTIONS', database)
+        # SQLite's defaults (synchronous=FULL is 2), and the sqlite3 module's 5 s timeout
+        self.assertEqual(self.pragmas(wrapper), {
+            'journal_mode': 'delete', 'synchronous': 2, 'busy_timeout': 5000, 'mmap_size': 0,
+        })
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRoutingTests(TransactionTestCase):
+    def serve(self, method='get', write=False, cookies=None):
+        seen = {}
+
+        def view(request):
+            seen['read'] = router.db_for_read(Venue)
+            with transaction.atomic():
+                seen['in_transaction'] = router.db_for_read(Venue)
+            if write:
+                router.db_for_write(Venue)
+                seen['after_write'] = router.db_for_read(Venue)
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)('/api/venues/')
+        request.COOKIES.update(cookies or {})
+        return seen, ReplicaMiddleware(view)(request)
+
+    def test_read_only_requests_read_from_replicas(self):
+        seen, response = self.serve()
+        self.assertEqual(seen, {'read': 'replica_1', 'in_transaction': 'default'})
+        self.assertNotIn('primary_reads', response.cookies)
+        # Outside a request (commands, the sweeper) reads use the primary
+        self.assertEqual(router.db_for_read(Venue), 'default')
+
+    def test_writes_keep_the_client_on_the_primary(self):
+        seen, response = self.serve('post', write=True)
+        self.assertEqual(seen['read'], 'default')
+        self.assertEqual(response.cookies['primary_reads']['max-age'], 10)
+
+        seen, _ = self.serve(cookies={'primary_reads': '1'})
+        self.assertEqual(seen['read'], 'default')
+
+        seen, response = self.serve(write=True)
+        self.assertEqual((seen['read'], seen['after_write']), ('replica_1', 'default'))
+        self.assertIn('primary_reads', response.cookies)
+
+    def test_write_inside_use_primary_keeps_the_primary(self):
+        seen = {}
+
+        def view(request):
+            with use_primary():
+                seen['in_block'] = router.db_for_read(Venue)
+                router.db_for_write(Venue)
+                seen['after_write'] = router.db_for_read(Venue)
+            seen['after_block'] = router.db_for_read(Venue)
+            with use_primary():
+                pass
+            seen['after_read_only_block'] = router.db_for_read(Venue)
+            return HttpResponse()
+
+        ReplicaMiddleware(view)(RequestFactory().get('/api/vendor/dashboard/'))
+        self.assertEqual(set(seen.values()), {'default'})
+
+        def read_only_view(request):
+            with use_primary():
+                seen['in_block'] = router.db_for_read(Venue)
+            seen['after_block'] = router.db_for_read(Venue)
+            return HttpResponse()
+
+        ReplicaMiddleware(read_only_view)(RequestFactory().get('/api/venues/'))
+        self.assertEqual((seen['in_block'], seen['after_block']), ('default', 'replica_1'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaDatabaseTests(TransactionTestCase):
+    """A primary and a lagging replica as two SQLite databases."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        directory = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, directory)
+        # Added after the test databases are set up, so the runner does not create it
+        connections.settings['replica_1'] = {
+            **connection.settings_dict, 'NAME': os.path.join(directory, 'replica.sqlite3'),
+        }
+        cls.addClassCleanup(cls.drop_replica)
+        cls.databases = cls.databases | {'replica_1'}
+
+    @classmethod
+    def drop_replica(cls):
+        connections['replica_1'].close()
+        del connections['replica_1']
+        del connections.settings['replica_1']
+
+    def setUp(self):
+        cache.clear()
+        self.vendor = make_user('vendor@example.com', role='VENDOR')
+        self.venue = make_venue(self.vendor)
+        # The replica starts as a copy of the primary...
+        self.copy_to_replica()
+        # ...and has not received this write yet
+        Venue.objects.filter(pk=self.venue.pk).update(name='Renamed')
+
+    def copy_to_replica(self):
+        connections['replica_1'].close()
+        connection.ensure_connection()
+        replica = sqlite3.connect(connections['replica_1'].settings_dict['NAME'])
+        connection.connection.backup(replica)
+        replica.close()
+
+    def test_reads_follow_the_request(self):
+        def view(request):
+            return HttpResponse(Venue.objects.get(pk=self.venue.pk).name)
+
+        factory = RequestFactory()
+        self.assertEqual(ReplicaMiddleware(view)(factory.get('/')).content, b'Hall')
+        self.assertEqual(ReplicaMiddleware(view)(factory.post('/')).content, b'Renamed')
+        factory.cookies['primary_reads'] = '1'
+        self.assertEqual(ReplicaMiddleware(view)(factory.get('/')).content, b'Renamed')
+
+    def test_list_misses_read_replicas_but_are_not_cached_while_they_lag(self):
+        client = APIClient()
+
+        def get_list():
+            with CaptureQueriesContext(connections['replica_1']) as replica_queries:
+                response = client.get('/api/venues/')
+            self.assertTrue(replica_queries.captured_queries)
+            return [v['name'] for v in response.data['results']], response['X-Cache']
+
+        # Creating the venue bumped the list version moments ago
+        self.assertEqual(get_list(), (['Hall'], 'MISS'))
+        self.assertEqual(get_list(), (['Hall'], 'MISS'))
+
+        # REPLICA_STICKY_SECONDS later the replica has caught up
+        cache.delete(response_cache._recent_key(response_cache.GLOBAL_VERSION_KEY))
+        self.copy_to_replica()
+        self.assertEqual(get_list(), (['Renamed'], 'MISS'))
+        response = client.get('/api/venues/')
+        self.assertEqual(([v['name'] for v in response.data['results']], response['X-Cache']), (['Renamed'], 'HIT'))
+
+    def test_dashboard_rebuild_reads_its_own_write(self):
+        from booking.models import VendorStats
+        VendorStats.objects.all().delete()
+        # Neither database has the vendor's stats row; only the primary gets the rebuilt one
+        self.copy_to_replica()
+        client = APIClient()
+        client.force_authenticate(self.vendor)
+        response = client.get('/api/vendor/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_venues'], 1)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.vendor = make_user('vendor@example.com', role='VENDOR')
+        make_venue(self.vendor)
+
+    def test_requests_are_timed_and_counted_by_view(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/venues/')
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="%d queries", serializer;dur=[\d.]+, view;dur=[\d.]+$' % len(queries)
+        )
+
+        self.client.force_authenticate(self.vendor)
+        self.client.get('/api/vendor/dashboard/')
+        with self.settings(METRICS_TOKEN='scrape-token'):
+            metrics = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token').content.decode()
+        self.assertIn('# TYPE request_duration_seconds histogram', metrics)
+        self.assertRegex(metrics, r'request_duration_seconds_count\{view="venue.list"\} [1-9]')
+        self.assertRegex(metrics, r'request_db_queries_bucket\{view="venue.list",le="\+Inf"\} [1-9]')
+        self.assertIn('request_serializer_seconds_sum{view="vendor-dashboard"}', metrics)
+
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer other').status_code, 401)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_metrics_are_off_without_a_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer ').status_code, 404)
@@ -3,5 +3,6 @@ from . import views
 
 router = DefaultRouter()
 router.register('venues', views.VenueViewSet, basename='venue')
+router.register('reviews', views.ReviewViewSet, basename='review')
 
 urlpatterns = router.urls
\ No newline at end of file
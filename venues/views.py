@@ -7,21 +7,64 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Avg
+from django.db.models import Q, Count, Case, When, Value
+from django.db.models.functions import Lower
+from config.pagination import KeysetPagination
 from datetime import datetime
-from .models import Venue
+from .models import Venue, Review, Amenity, VenueAmenity, FeaturedRanking
+from . import availability, geo
+from .search import VenueSearchFilter
+from .cache import cached_response
+from booking import pricing
 from .serializers import (
     VenueListSerializer,
     VenueDetailSerializer,
     VenueCreateSerializer,
+    ReviewSerializer,
+    QuoteRequestSerializer,
 )
 
+def venues_with_all_amenities(names):
+    """Subquery of venue ids having every named amenity (case-insensitive).
+    
+    Names are resolved to ids once, then a single GROUP BY/HAVING over
+    venue_amenities keeps venues matching all of them, so the query does not
+    grow a join per selected amenity.
+    """
+    wanted = {name.lower() for name in names}
+    ids_by_name = {}
+    for amenity_id, name in Amenity.objects.annotate(
+        lower_name=Lower('name')
+    ).filter(lower_name__in=wanted).values_list('id', 'lower_name'):
+        ids_by_name.setdefault(name, []).append(amenity_id)
+    
+    if len(ids_by_name) < len(wanted):
+        return VenueAmenity.objects.none().values('venue_id')
+    
+    amenity_ids = [i for ids in ids_by_name.values() for i in ids]
+    if len(amenity_ids) == len(wanted):
+        matched = Count('amenity_id')
+    else:
+        # Case variants of one name ("WiFi"/"wifi") count once
+        matched = Count(Case(*[
+            When(amenity_id__in=ids, then=Value(index))
+            for index, ids in enumerate(ids_by_name.values())
+        ]), distinct=True)
+    
+    return VenueAmenity.objects.filter(
+        amenity_id__in=amenity_ids
+    ).values('venue_id').annotate(matched=matched).filter(
+        matched=len(wanted)
+    ).values('venue_id')
+
+
 class VenueViewSet(viewsets.ModelViewSet):
     queryset = Venue.objects.filter(is_active=True)
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, VenueSearchFilter, filters.OrderingFilter]
     filterset_fields = ['city']
     search_fields = ['name', 'description', 'address']
-    ordering_fields = ['price_per_day', 'created_at', 'capacity']
+    ordering_fields = ['price_per_day', 'created_at', 'capacity', 'rating_avg', 'reviews_count']
+    pagination_class = KeysetPagination
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -31,20 +74,16 @@ class VenueViewSet(viewsets.ModelViewSet):
         return VenueDetailSerializer
     
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'featured', 'check_availability']:
+        if self.action in ['list', 'retrieve', 'featured', 'check_availability', 'quote']:
             return [AllowAny()]
         return [IsAuthenticated()]
     
     def get_queryset(self):
         queryset = super().get_queryset()
         
-        queryset = queryset.annotate(rating=Avg('reviews__rating'))
-        
         if self.request.user.is_authenticated and self.request.user.role == 'VENDOR':
             if self.action in ['list', 'retrieve', 'update', 'partial_update', 'destroy']:
-                queryset = Venue.objects.filter(owner=self.request.user).annotate(
-                    rating=Avg('reviews__rating')
-                )
+                queryset = Venue.objects.filter(owner=self.request.user)
         
         capacity_min = self.request.query_params.get('capacity_min')
         capacity_max = self.request.query_params.get('capacity_max')
@@ -60,41 +99,97 @@ class VenueViewSet(viewsets.ModelViewSet):
         if price_max:
             queryset = queryset.filter(price_per_day__lte=price_max)
         
+        rating_min = self.request.query_params.get('rating_min')
+        if rating_min:
+            try:
+                queryset = queryset.filter(rating_avg__gte=float(rating_min))
+            except ValueError:
+                pass
+        
         amenities = self.request.query_params.get('amenities')
         if amenities:
-            amenity_list = [a.strip() for a in amenities.split(',')]
-            for amenity in amenity_list:
-                queryset = queryset.filter(venueamenity__amenity__name__iexact=amenity)
+            amenity_list = [a.strip() for a in amenities.split(',') if a.strip()]
+            if amenity_list:
+                queryset = queryset.filter(id__in=venues_with_all_amenities(amenity_list))
         
+        check_date = None
         date_str = self.request.query_params.get('date')
         if date_str:
             try:
                 check_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-                from booking.models import Booking
-                queryset = queryset.exclude(
-                    Q(blocked_dates__date=check_date) |
-                    Q(booking__start_date__lte=check_date, 
-                      booking__end_date__gte=check_date, 
-                      booking__status__in=['PENDING', 'CONFIRMED'])
-                )
             except ValueError:
                 pass
         
-        return queryset.distinct()
+        # check_availability reads start_date/end_date itself and must still find the venue
+        if self.action == 'list':
+            start_date_str = self.request.query_params.get('start_date')
+            end_date_str = self.request.query_params.get('end_date')
+            if start_date_str and end_date_str:
+                try:
+                    start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+                    end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+                    if start_date <= end_date:
+                        queryset = queryset.filter(availability.free_between(start_date, end_date))
+                except ValueError:
+                    pass
+        
+        ordering = ['-created_at']
+        near = self.request.query_params.get('near')
+        if near and self.action == 'list':
+            try:
+                latitude, longitude = (float(v) for v in near.split(','))
+                radius_km = min(float(self.request.query_params.get('radius_km', 10)), 500)
+                queryset = self.filter_near(queryset, latitude, longitude, radius_km)
+                ordering = ['distance_km', '-created_at']
+            except ValueError:
+                pass
+        
+        queryset = queryset.with_list_data(available_on=check_date)
+        if check_date is not None:
+            queryset = queryset.filter(available=True)
+        return queryset.order_by(*ordering)
+    
+    def filter_near(self, queryset, latitude, longitude, radius_km):
+        cells = Q()
+        for cell in geo.covering_cells(latitude, longitude, radius_km):
+            # Prefix match written as a range so both SQLite and PostgreSQL use the index
+            cells |= Q(geohash__gte=cell, geohash__lt=cell + '~')
+        return queryset.filter(cells).annotate(
+            distance_km=geo.distance_expression(latitude, longitude)
+        ).filter(distance_km__lte=radius_km)
     
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
     
+    @cached_response()
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @cached_response(per_venue=True)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
     @action(detail=False, methods=['get'])
+    @cached_response()
     def featured(self, request):
-        venues = self.get_queryset().annotate(
-            avg_rating=Avg('reviews__rating')
-        ).order_by('-avg_rating', '-created_at')[:6]
+        city = request.query_params.get('city')
+        if city and city not in dict(Venue.CITY_CHOICES):
+            return Response(
+                {'error': 'Unknown city'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Read the precomputed ranking (see venues.rankings) instead of sorting the catalogue
+        venues = Venue.objects.filter(
+            featured_rankings__scope=city or FeaturedRanking.GLOBAL_SCOPE,
+            is_active=True
+        ).order_by('featured_rankings__position').with_list_data()[:6]
         
         serializer = VenueListSerializer(venues, many=True, context={'request': request})
         return Response({'venues': serializer.data})
     
     @action(detail=True, methods=['get'])
+    @cached_response(per_venue=True)
     def check_availability(self, request, pk=None):
         venue = self.get_object()
         
@@ -122,27 +217,7 @@ class VenueViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        days = (end_date - start_date).days + 1
-        
-        blocked = venue.blocked_dates.filter(
-            date__gte=start_date,
-            date__lte=end_date
-        ).exists()
-        
-        from booking.models import Booking
-        conflicting_bookings = Booking.objects.filter(
-            venue=venue,
-            status__in=['PENDING', 'CONFIRMED'],
-            start_date__lte=end_date,
-            end_date__gte=start_date
-        ).exists()
-        
-        available = not (blocked or conflicting_bookings)
-        
-        subtotal = float(venue.price_per_day) * days
-        commission = subtotal * (venue.commission_percentage / 100)
-        deposit = subtotal * (venue.deposit_percentage / 100)
-        total = subtotal + commission
+        available = availability.is_free(venue.id, start_date, end_date)
         
         return Response({
             'available': available,
@@ -150,12 +225,50 @@ class VenueViewSet(viewsets.ModelViewSet):
                 date__gte=start_date,
                 date__lte=end_date
             ).values_list('date', flat=True)),
-            'price_breakdown': {
-                'days': days,
-                'price_per_day': float(venue.price_per_day),
-                'subtotal': round(subtotal, 2),
-                'commission': round(commission, 2),
-                'deposit': round(deposit, 2),
-                'total': round(total, 2)
+            'price_breakdown': pricing.quote(venue, start_date, end_date)
+        })
+    
+    @action(detail=False, methods=['post'])
+    def quote(self, request):
+        serializer = QuoteRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['items']
+        
+        venues = Venue.objects.filter(is_active=True).in_bulk({item['venue_id'] for item in items})
+        quotes = []
+        for item in items:
+            venue = venues.get(item['venue_id'])
+            result = {
+                'venue_id': item['venue_id'],
+                'start_date': item['start_date'],
+                'end_date': item['end_date'],
             }
-        })
\ No newline at end of file
+            if venue is None:
+                result['error'] = 'Venue not found or not available'
+            else:
+                result['price_breakdown'] = pricing.quote(venue, item['start_date'], item['end_date'])
+            quotes.append(result)
+        
+        return Response({'quotes': quotes})
+
+
+class ReviewViewSet(viewsets.ModelViewSet):
+    serializer_class = ReviewSerializer
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['venue', 'rating']
+    ordering_fields = ['created_at', 'rating']
+    pagination_class = KeysetPagination
+    
+    def get_queryset(self):
+        queryset = Review.objects.select_related('user')
+        if self.action in ['update', 'partial_update', 'destroy']:
+            return queryset.filter(user=self.request.user)
+        return queryset
+    
+    def get_permissions(self):
+        if self.action in ['list', 'retrieve']:
+            return [AllowAny()]
+        return [IsAuthenticated()]
+    
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)